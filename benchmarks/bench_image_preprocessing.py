@@ -0,0 +1,94 @@
+"""
+Mede bytes enviados e tempo de codificação das imagens enviadas ao modelo
+de visão, para cada combinação de tamanho máximo, formato e qualidade.
+
+Uso:
+    poetry run python benchmarks/bench_image_preprocessing.py [foto.jpg ...]
+
+Sem argumentos, gera uma foto sintética de 4032x3024 (câmera de celular).
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inventorybot import imaging  # noqa: E402
+from inventorybot.imaging import ImageOptions, prepare_image  # noqa: E402
+from inventorybot.vision import VisionService  # noqa: E402
+
+MAX_EDGES = [2048, 1536, 1024, 768, 512]
+FORMATS = ["jpeg", "webp"]
+QUALITIES = [90, 80, 60]
+
+
+def synthetic_photo() -> bytes:
+    from PIL import Image, ImageDraw, ImageFilter
+
+    image = Image.effect_noise((4032, 3024), 40).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for i in range(0, 4032, 96):
+        draw.rectangle([i, i // 2, i + 400, i // 2 + 300], fill=(i % 255, 90, 160))
+    image = image.filter(ImageFilter.GaussianBlur(2))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def measure(data: bytes, options: ImageOptions | None, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded, mime = prepare_image(data, "image/jpeg", options)
+        data_url = VisionService._to_data_url(encoded, mime)
+        timings.append(time.perf_counter() - start)
+
+    return len(data_url), statistics.median(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("images", nargs="*", type=Path)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    if not imaging.is_available():
+        sys.exit("Pillow não está instalado (pip install pillow).")
+
+    images = [(path.name, path.read_bytes()) for path in args.images]
+    if not images:
+        images = [("sintética 4032x3024", synthetic_photo())]
+
+    for name, data in images:
+        print(f"\n# {name} ({len(data) / 1024:.0f} KiB)")
+        print(f"{'configuração':<24} {'bytes enviados':>15} {'redução':>8} {'tempo':>9}")
+
+        original_size, original_time = measure(data, None, args.repeat)
+        print(
+            f"{'original':<24} {original_size:>15,} {'-':>8} "
+            f"{original_time * 1000:>7.1f}ms"
+        )
+
+        for max_edge in MAX_EDGES:
+            for fmt in FORMATS:
+                for quality in QUALITIES:
+                    options = ImageOptions(
+                        max_edge=max_edge, format=fmt, quality=quality
+                    )
+                    size, elapsed = measure(data, options, args.repeat)
+                    label = f"{max_edge}px {fmt} q{quality}"
+                    print(
+                        f"{label:<24} {size:>15,} "
+                        f"{size / original_size:>7.0%} {elapsed * 1000:>7.1f}ms"
+                    )
+
+
+if __name__ == "__main__":
+    main()
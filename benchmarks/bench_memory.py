@@ -0,0 +1,139 @@
+"""
+Mede a memória (bytes por item, via tracemalloc) de muitos itens em sessão e do
+índice do vault, comparando as entidades atuais (com __slots__ e localizações
+internadas) com as dataclasses comuns de antes, com uma `Location` nova por item.
+
+Uso:
+    poetry run python benchmarks/bench_memory.py [--items 100000] [--locations 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import gc
+import sys
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inventorybot.entities import Item, Location  # noqa: E402
+from inventorybot.infra.vault_index import ItemRecord, parse_item  # noqa: E402
+
+
+def legacy_dataclass(cls: type, name: str) -> type:
+    """Cópia de `cls` como dataclass comum (com __dict__), como era antes."""
+    fields = [
+        (f.name, f.type, dataclasses.field(default=f.default))
+        if f.default is not dataclasses.MISSING
+        else (f.name, f.type)
+        for f in dataclasses.fields(cls)
+    ]
+    return dataclasses.make_dataclass(name, fields)
+
+
+LegacyLocation = legacy_dataclass(Location, "LegacyLocation")
+LegacyItem = legacy_dataclass(Item, "LegacyItem")
+LegacyItemRecord = legacy_dataclass(ItemRecord, "LegacyItemRecord")
+
+
+def measure(build: Callable[[], list]) -> tuple[int, list]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, objects
+    finally:
+        tracemalloc.stop()
+
+
+def box_names(locations: int) -> list[str]:
+    return [f"Caixa {number}" for number in range(locations)]
+
+
+def session_items(count: int, locations: int, legacy: bool) -> Callable[[], list]:
+    boxes = box_names(locations)
+
+    def build() -> list:
+        items = []
+        for number in range(count):
+            # Como no quick-add "l Caixa N": o nome vem de um texto novo
+            box = "".join(["Caixa ", boxes[number % locations][6:]])
+            if legacy:
+                shelf = LegacyLocation(name="Armário")
+                location = LegacyLocation(name=box, location=shelf)
+                item_class = LegacyItem
+            else:
+                location = Location.intern(box, Location.intern("Armário"))
+                item_class = Item
+            items.append(
+                item_class(name=f"Item {number}", quantity=1, location=location)
+            )
+        return items
+
+    return build
+
+
+def index_records(count: int, locations: int, legacy: bool) -> Callable[[], list]:
+    def build() -> list:
+        records = []
+        for number in range(count):
+            # Como lido do front matter: cada item traz sua cópia do link
+            properties = {
+                "name": f"Item {number}",
+                "quantity": 1,
+                "tags": ["ferramenta"],
+                "status": "disponivel",
+                "location": f"[[caixa-{number % locations} - Inventário]]",
+            }
+            path = f"/vault/Itens/item-{number}.md"
+            if legacy:
+                link = properties["location"].removeprefix("[[").removesuffix("]]")
+                records.append(
+                    LegacyItemRecord(
+                        path=path,
+                        name=properties["name"],
+                        quantity=1,
+                        tags=("ferramenta",),
+                        status="disponivel",
+                        location=link,
+                    )
+                )
+            else:
+                records.append(parse_item(path, properties))
+        return records
+
+    return build
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--items", type=int, default=100_000)
+    arg_parser.add_argument("--locations", type=int, default=200)
+    args = arg_parser.parse_args()
+
+    print(f"{args.items:,} itens em {args.locations} localizações\n")
+    print(f"{'':<22} {'antes':>12} {'depois':>12} {'redução':>8}")
+    scenarios = [
+        ("itens em sessão", session_items),
+        ("índice do vault", index_records),
+    ]
+    for label, scenario in scenarios:
+        results = []
+        for legacy in (True, False):
+            used, objects = measure(scenario(args.items, args.locations, legacy))
+            results.append(used / args.items)
+            del objects
+        before, after = results
+        print(
+            f"{label:<22} {before:>8.0f} B/it {after:>8.0f} B/it "
+            f"{1 - after / before:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
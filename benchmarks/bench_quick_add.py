@@ -0,0 +1,101 @@
+"""
+Mede o cadastro rápido em lote: interpretar N linhas "Nome; q 2 l caixa t tag",
+montar a prévia e gravar todos os itens num único lote em um vault temporário.
+
+Uso:
+    poetry run python benchmarks/bench_quick_add.py [--lines 1000] [--locations 10]
+    poetry run python benchmarks/bench_quick_add.py --fsync
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inventorybot.infra.markdown_output import MarkdownOutput  # noqa: E402
+from inventorybot.infra.vault_index import VaultIndex  # noqa: E402
+
+
+def configure_env(vault: str) -> None:
+    os.environ.setdefault("TELEGRAM_TOKEN", "123:BENCH")
+    os.environ["OUTPUT_DIR"] = vault
+    os.environ["ALLOWED_USER_IDS"] = "[]"
+    os.environ["VISION_CACHE_PATH"] = ""
+
+
+def quick_add_text(lines: int, locations: int) -> str:
+    return "\n".join(
+        f"Item {number} da caixa; q {number % 5 + 1} l Caixa {number % locations} "
+        f"t ferramenta, lote"
+        for number in range(lines)
+    )
+
+
+async def run_once(main, text: str, vault: str, fsync: bool) -> dict[str, float]:
+    context = SimpleNamespace(user_data={})
+
+    start = time.perf_counter()
+    items, errors = main.parse_quick_add(text, context)
+    assert not errors, errors[:3]
+    parsed = time.perf_counter()
+    main.render_batch_summary(items)
+    previewed = time.perf_counter()
+
+    output = MarkdownOutput(vault, index=VaultIndex(vault), fsync=fsync)
+    await output.save_many(items)
+    saved = time.perf_counter()
+
+    return {
+        "interpretar": parsed - start,
+        "prévia": previewed - parsed,
+        "gravar": saved - previewed,
+        "total": saved - start,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--lines", type=int, default=1000)
+    arg_parser.add_argument("--locations", type=int, default=10)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--fsync", action="store_true")
+    args = arg_parser.parse_args()
+
+    text = quick_add_text(args.lines, args.locations)
+    with tempfile.TemporaryDirectory() as root:
+        configure_env(os.path.join(root, "vault"))
+        import main as bot
+
+        runs = []
+        for number in range(args.repeat):
+            vault = os.path.join(root, f"vault-{number}")
+            runs.append(asyncio.run(run_once(bot, text, vault, args.fsync)))
+
+        notes = sum(
+            name.endswith(".md") for name in os.listdir(os.path.join(vault, "Itens"))
+        )
+        locations = len(os.listdir(os.path.join(vault, "Locais")))
+
+    print(
+        f"{args.lines} linhas, {locations} localizações, {notes} notas por vault"
+        + (" (fsync)" if args.fsync else "")
+    )
+    for step in runs[0]:
+        timings = [run[step] for run in runs]
+        print(
+            f"{step:>12}: mediana {statistics.median(timings) * 1000:>7.1f}ms "
+            f"(mín {min(timings) * 1000:.1f}ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Mede o tempo de indexação e a latência das consultas do /buscar num vault
+sintético.
+
+Uso:
+    poetry run python benchmarks/bench_search.py [--items 100000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inventorybot.infra.vault_index import ItemRecord  # noqa: E402
+from inventorybot.search import SearchIndex  # noqa: E402
+
+NOUNS = [
+    "furadeira", "parafusadeira", "martelo", "alicate", "chave de fenda",
+    "serrote", "trena", "nível", "lanterna", "pilha", "cabo USB", "carregador",
+    "fone de ouvido", "tênis", "camiseta", "jaqueta", "copo", "prato", "panela",
+    "frigideira", "livro", "caderno", "caneta", "lápis", "mochila", "mala",
+    "extensão elétrica", "lâmpada", "ventilador", "cafeteira", "liquidificador",
+    "boneca", "Lego", "quebra-cabeça", "bola", "raquete", "bicicleta", "capacete",
+]
+BRANDS = [
+    "Bosch", "Makita", "Tramontina", "Black+Decker", "Stanley", "Philips",
+    "Samsung", "Nike", "Adidas", "Mondial", "Arno", "Faber-Castell", "Intelbras",
+]
+ADJECTIVES = [
+    "vermelho", "azul", "preto", "branco", "usado", "novo", "pequeno", "grande",
+    "elétrico", "sem fio", "de plástico", "de madeira", "de metal", "quebrado",
+]
+TAGS = ["ferramenta", "cozinha", "roupa", "eletronico", "brinquedo", "esporte"]
+PLACES = ["caixa", "gaveta", "armário", "prateleira", "garagem", "sótão", "estante"]
+QUERIES = [
+    "furadeira", "furadera", "furadeira bosch", "martelo", "alicate tramontina",
+    "lampada", "lâmpada philips", "caixa 12", "tenis nike", "parafusadera",
+    "extensao", "cafeteira", "lego", "bicicleta azul", "garagem", "xyzzy",
+]
+
+
+def synthetic_records(count: int, seed: int = 42) -> list[ItemRecord]:
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        name = f"{rng.choice(NOUNS).capitalize()} {rng.choice(BRANDS)}"
+        description = " ".join(
+            [name] + rng.sample(ADJECTIVES, 3) + [f"modelo {rng.randint(100, 9999)}"]
+        )
+        place = f"{rng.choice(PLACES)}-{rng.randint(1, 300)}"
+        records.append(
+            ItemRecord(
+                path=f"Itens/item-{i}.md",
+                name=name,
+                description=description,
+                quantity=rng.randint(1, 5),
+                tags=tuple(rng.sample(TAGS, 2)),
+                location=f"{place} - Inventário",
+            )
+        )
+    return records
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--items", type=int, default=100_000)
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    records = synthetic_records(args.items)
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for record in records:
+        index.add(record)
+    print(f"indexação: {args.items:,} itens em {time.perf_counter() - start:.2f}s")
+
+    print(f"\n{'consulta':<22} {'resultados':>10} {'1ª (fria)':>10} {'p50':>8} {'máx':>8}")
+    all_timings = []
+    for query in QUERIES:
+        start = time.perf_counter()
+        results = index.search(query, limit=5)
+        cold = time.perf_counter() - start
+
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            index.search(query, limit=5)
+            timings.append(time.perf_counter() - start)
+        all_timings.extend(timings)
+
+        print(
+            f"{query:<22} {results.total:>10,} {cold * 1000:>8.2f}ms "
+            f"{statistics.median(timings) * 1000:>6.2f}ms {max(timings) * 1000:>6.2f}ms"
+        )
+
+    all_timings.sort()
+    p95 = all_timings[int(len(all_timings) * 0.95)]
+    print(f"\ngeral: p50 {statistics.median(all_timings) * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Mede a partida a frio do bot: o tempo de `import main` (com `-X importtime`,
+listando os módulos mais lentos) e o tempo até o primeiro `getUpdates` do
+polling, cada um num processo novo, com a Bot API falsa e um vault temporário.
+
+Uso:
+    poetry run python benchmarks/bench_startup.py [--repeat 5] [--top 15]
+    poetry run python benchmarks/bench_startup.py --no-openai-key
+
+Sem `OPENAI_API_KEY` o bot sobe sem a análise de imagens; com a chave, o
+cliente da OpenAI só é importado quando chega a primeira foto (em segundo
+plano) ou na primeira análise, e o Pillow, na primeira imagem pré-processada.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+READY = "PRIMEIRO_POLL"
+
+# Processo filho: sobe o bot em polling e sai no primeiro getUpdates
+FIRST_POLL_SCRIPT = f"""
+import os, sys
+sys.path.insert(0, {str(ROOT)!r})
+
+import main
+from inventorybot.testing.fake_telegram import FakeTelegramRequest
+
+
+class FirstPollRequest(FakeTelegramRequest):
+    async def do_request(self, url, method, *args, **kwargs):
+        if url.endswith("/getUpdates"):
+            print({READY!r}, flush=True)
+            os._exit(0)
+        return await super().do_request(url, method, *args, **kwargs)
+
+
+main.build_application(FirstPollRequest()).run_polling()
+"""
+
+
+def child_env(vault: str, openai_key: bool) -> dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "TELEGRAM_TOKEN": "123:STARTUP",
+            "OUTPUT_DIR": vault,
+            "ALLOWED_USER_IDS": "[]",
+            "VISION_CACHE_PATH": "",
+            "INDEX_REFRESH_INTERVAL": "0",
+            "WEBHOOK_URL": "",
+            "METRICS_PORT": "0",
+        }
+    )
+    if openai_key:
+        env["OPENAI_API_KEY"] = "sk-startup"
+    else:
+        env.pop("OPENAI_API_KEY", None)
+    return env
+
+
+def import_times(env: dict[str, str]) -> list[tuple[float, str]]:
+    """(tempo cumulativo em s, módulo) de cada import de `main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        times.append((int(cumulative) / 1e6, module.strip()))
+    return times
+
+
+def time_to_first_poll(env: dict[str, str]) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", FIRST_POLL_SCRIPT],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    for line in process.stdout:
+        if line.strip() == READY:
+            elapsed = time.perf_counter() - start
+            break
+    else:
+        process.wait()
+        raise RuntimeError(f"O bot saiu sem fazer polling ({process.returncode})")
+    process.wait()
+    return elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--top", type=int, default=15, help="módulos listados")
+    arg_parser.add_argument("--no-openai-key", action="store_true")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as vault:
+        env = child_env(vault, openai_key=not args.no_openai_key)
+
+        runs = [import_times(env) for _ in range(args.repeat)]
+        totals = [
+            next(seconds for seconds, module in times if module == "main")
+            for times in runs
+        ]
+        print(
+            f"import main: mediana {statistics.median(totals) * 1000:.0f}ms "
+            f"(mín {min(totals) * 1000:.0f}ms, {args.repeat} execuções)"
+        )
+
+        # Módulos de topo (sem ponto) da última execução, pelo tempo cumulativo
+        top_level = sorted(
+            (entry for entry in runs[-1] if "." not in entry[1] and entry[1] != "main"),
+            reverse=True,
+        )
+        print(f"\n{'cumulativo':>10}  módulo")
+        for seconds, module in top_level[: args.top]:
+            print(f"{seconds * 1000:>8.1f}ms  {module}")
+
+        polls = [time_to_first_poll(env) for _ in range(args.repeat)]
+        print(
+            f"\naté o primeiro getUpdates: mediana {statistics.median(polls):.2f}s "
+            f"(mín {min(polls):.2f}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Mede o caminho de visão (preparo da imagem, requisição e interpretação da
+resposta) contra um servidor local que imita a Responses API, sem rede e sem
+custo, para 1 a N extrações simultâneas.
+
+Uso:
+    poetry run python benchmarks/bench_vision.py --max-concurrency 16
+    poetry run python benchmarks/bench_vision.py --latency lognormal:-0.7,0.5 --stream
+    poetry run python benchmarks/bench_vision.py --malformed-rate 0.2
+
+Latências: `fixed:S`, `uniform:A,B`, `lognormal:MU,SIGMA` ou `exp:MEDIA`, em
+segundos até o primeiro byte da resposta.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inventorybot import imaging  # noqa: E402
+from inventorybot.entities import Item  # noqa: E402
+from inventorybot.imaging import ImageOptions, prepare_image  # noqa: E402
+from inventorybot.testing.fake_openai import FakeOpenAIServer  # noqa: E402
+from inventorybot.vision import VisionService  # noqa: E402
+
+
+def latency_distribution(spec: str, rng: random.Random) -> Callable[[], float]:
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    distributions = {
+        "fixed": (1, lambda s: s),
+        "uniform": (2, rng.uniform),
+        "lognormal": (2, rng.lognormvariate),
+        "exp": (1, lambda mean: rng.expovariate(1 / mean)),
+    }
+    if kind not in distributions or len(values) != distributions[kind][0]:
+        raise argparse.ArgumentTypeError(f"Latência inválida: {spec}")
+
+    sample = distributions[kind][1]
+    return lambda: sample(*values)
+
+
+def synthetic_photo(random_bytes: int = 2_000_000) -> bytes:
+    if not imaging.is_available():
+        # Sem Pillow a imagem segue sem alterações: bytes quaisquer servem
+        return os.urandom(random_bytes)
+
+    from PIL import Image
+
+    image = Image.effect_noise((4032, 3024), 40).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def percentile(samples: list[float], quantile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * quantile), len(ordered) - 1)]
+
+
+def measure_encode(photo: bytes, options: ImageOptions | None, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded, mime = prepare_image(photo, "image/jpeg", options)
+        VisionService._to_data_url(encoded, mime)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+async def run_level(
+    service: VisionService,
+    photo: bytes,
+    concurrency: int,
+    requests: int,
+    stream: bool,
+) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    first_name: list[float] = []
+    errors = 0
+
+    async def extract(number: int):
+        nonlocal errors
+        item = Item(name=f"item {number}", photo_data=photo)
+        async with semaphore:
+            start = time.perf_counter()
+            named = False
+
+            async def on_progress(fields):
+                nonlocal named
+                if not named:
+                    named = True
+                    first_name.append(time.perf_counter() - start)
+
+            try:
+                await service.extract_item_details_from_image(
+                    item, on_progress=on_progress if stream else None
+                )
+            except Exception:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(extract(number) for number in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "first_name": first_name,
+        "errors": errors,
+    }
+
+
+async def run(args, photo: bytes, server: FakeOpenAIServer) -> None:
+    options = ImageOptions(max_edge=args.max_edge) if imaging.is_available() else None
+    service = VisionService(
+        api_key="sk-bench",
+        base_url=server.base_url,
+        image_options=options,
+        structured_output=not args.no_structured_output,
+    )
+
+    # Aquecimento: conexão e primeira chamada do cliente
+    await service.extract_item_details_from_image(
+        Item(name="aquecimento", photo_data=photo)
+    )
+
+    levels = []
+    concurrency = 1
+    while concurrency < args.max_concurrency:
+        levels.append(concurrency)
+        concurrency *= 2
+    levels.append(args.max_concurrency)
+
+    header = (
+        f"{'simult.':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'1º nome':>8} {'erros':>6} {'fallback':>8} {'enviado/req':>12} "
+        f"{'recebido/req':>12}"
+    )
+    print(header)
+    for concurrency in levels:
+        parse_before = service.parse_stats.copy()
+        received_before = server.bytes_received
+        sent_before = server.bytes_sent
+        count_before = server.request_count
+
+        stats = await run_level(
+            service, photo, concurrency, args.requests, args.stream
+        )
+
+        latencies = stats["latencies"]
+        sent = server.request_count - count_before or 1
+        fallback = service.parse_stats["fallback"] - parse_before["fallback"]
+        first_name = (
+            f"{statistics.median(stats['first_name']) * 1000:>6.0f}ms"
+            if stats["first_name"]
+            else f"{'-':>8}"
+        )
+        if latencies:
+            p50, p95, p99 = (
+                f"{percentile(latencies, q) * 1000:>6.0f}ms" for q in (0.5, 0.95, 0.99)
+            )
+        else:
+            p50 = p95 = p99 = f"{'-':>8}"
+        print(
+            f"{concurrency:>7} {len(latencies) / stats['elapsed']:>8.1f} "
+            f"{p50} {p95} {p99} {first_name} {stats['errors']:>6} {fallback:>8} "
+            f"{(server.bytes_received - received_before) / sent:>12,.0f} "
+            f"{(server.bytes_sent - sent_before) / sent:>12,.0f}"
+        )
+
+    resilience = dict(service.resilience.stats)
+    if resilience:
+        print(f"\nresiliência: {resilience}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--max-concurrency", type=int, default=8)
+    arg_parser.add_argument(
+        "--requests", type=int, default=32, help="extrações por nível"
+    )
+    arg_parser.add_argument("--latency", default="lognormal:-1.2,0.4")
+    arg_parser.add_argument("--stream", action="store_true")
+    arg_parser.add_argument("--chunk-delay", type=float, default=0.005)
+    arg_parser.add_argument("--malformed-rate", type=float, default=0.0)
+    arg_parser.add_argument("--no-structured-output", action="store_true")
+    arg_parser.add_argument("--max-edge", type=int, default=1024)
+    arg_parser.add_argument("--seed", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    try:
+        latency = latency_distribution(args.latency, rng)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        arg_parser.error(str(e))
+
+    photo = synthetic_photo()
+    options = ImageOptions(max_edge=args.max_edge) if imaging.is_available() else None
+    encode = measure_encode(photo, options, repeat=3)
+    print(
+        f"foto: {len(photo) / 1024:.0f} KiB, preparo + base64: {encode * 1000:.1f}ms"
+        + ("" if imaging.is_available() else " (sem Pillow, sem redimensionar)")
+    )
+    print(
+        f"latência: {args.latency}, streaming: {'sim' if args.stream else 'não'}, "
+        f"JSON malformado: {args.malformed_rate:.0%}\n"
+    )
+
+    with FakeOpenAIServer(
+        latency=latency,
+        chunk_delay=args.chunk_delay if args.stream else 0.0,
+        malformed_rate=args.malformed_rate,
+        keep_requests=False,
+        seed=args.seed,
+    ) as server:
+        asyncio.run(run(args, photo, server))
+
+
+if __name__ == "__main__":
+    main()
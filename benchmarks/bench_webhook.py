@@ -0,0 +1,115 @@
+"""
+Mede a latência do bot em modo webhook: updates sintéticos são enviados por
+HTTP ao servidor embutido e o tempo é contado até a resposta do bot chegar à
+Bot API falsa (sem acesso ao Telegram).
+
+Uso:
+    poetry run python benchmarks/bench_webhook.py [--users 5] [--messages 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inventorybot.testing.fake_telegram import (  # noqa: E402
+    FakeTelegramRequest,
+    free_port,
+    message_update,
+    post_update,
+)
+
+REPLY_METHODS = {"sendMessage", "sendPhoto", "editMessageText", "editMessageCaption"}
+SECRET = "bench-secret"
+
+
+def configure_env(vault: str) -> None:
+    os.environ.setdefault("TELEGRAM_TOKEN", "123:BENCH")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    os.environ["OUTPUT_DIR"] = vault
+    os.environ["ALLOWED_USER_IDS"] = "[]"
+    os.environ["VISION_CACHE_PATH"] = ""
+    os.environ["INDEX_REFRESH_INTERVAL"] = "0"
+    # Sem agrupar edições: cada mensagem gera uma resposta imediata
+    os.environ["SUMMARY_DEBOUNCE"] = "0"
+
+
+def replies(request: FakeTelegramRequest, chat_id: int) -> int:
+    return sum(
+        1
+        for call in request.calls
+        if call.method in REPLY_METHODS and call.params.get("chat_id") == chat_id
+    )
+
+
+async def run_user(url, request, user_id, messages, latencies):
+    texts = ["/start"] + [f"Item {i} do usuário {user_id}" for i in range(messages - 1)]
+    for text in texts:
+        expected = replies(request, user_id) + 1
+        start = time.perf_counter()
+        status = await post_update(url, message_update(user_id, text), SECRET)
+        assert status == 200, status
+        await request.wait_until(lambda: replies(request, user_id) >= expected)
+        latencies.append(time.perf_counter() - start)
+
+
+async def bench(users: int, messages: int):
+    import main
+
+    request = FakeTelegramRequest()
+    app = main.build_application(request)
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/telegram"
+
+    latencies: list[float] = []
+    async with app:
+        await main.post_init(app)
+        await app.start()
+        await app.updater.start_webhook(
+            port=port, url_path="telegram", secret_token=SECRET
+        )
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    run_user(url, request, 1000 + user, messages, latencies)
+                    for user in range(users)
+                )
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            await app.updater.stop()
+            await app.stop()
+            await main.post_shutdown(app)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)]
+    print(f"{len(latencies)} updates de {users} usuários em {elapsed:.2f}s")
+    print(f"vazão: {len(latencies) / elapsed:.1f} updates/s")
+    print(
+        f"latência: p50 {statistics.median(latencies) * 1000:.1f}ms, "
+        f"p95 {p95 * 1000:.1f}ms, máx {latencies[-1] * 1000:.1f}ms"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--users", type=int, default=5)
+    arg_parser.add_argument("--messages", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as vault:
+        configure_env(vault)
+        asyncio.run(bench(args.users, args.messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Teste de carga de ponta a ponta: monta a aplicação real de `main.py` com a Bot
+API falsa e um servidor de visão falso, e repete conversas completas (foto ->
+análise -> edição de campos -> gravação) para vários usuários ao mesmo tempo,
+num vault temporário.
+
+Uso:
+    poetry run python benchmarks/load_harness.py [--users 20] [--items 5]
+    poetry run python benchmarks/load_harness.py --users 50 --vision-latency 0.5
+
+Mostra histogramas de latência por handler, o atraso do event loop e a taxa de
+arquivos gravados no vault. Útil como benchmark de regressão sempre que os
+handlers de `main.py` mudarem.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inventorybot import imaging  # noqa: E402
+from inventorybot.testing.fake_openai import FakeOpenAIServer  # noqa: E402
+from inventorybot.testing.fake_telegram import (  # noqa: E402
+    FakeTelegramRequest,
+    callback_update,
+    message_update,
+    photo_update,
+)
+
+# Limites superiores dos baldes do histograma, em ms
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+STEP_TIMEOUT = 60.0
+
+
+def configure_env(vault: str, base_url: str, stream: bool) -> None:
+    os.environ.setdefault("TELEGRAM_TOKEN", "123:LOAD")
+    os.environ["OPENAI_API_KEY"] = "sk-load"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OUTPUT_DIR"] = vault
+    os.environ["ALLOWED_USER_IDS"] = "[]"
+    os.environ["VISION_CACHE_PATH"] = ""
+    os.environ["INDEX_REFRESH_INTERVAL"] = "0"
+    os.environ["WRITE_BEHIND_DIR"] = os.path.join(vault, ".write-behind")
+    os.environ["SUMMARY_DEBOUNCE"] = "0"
+    os.environ["VISION_STREAM"] = "true" if stream else "false"
+
+
+def sample_photo() -> bytes:
+    if not imaging.is_available():
+        return b"\xff\xd8\xff\xd9"
+
+    from PIL import Image
+
+    image = Image.effect_noise((1280, 960), 40).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class DistinctPhotosRequest(FakeTelegramRequest):
+    """Cada foto baixada tem bytes próprios, para não cair no cache de visão."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        if "/file/bot" in url:
+            return 200, self.file_content + url.encode()
+        return await super().do_request(url, method, *args, **kwargs)
+
+
+class Recorder:
+    """
+    Mede cada handler (envolvendo os callbacks registrados na aplicação) e
+    conta os eventos de cada usuário, para que o roteiro espere a resposta
+    do bot antes de seguir, como um usuário de verdade.
+    """
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self._events: dict[int, Counter[str]] = defaultdict(Counter)
+        self._changed = asyncio.Condition()
+
+    def wrap(self, name, callback, user_of, event: str):
+        @wraps(callback)
+        async def timed(*args, **kwargs):
+            label = name(*args) if callable(name) else name
+            start = time.perf_counter()
+            try:
+                return await callback(*args, **kwargs)
+            except Exception:
+                self.errors[label] += 1
+                raise
+            finally:
+                self.latencies[label].append(time.perf_counter() - start)
+                await self._notify(user_of(*args), event)
+
+        return timed
+
+    async def _notify(self, user_id: int, event: str) -> None:
+        async with self._changed:
+            self._events[user_id][event] += 1
+            self._changed.notify_all()
+
+    def counts(self, user_id: int) -> Counter[str]:
+        return self._events[user_id].copy()
+
+    async def wait(self, user_id: int, before: Counter[str], events) -> None:
+        def ready():
+            current = self._events[user_id]
+            return all(current[event] > before[event] for event in events)
+
+        async with self._changed:
+            await asyncio.wait_for(self._changed.wait_for(ready), STEP_TIMEOUT)
+
+
+def instrument(main, app, recorder: Recorder) -> None:
+    def handler_name(callback):
+        if callback.__name__ == "button_handler":
+            return lambda update, context: (
+                f"button_handler[{update.callback_query.data}]"
+            )
+        return callback.__name__
+
+    for handler in app.handlers.get(0, []):
+        handler.callback = recorder.wrap(
+            handler_name(handler.callback),
+            handler.callback,
+            lambda update, context: update.effective_user.id,
+            "handled",
+        )
+
+    # Tarefas em segundo plano, chamadas pelo nome global no módulo
+    main.push_summary = recorder.wrap(
+        "push_summary",
+        main.push_summary,
+        lambda bot, chat_id, context: chat_id,
+        "summary",
+    )
+    main.run_vision_extraction = recorder.wrap(
+        "run_vision_extraction",
+        main.run_vision_extraction,
+        lambda query, *args: query.from_user.id,
+        "vision",
+    )
+
+
+async def monitor_loop_lag(samples: list[float], interval: float = 0.01) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - start - interval, 0.0))
+
+
+async def run_user(main, app, recorder: Recorder, user_id: int, items: int) -> None:
+    from telegram import Update
+
+    async def step(data: dict, *events: str) -> None:
+        before = recorder.counts(user_id)
+        await app.update_queue.put(Update.de_json(data, app.bot))
+        await recorder.wait(user_id, before, ("handled", *events))
+
+    def summary_id() -> int:
+        return app.user_data[user_id]["summary"]["message_id"]
+
+    async def edit(button: str, text: str) -> None:
+        await step(callback_update(user_id, button, summary_id()))
+        await step(message_update(user_id, text), "summary")
+
+    await step(message_update(user_id, "/start"))
+    for number in range(items):
+        await step(
+            photo_update(
+                user_id,
+                file_id=f"photo-{user_id}-{number}",
+                caption=f"Item {number} do usuário {user_id}",
+            ),
+            "summary",
+        )
+        await step(
+            callback_update(user_id, "extract_vision_data", summary_id()), "vision"
+        )
+        await edit("edit_description", f"Descrição do item {number}")
+        await edit("edit_quantidade", str(number + 1))
+        await edit("edit_location", f"Prateleira {user_id % 5}")
+        await step(callback_update(user_id, "save_item", summary_id()))
+
+
+def count_files(vault: str) -> int:
+    return sum(
+        1
+        for directory in ("Itens", "Itens/attachments", "Locais")
+        if os.path.isdir(os.path.join(vault, directory))
+        for entry in os.scandir(os.path.join(vault, directory))
+        if entry.is_file() and not entry.name.startswith(".")
+    )
+
+
+def print_histogram(name: str, samples: list[float], errors: int) -> None:
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000
+    print(
+        f"\n{name}: {len(samples)} chamadas, p50 {p50:.1f}ms, p99 {p99:.1f}ms, "
+        f"máx {samples[-1] * 1000:.1f}ms" + (f", {errors} erros" if errors else "")
+    )
+
+    counts = Counter()
+    for sample in samples:
+        bucket = next(limit for limit in BUCKETS if sample * 1000 <= limit)
+        counts[bucket] += 1
+    widest = max(counts.values())
+    for limit in BUCKETS:
+        if counts[limit]:
+            label = f">{BUCKETS[-2]:g}ms" if limit == BUCKETS[-1] else f"≤{limit:g}ms"
+            bar = "█" * max(1, round(counts[limit] / widest * 40))
+            print(f"  {label:>9} {counts[limit]:>6} {bar}")
+
+
+async def bench(args, vault: str, photo: bytes) -> None:
+    import main
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    recorder = Recorder()
+    request = DistinctPhotosRequest(file_content=photo)
+    app = main.build_application(request)
+    instrument(main, app, recorder)
+
+    lag: list[float] = []
+    async with app:
+        await main.post_init(app)
+        await app.start()
+        monitor = asyncio.create_task(monitor_loop_lag(lag))
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    run_user(main, app, recorder, 1000 + user, args.items)
+                    for user in range(args.users)
+                )
+            )
+            conversations = time.perf_counter() - start
+        finally:
+            await app.stop()
+            # Com write-behind, o que estiver pendente é gravado aqui
+            await main.post_shutdown(app)
+            elapsed = time.perf_counter() - start
+            monitor.cancel()
+
+    files = count_files(vault)
+    print(
+        f"{args.users} usuários x {args.items} itens: conversas em "
+        f"{conversations:.2f}s, {len(request.calls)} chamadas à Bot API"
+    )
+    print(f"arquivos gravados: {files} ({files / elapsed:.1f}/s)")
+
+    lag.sort()
+    if lag:
+        print(
+            f"atraso do event loop: p50 {lag[len(lag) // 2] * 1000:.1f}ms, "
+            f"p99 {lag[int(len(lag) * 0.99)] * 1000:.1f}ms, "
+            f"máx {lag[-1] * 1000:.1f}ms"
+        )
+
+    for name in sorted(recorder.latencies):
+        print_histogram(name, recorder.latencies[name], recorder.errors[name])
+
+    if main.vision_service:
+        print(f"\nvisão: {dict(main.vision_service.resilience.stats)}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--users", type=int, default=20)
+    arg_parser.add_argument("--items", type=int, default=5, help="itens por usuário")
+    arg_parser.add_argument(
+        "--vision-latency", type=float, default=0.2, help="segundos por análise"
+    )
+    arg_parser.add_argument("--no-stream", action="store_true")
+    args = arg_parser.parse_args()
+
+    photo = sample_photo()
+    with (
+        tempfile.TemporaryDirectory() as vault,
+        FakeOpenAIServer(latency=args.vision_latency, keep_requests=False) as server,
+    ):
+        configure_env(vault, server.base_url, stream=not args.no_stream)
+        asyncio.run(bench(args, vault, photo))
+
+
+if __name__ == "__main__":
+    main()
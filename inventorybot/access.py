@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Collection
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes, TypeHandler
+
+logger = logging.getLogger(__name__)
+
+DENIED_MESSAGE = "Você não tem permissão para usar este bot."
+
+# Comandos liberados para qualquer usuário (ex.: descobrir o próprio id)
+PUBLIC_COMMANDS = ("myid",)
+
+
+def is_allowed(update: Update, allowed_user_ids: Collection[int]) -> bool:
+    """Lista vazia libera todos os usuários."""
+    if not allowed_user_ids:
+        return True
+    user = update.effective_user
+    return user is not None and user.id in allowed_user_ids
+
+
+def is_admin(update: Update, admin_user_ids: Collection[int]) -> bool:
+    """Ao contrário de `is_allowed`, lista vazia não libera ninguém."""
+    user = update.effective_user
+    return user is not None and user.id in admin_user_ids
+
+
+def _is_public_command(update: Update) -> bool:
+    message = update.effective_message
+    if not message or not message.text or not message.text.startswith("/"):
+        return False
+    command = message.text.split()[0][1:].split("@")[0]
+    return command in PUBLIC_COMMANDS
+
+
+def access_gate(allowed_user_ids: Collection[int]) -> TypeHandler:
+    """
+    Handler que barra usuários não autorizados antes de qualquer outro:
+    deve ser registrado num grupo anterior aos demais (ex.: `group=-1`).
+    """
+    allowed_user_ids = frozenset(allowed_user_ids)
+
+    async def gate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if is_allowed(update, allowed_user_ids) or _is_public_command(update):
+            return
+
+        logger.info(
+            "Update de usuário não autorizado ignorado: %s",
+            update.effective_user.id if update.effective_user else None,
+        )
+        if update.callback_query:
+            await update.callback_query.answer(DENIED_MESSAGE, show_alert=True)
+        elif update.effective_message:
+            await update.effective_message.reply_text(DENIED_MESSAGE)
+        raise ApplicationHandlerStop
+
+    return TypeHandler(Update, gate)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable
+from contextlib import AsyncExitStack
+from typing import Any, Hashable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def update_keys(update: object) -> list[Hashable]:
+    """Chaves de serialização de um update: o chat e o usuário envolvidos."""
+    if not isinstance(update, Update):
+        return []
+
+    keys: list[Hashable] = []
+    if update.effective_chat:
+        keys.append(("chat", update.effective_chat.id))
+    if update.effective_user:
+        keys.append(("user", update.effective_user.id))
+    return keys
+
+
+class ChatSerializingUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processa updates de chats diferentes em paralelo (até
+    `max_concurrent_updates` ao mesmo tempo), mas os de um mesmo chat/usuário
+    um de cada vez e na ordem de chegada, já que os handlers leem e alteram
+    `context.user_data`/`context.chat_data` sem outra sincronização.
+
+    O lock do chat é obtido antes do semáforo global, para que updates
+    esperando a vez de um chat ocupado não tomem vagas dos demais.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # chave -> [lock, quantidade de updates usando/esperando]
+        self._locks: dict[Hashable, list] = {}
+
+    async def process_update(
+        self, update: object, coroutine: Awaitable[Any]
+    ) -> None:
+        # Ordem fixa de aquisição: um update de grupo trava chat e usuário
+        # sem risco de deadlock com um update privado do mesmo usuário
+        keys = sorted(update_keys(update), key=repr)
+        for key in keys:
+            self._locks.setdefault(key, [asyncio.Lock(), 0])[1] += 1
+
+        try:
+            async with AsyncExitStack() as stack:
+                for key in keys:
+                    await stack.enter_async_context(self._locks[key][0])
+                await super().process_update(update, coroutine)
+        finally:
+            for key in keys:
+                entry = self._locks[key]
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    async def do_process_update(
+        self, update: object, coroutine: Awaitable[Any]
+    ) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class Debouncer:
+    """
+    Agrupa chamadas repetidas por chave: a primeira chamada agenda `callback`
+    para daqui a `delay` segundos e as seguintes, até ela rodar, são
+    absorvidas. O callback deve ler o estado atual ao executar, então uma
+    rajada de edições resulta numa única atualização com o estado final.
+    """
+
+    def __init__(self, delay: float, leading: bool = False):
+        self.delay = delay
+        # leading=True: a primeira chamada roda na hora e as seguintes, no
+        # máximo uma a cada `delay` segundos (throttle)
+        self.leading = leading
+        self._pending: dict[Hashable, asyncio.Task] = {}
+        # Execuções com o callback em andamento
+        self._running: dict[Hashable, set[asyncio.Task]] = {}
+        self._last_run: dict[Hashable, float] = {}
+
+    def call(self, key: Hashable, callback: Callable[[], Awaitable[None]]) -> None:
+        if key in self._pending:
+            return
+
+        delay = self.delay
+        if self.leading:
+            elapsed = asyncio.get_running_loop().time() - self._last_run.get(
+                key, float("-inf")
+            )
+            delay = max(self.delay - elapsed, 0)
+
+        self._pending[key] = asyncio.create_task(
+            self._run_later(key, callback, delay)
+        )
+
+    def cancel(self, key: Hashable) -> None:
+        """Descarta a execução pendente; a que já começou segue até o fim."""
+        self._last_run.pop(key, None)
+        task = self._pending.pop(key, None)
+        if task:
+            task.cancel()
+
+    async def cancel_and_wait(self, key: Hashable) -> None:
+        """
+        Como `cancel`, mas também espera o callback que já estiver rodando: o
+        que for feito depois (ex.: a edição final de uma mensagem) não é
+        sobrescrito por ele.
+        """
+        self.cancel(key)
+        current = asyncio.current_task()
+        running = [task for task in self._running.get(key, ()) if task is not current]
+        if running:
+            await asyncio.wait(running)
+
+    async def _run_later(
+        self, key: Hashable, callback: Callable[[], Awaitable[None]], delay: float
+    ) -> None:
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            # Chamadas feitas a partir daqui agendam uma nova execução
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+
+        if self.leading:
+            self._last_run[key] = asyncio.get_running_loop().time()
+
+        task = asyncio.current_task()
+        running = self._running.setdefault(key, set())
+        running.add(task)
+        try:
+            await callback()
+        except Exception as e:
+            logger.exception("Erro na execução adiada (%s): %s", key, e)
+        finally:
+            running.discard(task)
+            if not running and self._running.get(key) is running:
+                del self._running[key]
@@ -1,8 +1,11 @@
 import os
 import random
 import string
-from dataclasses import dataclass
-from typing import Optional
+import threading
+import weakref
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import ClassVar, Optional
 from enum import Enum
 
 from slugify import slugify
@@ -16,13 +19,37 @@ class Status(Enum):
     QUEBRADO = "quebrado"
 
 
-@dataclass
+@lru_cache(maxsize=65536)
+def _slug(name: str) -> str:
+    return slugify(name)
+
+
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Location:
+    """
+    Imutável: a mesma caixa pode ser compartilhada por muitos itens. Use
+    `Location.intern` para reaproveitar a instância já existente.
+    """
+
     name: str
     location: Optional["Location"] = None
 
+    # Localizações em uso, por (nome, pai); somem quando nenhum item as usa
+    _registry: ClassVar[weakref.WeakValueDictionary] = weakref.WeakValueDictionary()
+    _registry_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def intern(cls, name: str, location: Optional["Location"] = None) -> "Location":
+        """A instância única de `name` dentro de `location` (o pai)."""
+        key = (name, location)
+        with cls._registry_lock:
+            existing = cls._registry.get(key)
+            if existing is None:
+                existing = cls._registry[key] = cls(name, location)
+            return existing
+
     def filename(self):
-        return f"{slugify(self.name)} - Inventário"
+        return f"{_slug(self.name)} - Inventário"
 
     def __str__(self):
         return self.name
@@ -34,8 +61,16 @@ class Location:
             "location": self.location.to_dict() if self.location else "",
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "Location":
+        parent = data.get("location")
+        return cls.intern(
+            data["name"],
+            location=cls.from_dict(parent) if parent else None,
+        )
 
-@dataclass
+
+@dataclass(slots=True)
 class Item:
     NUM_RANDOM_CHARS_FILENAME = 6
 
@@ -45,6 +80,10 @@ class Item:
     size: Optional[str] = None
     status: Status = Status.DISPONIVEL
     photo: Optional[str] = None
+    # file_id da foto no Telegram, para reenviá-la sem novo upload
+    photo_file_id: Optional[str] = None
+    # Foto mantida em memória (sem arquivo temporário) até a gravação no vault
+    photo_data: Optional[bytes] = field(default=None, repr=False)
     tags: Optional[list[str]] = None
 
     borrowed_by: Optional[str] = None
@@ -52,6 +91,11 @@ class Item:
 
     location: Optional[Location] = None
 
+    # Análise de imagem (fora do vault): nome e descrição que o usuário tinha
+    # informado antes da análise e os valores que ela escreveu no item
+    vision_hints: Optional[dict[str, str]] = field(default=None, repr=False)
+    vision_values: Optional[dict[str, str]] = field(default=None, repr=False)
+
     def validate(self):
         if self.name is None:
             raise ValueError("Nome é obrigatório")
@@ -76,6 +120,25 @@ class Item:
             "location": self.location.to_dict() if self.location else None,
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "Item":
+        location = data.get("location")
+        return cls(
+            name=data.get("name"),
+            description=data.get("description") or None,
+            quantity=data.get("quantity"),
+            size=data.get("size") or None,
+            status=Status(data.get("status", Status.DISPONIVEL.value)),
+            photo=data.get("photo") or None,
+            tags=data.get("tags") or [],
+            borrowed_by=data.get("borrowed_by"),
+            borrowed_date=data.get("borrowed_date"),
+            location=Location.from_dict(location) if location else None,
+        )
+
+    def has_photo(self) -> bool:
+        return bool(self.photo or self.photo_data)
+
     def cover_filename(self):
         if not self.photo:
             return None
@@ -90,7 +153,7 @@ class Item:
             for _ in range(self.NUM_RANDOM_CHARS_FILENAME)
         )
 
-        return f"{slugify(self.name)}-{random_id}"
+        return f"{_slug(self.name)}-{random_id}"
 
     def __str__(self):
         return f"{self.name} ({self.quantity})"
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import importlib.util
+import io
+import logging
+from dataclasses import dataclass
+from functools import cache
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+@dataclass
+class ImageOptions:
+    """Parâmetros de redimensionamento/recompressão antes do envio ao modelo."""
+
+    max_edge: int = 1024
+    format: str = "jpeg"
+    quality: int = 80
+
+    def __post_init__(self):
+        self.format = self.format.lower()
+        if self.format not in FORMATS:
+            raise ValueError(
+                f"Formato inválido: {self.format} (use {', '.join(FORMATS)})"
+            )
+
+
+def is_available() -> bool:
+    # Só procura o pacote: o import fica para a primeira imagem
+    return importlib.util.find_spec("PIL") is not None
+
+
+@cache
+def _pillow():
+    """Módulos do Pillow, importados na primeira imagem (ou None, sem Pillow)."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:  # sem Pillow a imagem segue sem alterações
+        return None
+    return Image, ImageOps
+
+
+def prepare_image(
+    data: bytes, mime: str, options: ImageOptions | None
+) -> tuple[bytes, str]:
+    """
+    Reduz a imagem para que o maior lado tenha no máximo `options.max_edge`
+    pixels e recomprime no formato/qualidade configurados.
+
+    Devolve os bytes originais quando Pillow não está instalado, quando a
+    imagem não pode ser lida ou quando a recompressão não reduz o tamanho.
+    """
+    pillow = _pillow() if options is not None else None
+    if pillow is None:
+        return data, mime
+    Image, ImageOps = pillow
+
+    pil_format, pil_mime = FORMATS[options.format]
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            resized = max(image.size) > options.max_edge
+
+            # Para JPEG, decodifica já em escala reduzida (bem mais rápido)
+            image.draft("RGB", (options.max_edge, options.max_edge))
+            image = ImageOps.exif_transpose(image)
+            if max(image.size) > options.max_edge:
+                image.thumbnail(
+                    (options.max_edge, options.max_edge), Image.Resampling.LANCZOS
+                )
+
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+
+            buffer = io.BytesIO()
+            image.save(buffer, format=pil_format, quality=options.quality)
+    except (OSError, ValueError) as e:
+        logger.warning("Não foi possível pré-processar a imagem: %s", e)
+        return data, mime
+
+    encoded = buffer.getvalue()
+    if not resized and len(encoded) >= len(data):
+        return data, mime
+
+    return encoded, pil_mime
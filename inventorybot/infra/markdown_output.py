@@ -1,4 +1,9 @@
+import asyncio
+import errno
 import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from yaml import load, dump
 
@@ -7,7 +12,9 @@ try:
 except ImportError:
     from yaml import Loader, Dumper
 
+from inventorybot import metrics
 from inventorybot.entities import Item, Location
+from inventorybot.infra.vault_index import VaultIndex
 
 
 def _dump_properties(properties):
@@ -21,32 +28,207 @@ def _dump_properties(properties):
     return content
 
 
-class MarkdownOutput:
-    def __init__(self, filepath):
-        self.filepath = filepath
+def _file_mode() -> int:
+    """Permissões que um `open()` comum daria a um arquivo novo (0666 - umask)."""
+    # Não há como ler a umask sem alterá-la (e ela vale para o processo todo)
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
 
-    async def save(self, item: Item) -> Item:
-        item.validate()
 
-        item_filename = item.filename()
+def _mkstemp(directory: str, mode: int) -> tuple[int, str]:
+    """
+    Temporário no diretório de destino. O `mkstemp` cria o arquivo com 0600 e o
+    rename preservaria esse modo; aplica `mode` para que o vault continue
+    legível por outros usuários, NAS e serviços de sincronização.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        os.fchmod(fd, mode)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    return fd, tmp_path
 
-        item_dir = os.path.join(self.filepath, "Itens")
-        os.makedirs(item_dir, exist_ok=True)
 
-        full_path = f"{os.path.join(item_dir, item_filename)}.md"
-        cover_filepath = self._cover(item, item_filename)
-        if cover_filepath:
-            item.photo = cover_filepath
+def _fsync_dir(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
-        content = self._content(item)
 
-        with open(full_path, "w") as file:
-            file.write(content)
+class MarkdownOutput:
+    """
+    Grava itens e localizações como notas Markdown no vault.
+
+    A escrita roda num executor (uma thread dedicada por padrão), para que um
+    vault lento (ex.: NAS) não trave o event loop. Cada arquivo é gravado num
+    temporário no mesmo diretório e renomeado por cima do destino, então uma
+    queda nunca deixa uma nota pela metade. Com `fsync=True`, os dados de cada
+    arquivo são sincronizados antes do rename e os diretórios tocados são
+    sincronizados uma única vez ao final de cada gravação.
+    """
+
+    def __init__(
+        self,
+        filepath,
+        index: VaultIndex | None = None,
+        fsync: bool = False,
+        executor: ThreadPoolExecutor | None = None,
+    ):
+        self.filepath = filepath
+        self.index = index
+        self.fsync = fsync
+
+        self.items_dir = os.path.join(filepath, "Itens")
+        self.attachments_dir = os.path.join(self.items_dir, "attachments")
+        self.locations_dir = os.path.join(filepath, "Locais")
+
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="markdown-output"
+        )
+        self._dirs_ready = False
+        # Lida na construção (no início do bot), não a cada gravação
+        self._file_mode = _file_mode()
+
+    def ensure_dirs(self):
+        """Cria os diretórios do vault (uma vez, na inicialização)."""
+        if self._dirs_ready:
+            return
 
-        self._ensure_location(item.location)
+        for directory in (self.items_dir, self.attachments_dir, self.locations_dir):
+            os.makedirs(directory, exist_ok=True)
+        self._dirs_ready = True
 
+    async def save(self, item: Item, item_filename: str | None = None) -> Item:
+        [item] = await self.save_many([item], [item_filename])
         return item
 
+    async def save_many(
+        self, items: list[Item], item_filenames: list[str | None] | None = None
+    ) -> list[Item]:
+        """
+        Grava vários itens numa única ida ao executor: cada localização é
+        verificada/criada uma só vez e os diretórios são sincronizados uma vez
+        por lote. `item_filenames` permite fixar o nome dos arquivos (gravação
+        idempotente); se omitido, cada item recebe um nome novo.
+        """
+        for item in items:
+            item.validate()
+
+        if item_filenames is None:
+            item_filenames = [None] * len(items)
+
+        loop = asyncio.get_running_loop()
+        with metrics.OUTPUT_SAVE_SECONDS.time():
+            written = await loop.run_in_executor(
+                self._executor, self._save_batch, items, item_filenames
+            )
+
+        # O índice é atualizado no event loop, onde também é lido
+        self._index_written(written)
+
+        return items
+
+    def _save_batch(
+        self, items: list[Item], item_filenames: list[str | None]
+    ) -> list[tuple[str, os.stat_result, object]]:
+        self.ensure_dirs()
+
+        written = []
+        touched_dirs = set()
+        known_locations = set()
+
+        for item, item_filename in zip(items, item_filenames):
+            item_filename = item_filename or item.filename()
+            full_path = f"{os.path.join(self.items_dir, item_filename)}.md"
+
+            cover_filepath = self._cover(item, item_filename)
+            if cover_filepath:
+                item.photo = cover_filepath
+                item.photo_data = None
+                touched_dirs.add(self.attachments_dir)
+
+            stat = self._write(full_path, self._content(item))
+            written.append((full_path, stat, item))
+            touched_dirs.add(self.items_dir)
+
+            location = item.location
+            if location and location.filename() not in known_locations:
+                known_locations.add(location.filename())
+                location_written = self._ensure_location(location)
+                if location_written:
+                    written.append(location_written)
+                    touched_dirs.add(self.locations_dir)
+
+        if self.fsync:
+            for directory in touched_dirs:
+                _fsync_dir(directory)
+
+        return written
+
+    def _index_written(self, written):
+        if self.index is None:
+            return
+
+        for path, stat, entity in written:
+            if isinstance(entity, Item):
+                self.index.add_item(path, entity, stat)
+            else:
+                self.index.add_location(path, entity, stat)
+
+    def _write(self, path: str, content: str | bytes) -> os.stat_result:
+        """Grava `content` em `path` de forma atômica (temporário + rename)."""
+        directory = os.path.dirname(path)
+        fd, tmp_path = _mkstemp(directory, self._file_mode)
+        if isinstance(content, str):
+            file = os.fdopen(fd, "w", encoding="utf-8")
+        else:
+            file = os.fdopen(fd, "wb")
+        try:
+            with file:
+                file.write(content)
+                if self.fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        metrics.FILES_WRITTEN.inc()
+        return os.stat(path)
+
+    def _move(self, source: str, destination: str):
+        """Move um arquivo, copiando de forma atômica entre sistemas de arquivos."""
+        try:
+            os.replace(source, destination)
+            metrics.FILES_WRITTEN.inc()
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+        fd, tmp_path = _mkstemp(os.path.dirname(destination), self._file_mode)
+        try:
+            with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+                if self.fsync:
+                    dst.flush()
+                    os.fsync(dst.fileno())
+            os.replace(tmp_path, destination)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        os.unlink(source)
+        metrics.FILES_WRITTEN.inc()
+
     def _content(self, item: Item):
         # File obsidian properties in yaml
         properties = item.to_dict()
@@ -80,36 +262,41 @@ class MarkdownOutput:
         item: Item,
         item_filename: str,
     ) -> str | None:
-        if not item.photo:
+        if not item.has_photo():
             return None
 
         cover_filename = f"{item_filename}.jpg"
-        cover_dir = os.path.join(self.filepath, "Itens", "attachments")
-        os.makedirs(cover_dir, exist_ok=True)
+        cover_filepath = os.path.join(self.attachments_dir, cover_filename)
 
-        cover_filepath = os.path.join(cover_dir, cover_filename)
+        # Foto em memória: é escrita direto no destino, uma única vez
+        if item.photo_data is not None:
+            self._write(cover_filepath, item.photo_data)
+            return cover_filepath
+
+        # Regravação (ex.: replay do journal): a foto já foi movida
+        if item.photo == cover_filepath or (
+            not os.path.exists(item.photo) and os.path.exists(cover_filepath)
+        ):
+            return cover_filepath
 
         print("Moving", item.photo, "to", cover_filepath)
 
         # move photo filename to attachments folder
-        os.rename(item.photo, cover_filepath)
+        self._move(item.photo, cover_filepath)
 
         return cover_filepath
 
     def _ensure_location(self, location: Location):
         if not location:
-            return
+            return None
 
         filename = location.filename()
         location_filename = f"{filename}.md"
-        location_dir = os.path.join(self.filepath, "Locais")
-        os.makedirs(location_dir, exist_ok=True)
-
-        location_filepath = os.path.join(location_dir, location_filename)
+        location_filepath = os.path.join(self.locations_dir, location_filename)
 
         # if file exists, do nothing
         if os.path.exists(location_filepath):
-            return
+            return None
 
         properties = location.to_dict()
         if "filename" in properties:
@@ -118,5 +305,5 @@ class MarkdownOutput:
         content = _dump_properties(properties)
         content.append(f"# {location.name}")
 
-        with open(location_filepath, "w") as file:
-            file.write("\n".join(content))
+        stat = self._write(location_filepath, "\n".join(content))
+        return (location_filepath, stat, location)
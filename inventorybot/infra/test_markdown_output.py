@@ -0,0 +1,108 @@
+import asyncio
+import errno
+import os
+
+import pytest
+
+from inventorybot.entities import Item, Location
+from inventorybot.infra.markdown_output import MarkdownOutput
+
+
+def test_save_writes_note_cover_and_location(tmp_path):
+    """Test a full save with photo, in fsync mode."""
+    photo = tmp_path / "photo.tmp"
+    photo.write_bytes(b"jpeg")
+    output = MarkdownOutput(str(tmp_path / "vault"), fsync=True)
+
+    item = asyncio.run(
+        output.save(
+            Item(name="Martelo", quantity=1, photo=str(photo), location=Location("Caixa"))
+        )
+    )
+
+    assert not photo.exists()
+    assert open(item.photo, "rb").read() == b"jpeg"
+    [note] = [name for name in os.listdir(output.items_dir) if name.endswith(".md")]
+    content = open(os.path.join(output.items_dir, note), encoding="utf-8").read()
+    assert "# Martelo" in content
+    assert f"![[{item.cover_filename()}]]" in content
+    assert os.listdir(output.locations_dir) == ["caixa - Inventário.md"]
+
+
+def test_save_leaves_no_temporary_files(tmp_path):
+    """Test that atomic writes clean up after themselves."""
+    output = MarkdownOutput(str(tmp_path))
+
+    async def save_many():
+        for i in range(3):
+            await output.save(Item(name=f"Item {i}", quantity=1, location=Location("A")))
+
+    asyncio.run(save_many())
+
+    names = os.listdir(output.items_dir) + os.listdir(output.locations_dir)
+    assert not [name for name in names if name.endswith(".tmp")]
+    assert len(os.listdir(output.locations_dir)) == 1
+
+
+def test_save_validates_before_writing(tmp_path):
+    """Test that invalid items never reach the executor."""
+    output = MarkdownOutput(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        asyncio.run(output.save(Item(name="Sem local", quantity=1)))
+
+    assert not os.path.exists(output.items_dir)
+
+
+def test_save_writes_in_memory_photo_once(tmp_path):
+    """Test that a photo kept in memory is written straight to the attachments."""
+    output = MarkdownOutput(str(tmp_path))
+
+    item = asyncio.run(
+        output.save(
+            Item(name="Serrote", quantity=1, photo_data=b"jpeg", location=Location("A"))
+        )
+    )
+
+    assert item.photo_data is None
+    assert os.path.dirname(item.photo) == output.attachments_dir
+    assert open(item.photo, "rb").read() == b"jpeg"
+    assert os.listdir(output.attachments_dir) == [os.path.basename(item.photo)]
+
+
+@pytest.mark.parametrize("umask", [0o022, 0o027])
+def test_save_creates_files_with_the_umask_mode(tmp_path, umask):
+    """Test that notes, locations and moved photos follow the umask, not 0600."""
+    photo = tmp_path / "photo.tmp"
+    photo.write_bytes(b"jpeg")
+    previous = os.umask(umask)
+    try:
+        output = MarkdownOutput(str(tmp_path / "vault"))
+    finally:
+        os.umask(previous)
+
+    # Força a cópia entre sistemas de arquivos, como num vault em outro disco
+    real_replace = os.replace
+
+    def replace(source, destination):
+        if source == str(photo):
+            raise OSError(errno.EXDEV, "cross-device link")
+        return real_replace(source, destination)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(os, "replace", replace)
+        item = asyncio.run(
+            output.save(
+                Item(name="Martelo", quantity=1, photo=str(photo), location=Location("A"))
+            )
+        )
+
+    [note] = [name for name in os.listdir(output.items_dir) if name.endswith(".md")]
+    [location] = os.listdir(output.locations_dir)
+    paths = [
+        os.path.join(output.items_dir, note),
+        os.path.join(output.locations_dir, location),
+        item.photo,
+    ]
+    for path in paths:
+        assert os.stat(path).st_mode & 0o777 == 0o666 & ~umask
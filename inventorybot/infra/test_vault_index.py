@@ -0,0 +1,63 @@
+import asyncio
+import os
+
+from inventorybot.entities import Item, Location
+from inventorybot.infra.markdown_output import MarkdownOutput
+from inventorybot.infra.vault_index import VaultIndex
+
+
+def _save(output, **kwargs):
+    return asyncio.run(output.save(Item(quantity=1, **kwargs)))
+
+
+def test_save_updates_index_without_rescan(tmp_path):
+    """Test that MarkdownOutput.save keeps the index in sync."""
+    index = VaultIndex(str(tmp_path))
+    output = MarkdownOutput(str(tmp_path), index=index)
+
+    _save(output, name="Furadeira", tags=["ferramenta"], location=Location("Caixa 1"))
+
+    [record] = index.items.values()
+    assert record.name == "Furadeira"
+    assert record.tags == ("ferramenta",)
+    assert record.location == "caixa-1 - Inventário"
+    assert [loc.name for loc in index.locations.values()] == ["Caixa 1"]
+
+    result = index.scan()
+    assert (result.parsed, result.removed, result.unchanged) == (0, 0, 2)
+
+
+def test_scan_reads_existing_vault(tmp_path):
+    """Test that a fresh index parses the front matter written by MarkdownOutput."""
+    output = MarkdownOutput(str(tmp_path))
+    parent = Location("Armário")
+    _save(output, name="Martelo", description="Cabo de madeira", location=parent)
+    _save(output, name="Alicate", location=Location("Gaveta", location=parent))
+
+    index = VaultIndex(str(tmp_path))
+    result = index.scan()
+
+    assert result.parsed == 4
+    assert sorted(r.name for r in index.items.values()) == ["Alicate", "Martelo"]
+    drawer = next(r for r in index.locations.values() if r.name == "Gaveta")
+    assert drawer.parent == "armario - Inventário"
+    assert drawer.filename == "gaveta - Inventário"
+
+
+def test_scan_only_reparses_changed_files(tmp_path):
+    """Test incremental refresh based on mtime/size."""
+    output = MarkdownOutput(str(tmp_path))
+    _save(output, name="Martelo", location=Location("Caixa"))
+    _save(output, name="Serrote", location=Location("Caixa"))
+
+    index = VaultIndex(str(tmp_path))
+    index.scan()
+
+    [hammer, saw] = sorted(index.items, key=lambda p: index.items[p].name)
+    with open(hammer, "a") as file:
+        file.write("\nnota adicionada no Obsidian\n")
+    os.remove(saw)
+
+    result = asyncio.run(index.refresh())
+    assert (result.parsed, result.removed, result.unchanged) == (1, 1, 1)
+    assert [r.name for r in index.items.values()] == ["Martelo"]
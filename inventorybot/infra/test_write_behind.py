@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+import pytest
+
+from inventorybot.entities import Item, Location
+from inventorybot.infra.markdown_output import MarkdownOutput
+from inventorybot.infra.write_behind import WriteBehindOutput
+
+
+def _notes(output):
+    if not os.path.exists(output.items_dir):
+        return []
+    return sorted(name for name in os.listdir(output.items_dir) if name.endswith(".md"))
+
+
+def test_save_is_acknowledged_before_the_vault_write(tmp_path):
+    """Test that saves are journaled, then written by flush."""
+    markdown = MarkdownOutput(str(tmp_path / "vault"))
+    output = WriteBehindOutput(markdown, str(tmp_path / "wb"), max_latency=60)
+
+    async def run():
+        await output.start()
+        for name in ("Martelo", "Serrote"):
+            await output.save(Item(name=name, quantity=1, location=Location("Caixa")))
+
+        assert _notes(markdown) == []
+        assert output.pending == 2
+
+        assert await output.flush() == 2
+        await output.stop()
+
+    asyncio.run(run())
+    assert len(_notes(markdown)) == 2
+    assert os.path.getsize(output.journal_path) == 0
+
+
+def test_background_flush_respects_max_latency(tmp_path):
+    """Test that pending items are written without an explicit flush."""
+    markdown = MarkdownOutput(str(tmp_path / "vault"))
+    output = WriteBehindOutput(markdown, str(tmp_path / "wb"), max_latency=0.05)
+
+    async def run():
+        await output.start()
+        await output.save(Item(name="Alicate", quantity=1, location=Location("A")))
+        await asyncio.sleep(0.2)
+        assert output.pending == 0
+        await output.stop()
+
+    asyncio.run(run())
+    assert len(_notes(markdown)) == 1
+
+
+def test_unflushed_entries_are_replayed_on_start(tmp_path):
+    """Test crash recovery, including the spooled photo."""
+    photo = tmp_path / "photo.tmp"
+    photo.write_bytes(b"jpeg")
+    markdown = MarkdownOutput(str(tmp_path / "vault"))
+
+    async def crash():
+        output = WriteBehindOutput(markdown, str(tmp_path / "wb"), max_latency=60)
+        await output.start()
+        await output.save(
+            Item(
+                name="Lanterna",
+                quantity=2,
+                photo=str(photo),
+                location=Location("Gaveta", location=Location("Armário")),
+            )
+        )
+        # sem stop(): simula uma queda antes da gravação no vault
+
+    async def restart():
+        output = WriteBehindOutput(markdown, str(tmp_path / "wb"), max_latency=60)
+        assert await output.start() == 1
+        await output.stop()
+
+    asyncio.run(crash())
+    assert _notes(markdown) == []
+
+    asyncio.run(restart())
+    [note] = _notes(markdown)
+    content = open(os.path.join(markdown.items_dir, note), encoding="utf-8").read()
+    assert "quantity: 2" in content
+    assert os.listdir(markdown.attachments_dir) == [note.replace(".md", ".jpg")]
+    assert sorted(os.listdir(markdown.locations_dir)) == [
+        "gaveta - Inventário.md"
+    ]
+
+
+def test_save_many_journals_the_batch_in_one_write(tmp_path):
+    """Test that a batch is validated up front and appended to the journal once."""
+    markdown = MarkdownOutput(str(tmp_path / "vault"))
+    output = WriteBehindOutput(markdown, str(tmp_path / "wb"), max_latency=60)
+    box = Location.intern("Caixa")
+    items = [Item(name=f"Item {i}", quantity=1, location=box) for i in range(3)]
+
+    appends = []
+    append = output._append
+
+    def counting_append(entries, *args):
+        appends.append(len(entries))
+        append(entries, *args)
+
+    async def run():
+        await output.start()
+        with pytest.raises(ValueError):
+            await output.save_many(items + [Item(name="Sem local", quantity=1)])
+        assert output.pending == 0
+
+        output._append = counting_append
+        assert await output.save_many(items) == items
+        assert appends == [3]
+        await output.stop()
+
+    asyncio.run(run())
+    assert len(_notes(markdown)) == 3
+    assert os.listdir(markdown.locations_dir) == ["caixa - Inventário.md"]
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from yaml import load, YAMLError
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+from inventorybot.entities import Item, Location
+
+logger = logging.getLogger(__name__)
+
+ITEMS_DIR = "Itens"
+LOCATIONS_DIR = "Locais"
+
+
+@dataclass(slots=True)
+class ItemRecord:
+    path: str
+    name: str
+    description: str = ""
+    quantity: int | None = None
+    tags: tuple[str, ...] = ()
+    status: str | None = None
+    # nome do arquivo (sem extensão) da localização, ex.: "caixa-1 - Inventário"
+    location: str | None = None
+
+
+@dataclass(slots=True)
+class LocationRecord:
+    path: str
+    name: str
+    parent: str | None = None
+
+    @property
+    def filename(self) -> str:
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+
+Record = ItemRecord | LocationRecord
+
+# Chamado com (caminho, registro) a cada mudança; registro None = removido
+Listener = Callable[[str, Record | None], None]
+
+
+@dataclass
+class _Changes:
+    parsed: dict[str, tuple[tuple[int, int], Record | None]] = field(
+        default_factory=dict
+    )
+    removed: dict[str, tuple[int, int]] = field(default_factory=dict)
+    unchanged: int = 0
+
+
+@dataclass
+class ScanResult:
+    parsed: int
+    removed: int
+    unchanged: int
+
+
+def _unwrap_link(value: Any) -> str | None:
+    # "[[caixa-1 - Inventário]]" -> "caixa-1 - Inventário"
+    if not value or not isinstance(value, str):
+        return None
+    link = value.strip().removeprefix("[[").removesuffix("]]")
+    # Muitos itens na mesma caixa: uma única cópia do nome do arquivo
+    return sys.intern(link) if link else None
+
+
+def read_front_matter(path: str) -> dict[str, Any] | None:
+    with open(path, encoding="utf-8") as file:
+        if file.readline().rstrip() != "---":
+            return None
+
+        lines = []
+        for line in file:
+            if line.rstrip() == "---":
+                break
+            lines.append(line)
+        else:
+            return None
+
+    properties = load("".join(lines), Loader=SafeLoader)
+    return properties if isinstance(properties, dict) else None
+
+
+def parse_item(path: str, properties: dict[str, Any]) -> ItemRecord:
+    quantity = properties.get("quantity")
+    return ItemRecord(
+        path=path,
+        name=str(properties.get("name") or ""),
+        description=str(properties.get("description") or ""),
+        quantity=quantity if isinstance(quantity, int) else None,
+        tags=tuple(str(tag) for tag in properties.get("tags") or ()),
+        status=properties.get("status"),
+        location=_unwrap_link(properties.get("location")),
+    )
+
+
+def parse_location(path: str, properties: dict[str, Any]) -> LocationRecord:
+    parent = properties.get("location")
+    return LocationRecord(
+        path=path,
+        name=str(properties.get("name") or ""),
+        parent=parent.get("filename") if isinstance(parent, dict) else None,
+    )
+
+
+class VaultIndex:
+    """
+    Índice em memória das notas de itens (Itens/) e localizações (Locais/)
+    do vault, montado a partir do front matter YAML.
+
+    `scan`/`refresh` são incrementais: só relêem arquivos cujo mtime ou
+    tamanho mudou desde a última leitura. `MarkdownOutput` atualiza o índice
+    diretamente ao gravar, sem exigir nova varredura.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.items: dict[str, ItemRecord] = {}
+        self.locations: dict[str, LocationRecord] = {}
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._location_names: dict[str, str] = {}
+        self._listeners: list[Listener] = []
+
+    def add_listener(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def location_name(self, filename: str | None) -> str | None:
+        """Nome da localização a partir do nome do arquivo (sem extensão)."""
+        if not filename:
+            return None
+        return self._location_names.get(filename, filename)
+
+    @property
+    def items_dir(self) -> str:
+        return os.path.join(self.root, ITEMS_DIR)
+
+    @property
+    def locations_dir(self) -> str:
+        return os.path.join(self.root, LOCATIONS_DIR)
+
+    def scan(self) -> ScanResult:
+        return self._apply(self._collect_changes())
+
+    async def refresh(self) -> ScanResult:
+        """Varredura incremental com a leitura dos arquivos fora do event loop."""
+        changes = await asyncio.to_thread(self._collect_changes)
+        return self._apply(changes)
+
+    async def watch(self, interval: float) -> None:
+        """Atualiza o índice periodicamente (edições feitas no Obsidian)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await self.refresh()
+            except Exception as e:
+                logger.exception("Erro ao atualizar índice do vault: %s", e)
+                continue
+
+            if result.parsed or result.removed:
+                logger.info(
+                    "Índice do vault atualizado: %d lidos, %d removidos",
+                    result.parsed,
+                    result.removed,
+                )
+
+    def add_item(
+        self, path: str, item: Item, stat: os.stat_result | None = None
+    ) -> ItemRecord:
+        record = ItemRecord(
+            path=path,
+            name=item.name or "",
+            description=item.description or "",
+            quantity=item.quantity,
+            tags=tuple(item.tags or ()),
+            status=item.status.value if item.status else None,
+            location=item.location.filename() if item.location else None,
+        )
+        self._store(path, _signature(stat or os.stat(path)), record)
+        return record
+
+    def add_location(
+        self, path: str, location: Location, stat: os.stat_result | None = None
+    ) -> LocationRecord:
+        record = LocationRecord(
+            path=path,
+            name=location.name,
+            parent=location.location.filename() if location.location else None,
+        )
+        self._store(path, _signature(stat or os.stat(path)), record)
+        return record
+
+    def _store(
+        self,
+        path: str,
+        stat: tuple[int, int],
+        record: Record | None,
+    ) -> None:
+        self._discard(path)
+        self._stats[path] = stat
+        if isinstance(record, ItemRecord):
+            self.items[path] = record
+        elif isinstance(record, LocationRecord):
+            self.locations[path] = record
+            self._location_names[record.filename] = record.name
+
+        self._notify(path, record)
+
+    def _remove(self, path: str) -> None:
+        self._discard(path)
+        self._stats.pop(path, None)
+        self._notify(path, None)
+
+    def _discard(self, path: str) -> None:
+        self.items.pop(path, None)
+        location = self.locations.pop(path, None)
+        if location is not None:
+            self._location_names.pop(location.filename, None)
+
+    def _notify(self, path: str, record: Record | None) -> None:
+        for listener in self._listeners:
+            listener(path, record)
+
+    def _collect_changes(self) -> _Changes:
+        changes = _Changes()
+        known = dict(self._stats)
+        seen = set()
+
+        for directory, parse in (
+            (self.items_dir, parse_item),
+            (self.locations_dir, parse_location),
+        ):
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+
+            for entry in entries:
+                if not entry.name.endswith(".md") or not entry.is_file():
+                    continue
+
+                seen.add(entry.path)
+                signature = _signature(entry.stat())
+                if known.get(entry.path) == signature:
+                    changes.unchanged += 1
+                    continue
+
+                record = None
+                try:
+                    properties = read_front_matter(entry.path)
+                    if properties is not None:
+                        record = parse(entry.path, properties)
+                except (OSError, UnicodeDecodeError, YAMLError) as e:
+                    logger.warning("Erro ao indexar %s: %s", entry.path, e)
+
+                changes.parsed[entry.path] = (signature, record)
+
+        for path, signature in known.items():
+            if path not in seen:
+                changes.removed[path] = signature
+
+        return changes
+
+    def _apply(self, changes: _Changes) -> ScanResult:
+        for path, (signature, record) in changes.parsed.items():
+            self._store(path, signature, record)
+
+        for path, signature in changes.removed.items():
+            # Arquivo gravado durante a varredura: o índice já está mais novo
+            if self._stats.get(path) == signature:
+                self._remove(path)
+
+        return ScanResult(
+            parsed=len(changes.parsed),
+            removed=len(changes.removed),
+            unchanged=changes.unchanged,
+        )
+
+
+def _signature(stat: os.stat_result) -> tuple[int, int]:
+    return (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from inventorybot.entities import Item
+from inventorybot.infra.markdown_output import MarkdownOutput
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILENAME = "journal.jsonl"
+PHOTOS_DIRNAME = "photos"
+
+
+class WriteBehindOutput:
+    """
+    Gravação assíncrona (write-behind) sobre um `MarkdownOutput`.
+
+    `save` registra o item num journal local (append-only, com fsync) e
+    retorna logo em seguida; uma tarefa em segundo plano grava os itens
+    pendentes no vault em lotes, no máximo `max_latency` segundos depois
+    (ou assim que `batch_size` itens se acumulam). As fotos são movidas para
+    `directory/photos` antes do registro, para sobreviverem a um reinício.
+
+    Ao iniciar (`start`), entradas do journal ainda não gravadas são
+    reenviadas. Os nomes de arquivo ficam no journal, então regravar uma
+    entrada sobrescreve a mesma nota em vez de duplicá-la.
+    """
+
+    def __init__(
+        self,
+        output: MarkdownOutput,
+        directory: str,
+        max_latency: float = 5.0,
+        batch_size: int = 50,
+    ):
+        self.output = output
+        self.directory = directory
+        self.max_latency = max_latency
+        self.batch_size = batch_size
+
+        self.journal_path = os.path.join(directory, JOURNAL_FILENAME)
+        self.photos_dir = os.path.join(directory, PHOTOS_DIRNAME)
+
+        # id da entrada -> (nome do arquivo, item)
+        self._pending: dict[str, tuple[str, Item]] = {}
+        self._oldest: float | None = None
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="write-behind-journal"
+        )
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> int:
+        """Reenvia o que ficou no journal e inicia a gravação em segundo plano."""
+        entries = await self._run(self._read_journal)
+        for entry_id, filename, item in entries:
+            self._add_pending(entry_id, filename, item)
+
+        # Reescreve o journal só com o que está pendente (descarta entradas já
+        # gravadas e uma eventual última linha incompleta)
+        await self._run(self._rewrite, self._journal_entries())
+
+        if entries:
+            logger.info("Journal: %d itens pendentes recuperados", len(entries))
+            await self.flush()
+
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return len(entries)
+
+    async def stop(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        await self.flush()
+
+    async def save(self, item: Item) -> Item:
+        [item] = await self.save_many([item])
+        return item
+
+    async def save_many(self, items: list[Item]) -> list[Item]:
+        """
+        Registra vários itens com uma única escrita (e um único fsync) no
+        journal; a gravação no vault segue nos lotes do `flush`.
+        """
+        for item in items:
+            item.validate()
+
+        filenames = [item.filename() for item in items]
+        for item, filename in zip(items, filenames):
+            if item.has_photo():
+                item.photo = await self._run(self._spool_photo, item, filename)
+                item.photo_data = None
+
+        # Registra como pendente antes de escrever no journal: assim uma
+        # compactação do journal nunca é decidida com estas entradas em voo.
+        entries = []
+        for item, filename in zip(items, filenames):
+            entry_id = uuid.uuid4().hex
+            self._add_pending(entry_id, filename, item)
+            entries.append(
+                {
+                    "op": "save",
+                    "id": entry_id,
+                    "filename": filename,
+                    "item": item.to_dict(),
+                }
+            )
+        await self._run(self._append, entries)
+
+        return items
+
+    async def flush(self) -> int:
+        """Grava no vault todos os itens pendentes. Retorna quantos foram gravados."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch = dict(self._pending)
+            filenames = [filename for filename, _ in batch.values()]
+            items = [item for _, item in batch.values()]
+
+            await self.output.save_many(items, filenames)
+
+            for entry_id in batch:
+                self._pending.pop(entry_id, None)
+            if not self._pending:
+                self._oldest = None
+
+            await self._run(
+                self._append, [{"op": "done", "ids": list(batch)}], not self._pending
+            )
+
+            logger.info("Write-behind: %d itens gravados no vault", len(items))
+            return len(items)
+
+    def _journal_entries(self) -> list[dict]:
+        return [
+            {"op": "save", "id": entry_id, "filename": filename, "item": item.to_dict()}
+            for entry_id, (filename, item) in self._pending.items()
+        ]
+
+    def _add_pending(self, entry_id: str, filename: str, item: Item) -> None:
+        if not self._pending:
+            self._oldest = asyncio.get_running_loop().time()
+
+        self._pending[entry_id] = (filename, item)
+        self._wakeup.set()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._oldest is None:
+                continue
+
+            timeout = self._oldest + self.max_latency - loop.time()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=max(timeout, 0))
+            except TimeoutError:
+                pass
+            self._full.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Erro ao gravar itens pendentes: %s", e)
+                # tenta de novo no próximo ciclo
+                self._oldest = loop.time()
+                self._wakeup.set()
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    # =========================
+    # Journal (executado na thread do journal)
+    # =========================
+    def _spool_photo(self, item: Item, filename: str) -> str:
+        os.makedirs(self.photos_dir, exist_ok=True)
+        spooled = os.path.join(self.photos_dir, f"{filename}.jpg")
+        if item.photo_data is not None:
+            with open(spooled, "wb") as file:
+                file.write(item.photo_data)
+                file.flush()
+                os.fsync(file.fileno())
+        elif item.photo != spooled:
+            shutil.move(item.photo, spooled)
+        return spooled
+
+    def _append(self, entries: list[dict], compact: bool = False) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        if compact:
+            # Tudo gravado no vault: o journal pode recomeçar vazio
+            with open(self.journal_path, "w", encoding="utf-8") as journal:
+                journal.flush()
+                os.fsync(journal.fileno())
+            return
+
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            for entry in entries:
+                journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def _rewrite(self, entries: list[dict]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as journal:
+            for entry in entries:
+                journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _read_journal(self) -> list[tuple[str, str, Item]]:
+        if not os.path.exists(self.journal_path):
+            return []
+
+        saves: dict[str, tuple[str, Item]] = {}
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line_number, line in enumerate(journal, start=1):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # última linha incompleta (queda durante a escrita)
+                    logger.warning("Journal: linha %d inválida ignorada", line_number)
+                    continue
+
+                if entry.get("op") == "save":
+                    item = Item.from_dict(entry["item"])
+                    saves[entry["id"]] = (entry["filename"], item)
+                elif entry.get("op") == "done":
+                    for entry_id in entry.get("ids", []):
+                        saves.pop(entry_id, None)
+
+        return [
+            (entry_id, filename, item) for entry_id, (filename, item) in saves.items()
+        ]
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class MediaGroupCollector(Generic[T]):
+    """
+    Agrupa os updates de um mesmo álbum do Telegram (mesmo `media_group_id`).
+
+    O Telegram entrega cada foto do álbum como um update separado e não avisa
+    quando o álbum terminou, então o lote é entregue a `on_complete` quando
+    nenhuma foto nova chega por `delay` segundos.
+    """
+
+    def __init__(
+        self,
+        on_complete: Callable[[str, list[T]], Awaitable[None]],
+        delay: float = 1.0,
+    ):
+        self.on_complete = on_complete
+        self.delay = delay
+
+        self._groups: dict[str, list[T]] = {}
+        self._timers: dict[str, asyncio.Task] = {}
+
+    def add(self, group_id: str, entry: T) -> None:
+        self._groups.setdefault(group_id, []).append(entry)
+
+        timer = self._timers.get(group_id)
+        if timer:
+            timer.cancel()
+        self._timers[group_id] = asyncio.create_task(self._flush_later(group_id))
+
+    def __contains__(self, group_id: str) -> bool:
+        return group_id in self._groups
+
+    async def _flush_later(self, group_id: str) -> None:
+        await asyncio.sleep(self.delay)
+
+        entries = self._groups.pop(group_id, [])
+        self._timers.pop(group_id, None)
+        if not entries:
+            return
+
+        try:
+            await self.on_complete(group_id, entries)
+        except Exception as e:
+            logger.exception("Erro ao processar álbum %s: %s", group_id, e)
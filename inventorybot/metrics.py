@@ -0,0 +1,366 @@
+"""
+Métricas do bot: contadores e histogramas de latência em memória, expostos
+em formato texto do Prometheus (`Registry.render`) por um servidor HTTP local
+(`start_metrics_server`) e resumidos pelo comando `/stats`.
+
+Registrar um valor custa uma busca binária nos baldes e algumas operações em
+dicionário (cerca de 1µs), então a instrumentação pode ficar sempre ligada.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Limites superiores (s) dos baldes: de 1ms até 2 minutos (análises de visão)
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)  # fmt: skip
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: Mapping[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """Contador monotônico, com rótulos opcionais."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> Iterator[tuple[str, LabelKey, str, float]]:
+        for key, value in self._values.items():
+            yield self.name, key, "", value
+
+
+class Histogram:
+    """
+    Distribuição de valores (latências em segundos, por padrão) em baldes
+    cumulativos, como no Prometheus; `quantile` estima percentis a partir
+    deles para o `/stats`.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagem por balde (+ o último, +Inf), soma, total]
+        self._series: dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Mede o tempo do bloco `with` (também em código assíncrono)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def total(self, **labels: Any) -> float:
+        series = self._series.get(_label_key(labels))
+        return series[1] if series else 0.0
+
+    def label_sets(self) -> list[dict[str, str]]:
+        return [dict(key) for key in self._series]
+
+    def quantile(self, quantile: float, **labels: Any) -> float | None:
+        """Percentil estimado por interpolação linear dentro do balde."""
+        series = self._series.get(_label_key(labels))
+        if not series or not series[2]:
+            return None
+
+        target = quantile * series[2]
+        seen = 0
+        for index, count in enumerate(series[0]):
+            if count and seen + count >= target:
+                if index == len(self.buckets):
+                    # Acima do último balde: o melhor palpite é o limite dele
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def samples(self) -> Iterator[tuple[str, LabelKey, str, float]]:
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket", key, le, cumulative
+            yield f"{self.name}_sum", key, "", total
+            yield f"{self.name}_count", key, "", count
+
+
+class Registry:
+    """
+    Conjunto das métricas do processo. Além de contadores e histogramas,
+    aceita coletores (`add_stats`): funções que devolvem um dicionário de
+    estatísticas de outro componente (cache, fila, resiliência), lidas só no
+    momento da exportação e exportadas como gauge com o rótulo `stat`.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._stats: dict[str, tuple[str, Callable[[], Mapping[str, float]]]] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica já registrada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_stats(
+        self, name: str, help: str, collect: Callable[[], Mapping[str, float]]
+    ) -> None:
+        """Registra (ou substitui) um coletor de estatísticas."""
+        self._stats[name] = (help, collect)
+
+    def metrics(self) -> list[Counter | Histogram]:
+        return list(self._metrics.values())
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        collected = {}
+        for name, (_, collect) in self._stats.items():
+            try:
+                collected[name] = {
+                    key: value
+                    for key, value in collect().items()
+                    if isinstance(value, (int, float))
+                }
+            except Exception as e:
+                logger.warning("Erro ao coletar estatísticas de %s: %s", name, e)
+        return collected
+
+    def render(self) -> str:
+        """Todas as métricas no formato texto do Prometheus (versão 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, extra, value in metric.samples():
+                labels = _format_labels(key, extra)
+                lines.append(f"{name}{labels} {_format_value(value)}")
+
+        collected = self.stats()
+        for name, (help, _) in self._stats.items():
+            if name not in collected:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for stat, value in sorted(collected[name].items()):
+                key = (("stat", stat),)
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def timed(
+    histogram: Histogram, errors: Counter | None = None, **labels: Any
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorator para funções assíncronas: registra a duração (e as falhas)."""
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(**labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+
+        return wrapper
+
+    return decorator
+
+
+def format_stats(registry: Registry) -> str:
+    """Resumo legível das métricas, para o comando `/stats`."""
+    lines = []
+    for metric in registry.metrics():
+        if isinstance(metric, Histogram):
+            for labels in metric.label_sets():
+                count = metric.count(**labels)
+                p50 = metric.quantile(0.5, **labels) * 1000
+                p95 = metric.quantile(0.95, **labels) * 1000
+                label_text = ",".join(labels.values())
+                name = metric.name.removeprefix("inventorybot_").removesuffix(
+                    "_seconds"
+                )
+                lines.append(
+                    f"⏱ {name}{f'[{label_text}]' if label_text else ''}: "
+                    f"{count}x, p50 {p50:.0f}ms, p95 {p95:.0f}ms"
+                )
+        else:
+            for name, key, _, value in metric.samples():
+                label_text = ",".join(value for _, value in key)
+                name = name.removeprefix("inventorybot_").removesuffix("_total")
+                lines.append(
+                    f"🔢 {name}{f'[{label_text}]' if label_text else ''}: "
+                    f"{_format_value(value)}"
+                )
+
+    for name, stats in registry.stats().items():
+        if stats:
+            values = ", ".join(
+                f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in sorted(stats.items())
+            )
+            lines.append(f"📊 {name.removeprefix('inventorybot_')}: {values}")
+
+    return "\n".join(lines) or "Nenhuma métrica registrada ainda."
+
+
+# =========================
+# Servidor HTTP
+# =========================
+async def start_metrics_server(
+    registry: Registry, host: str = "127.0.0.1", port: int = 9464
+) -> asyncio.Server:
+    """
+    Servidor HTTP mínimo para o Prometheus: `GET /metrics` devolve
+    `registry.render()`. Deve ficar restrito ao localhost (ou a uma rede
+    interna), pois não tem autenticação.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Cabeçalhos são ignorados
+            while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+                pass
+
+            method, path, *_ = request_line.decode("latin-1").split() + ["", ""]
+            if method == "GET" and path.split("?")[0] in ("/metrics", "/"):
+                status = "200 OK"
+                body = registry.render().encode()
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status = "404 Not Found"
+                body = b"not found\n"
+                content_type = "text/plain"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info("Métricas em http://%s:%d/metrics", host, port)
+    return server
+
+
+# =========================
+# Métricas do bot
+# =========================
+registry = Registry()
+
+HANDLER_SECONDS = registry.histogram(
+    "inventorybot_handler_seconds", "Duração dos handlers do Telegram"
+)
+HANDLER_ERRORS = registry.counter(
+    "inventorybot_handler_errors_total", "Exceções nos handlers do Telegram"
+)
+SUMMARY_SECONDS = registry.histogram(
+    "inventorybot_summary_seconds", "Envio/edição da mensagem de resumo"
+)
+PHOTO_DOWNLOAD_SECONDS = registry.histogram(
+    "inventorybot_photo_download_seconds", "Download das fotos enviadas ao bot"
+)
+PHOTO_DOWNLOAD_BYTES = registry.counter(
+    "inventorybot_photo_download_bytes_total", "Bytes de fotos baixados do Telegram"
+)
+TELEGRAM_UPLOAD_BYTES = registry.counter(
+    "inventorybot_telegram_upload_bytes_total",
+    "Bytes de fotos enviados ao Telegram (reenvios por file_id não contam)",
+)
+VISION_SECONDS = registry.histogram(
+    "inventorybot_vision_seconds", "Chamadas à API de visão (sem cache nem fila)"
+)
+OUTPUT_SAVE_SECONDS = registry.histogram(
+    "inventorybot_output_save_seconds", "Gravação de itens no vault (por lote)"
+)
+FILES_WRITTEN = registry.counter(
+    "inventorybot_files_written_total", "Arquivos gravados no vault"
+)
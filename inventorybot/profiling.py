@@ -0,0 +1,212 @@
+"""
+Perfilamento opcional dos handlers: cada update roda sob o cProfile (e,
+opcionalmente, com o tracemalloc medindo o pico de memória) e, se passar de
+`threshold` segundos, o perfil é gravado em `directory` junto com um relatório
+em texto. Só os `max_reports` mais recentes são mantidos.
+
+O cProfile mede a thread inteira: enquanto um handler espera (await), o código
+de outros updates que rodar no event loop também entra no perfil. Por isso só
+um update é perfilado por vez; os que chegam nesse meio tempo rodam sem perfil.
+Tarefas que um handler deixa em segundo plano (ex.: a análise de imagem) são
+envolvidas com `wrap` ao serem criadas e perfiladas como um update à parte.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, TypeVar
+
+from telegram import CallbackQuery, Update
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+re_unsafe = re.compile(r"[^\w.-]+")
+
+
+def describe_update(update: object) -> str:
+    """Tipo do update e o que o usuário pediu (comando ou dados do botão)."""
+    if isinstance(update, CallbackQuery):
+        return f"callback:{update.data}"
+    if not isinstance(update, Update):
+        return type(update).__name__
+    if update.callback_query:
+        return f"callback:{update.callback_query.data}"
+    message = update.effective_message
+    if message is None:
+        return "update"
+    if message.text and message.text.startswith("/"):
+        return f"command:{message.text.split()[0]}"
+    if message.photo:
+        return "message:photo"
+    if message.text:
+        return "message:text"
+    return "message"
+
+
+class UpdateProfiler:
+    def __init__(
+        self,
+        directory: str,
+        threshold: float = 1.0,
+        max_reports: int = 20,
+        trace_memory: bool = False,
+        top: int = 30,
+    ):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.max_reports = max_reports
+        self.trace_memory = trace_memory
+        self.top = top
+        self.reports_written = 0
+        self._lock = asyncio.Lock()
+        # True se foi este profiler que ligou o tracemalloc (ver `close`)
+        self._tracing = False
+
+    def wrap(
+        self, callback: Callable[..., Awaitable[T]]
+    ) -> Callable[..., Awaitable[T]]:
+        """
+        Envolve um callback de handler (update, context) ou uma tarefa em
+        segundo plano, descrita pelo primeiro argumento (ex.: o callback query).
+        """
+
+        @functools.wraps(callback)
+        async def wrapper(*args: Any) -> T:
+            if self._lock.locked():
+                return await callback(*args)
+            async with self._lock:
+                return await self._profile(callback, *args)
+
+        return wrapper
+
+    def close(self) -> None:
+        """Desliga o tracemalloc, se foi ligado aqui (no encerramento do bot)."""
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    async def _profile(self, callback, *args):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Outro profiler já ativo (ex.: o processo roda sob o cProfile)
+            return await callback(*args)
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        try:
+            return await callback(*args)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold:
+                memory = (
+                    self._memory_report()
+                    if self.trace_memory and tracemalloc.is_tracing()
+                    else None
+                )
+                subject = describe_update(args[0]) if args else "tarefa"
+                label = f"{subject} ({callback.__name__})"
+                try:
+                    await asyncio.to_thread(
+                        self._write_report, profile, label, elapsed, memory
+                    )
+                except Exception as e:
+                    logger.warning("Erro ao gravar perfil do update: %s", e)
+
+    def _memory_report(self) -> str:
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        lines = [f"Pico de memória rastreada: {peak / 1024:.0f} KiB", ""]
+        for stat in snapshot.statistics("lineno")[: self.top]:
+            lines.append(str(stat))
+        return "\n".join(lines)
+
+    def _write_report(
+        self,
+        profile: cProfile.Profile,
+        label: str,
+        elapsed: float,
+        memory: str | None,
+    ) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        name = re_unsafe.sub("_", label).strip("_")[:60]
+        base = self.directory / f"{timestamp}-{name}"
+
+        profile.dump_stats(f"{base}.prof")
+
+        header = f"{label}: {elapsed:.3f}s"
+        report = [header, "", self._stats_text(pstats.Stats(profile), self.top)]
+        if memory:
+            report += ["", memory]
+        Path(f"{base}.txt").write_text("\n".join(report), encoding="utf-8")
+
+        self.reports_written += 1
+        logger.info("Update lento perfilado (%s): %s.prof", header, base)
+        self._rotate()
+        return Path(f"{base}.prof")
+
+    @staticmethod
+    def _stats_text(stats: pstats.Stats, top: int) -> str:
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.strip_dirs().sort_stats("cumulative").print_stats(top)
+        return buffer.getvalue().strip()
+
+    def _profiles(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        # O nome começa com o horário: a ordem alfabética é a cronológica
+        return sorted(self.directory.glob("*.prof"))
+
+    def _rotate(self) -> None:
+        profiles = self._profiles()
+        for path in profiles[: max(len(profiles) - self.max_reports, 0)]:
+            for stale in (path, path.with_suffix(".txt")):
+                try:
+                    os.unlink(stale)
+                except FileNotFoundError:
+                    pass
+
+    def latest_report(self, top: int | None = None) -> str | None:
+        """
+        Relatório do último update lento; com `top`, refeito a partir do
+        perfil gravado com essa quantidade de funções.
+        """
+        profiles = self._profiles()
+        if not profiles:
+            return None
+
+        path = profiles[-1]
+        report_path = path.with_suffix(".txt")
+        if top is None and report_path.exists():
+            return report_path.read_text(encoding="utf-8")
+
+        header = ""
+        if report_path.exists():
+            header = report_path.read_text(encoding="utf-8").split("\n", 1)[0]
+        stats_text = self._stats_text(pstats.Stats(str(path)), top or self.top)
+        return f"{header}\n\n{stats_text}".strip()
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpenError(Exception):
+    """O backend falhou seguidamente; chamadas são recusadas por um tempo."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Falhas transitórias da API da OpenAI: conexão, timeout, 429 e 5xx."""
+    # Importado aqui: o pacote é pesado e só é carregado na primeira análise
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+@dataclass
+class RetryPolicy:
+    # Tentativas no total (1 = sem novas tentativas)
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes da tentativa `attempt + 1`: exponencial com jitter total."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class LatencyTracker:
+    """Latências das últimas chamadas bem-sucedidas, para estimar percentis."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def percentile(self, quantile: float) -> float | None:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * quantile), len(ordered) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Depois de `failure_threshold` falhas seguidas, recusa chamadas por
+    `reset_timeout` segundos (aberto); passado esse tempo, deixa uma chamada
+    de teste passar (meio-aberto) e fecha de novo se ela tiver sucesso.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._probing):
+            raise CircuitOpenError("Serviço de visão indisponível no momento.")
+        if state == "half-open":
+            self._probing = True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def abandon(self) -> None:
+        """A chamada foi cancelada sem resultado: libera a vaga de teste."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if self._opened_at is None or self._probing:
+                logger.warning(
+                    "Circuito aberto após %d falhas; novas chamadas recusadas por %.0fs",
+                    self._failures,
+                    self.reset_timeout,
+                )
+            self._opened_at = self._clock()
+        self._probing = False
+
+
+class ResilientCaller:
+    """
+    Executa chamadas a um backend remoto com:
+
+    - prazo total (`deadline`, em segundos) para a chamada, incluindo novas
+      tentativas;
+    - novas tentativas com backoff exponencial e jitter, só para erros
+      transitórios (`is_retryable`);
+    - requisição "hedged" opcional: se a resposta demora mais que o percentil
+      `hedge_quantile` das latências recentes, uma segunda requisição igual é
+      disparada e vale a que terminar primeiro;
+    - circuit breaker, que recusa chamadas de imediato com o backend fora.
+
+    `stats` conta tentativas, novas tentativas, hedges e recusas.
+    """
+
+    def __init__(
+        self,
+        deadline: float | None = 60.0,
+        retry: RetryPolicy | None = None,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.5,
+        breaker: CircuitBreaker | None = None,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ):
+        self.deadline = deadline
+        self.retry = retry or RetryPolicy()
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.retryable = retryable
+        self.latencies = LatencyTracker()
+        self.stats: Counter[str] = Counter()
+
+    async def call(
+        self, factory: Callable[[], Awaitable[T]], hedge: bool | None = None
+    ) -> T:
+        """
+        Executa `factory()` (que cria uma nova chamada a cada tentativa).
+        `hedge=False` desliga o hedge nesta chamada (ex.: streaming com efeitos
+        colaterais a cada trecho).
+        """
+        hedge = self.hedge if hedge is None else hedge
+        try:
+            async with asyncio.timeout(self.deadline):
+                return await self._call_with_retries(factory, hedge)
+        except TimeoutError:
+            self.stats["timeouts"] += 1
+            self.breaker.record_failure()
+            raise
+
+    async def _call_with_retries(
+        self, factory: Callable[[], Awaitable[T]], hedge: bool
+    ) -> T:
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self.stats["rejected"] += 1
+                raise
+
+            try:
+                result = await self._attempt(factory, hedge)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except Exception as e:
+                if not self.retryable(e):
+                    # Erro da requisição (ex.: 400): o backend está de pé
+                    self.breaker.record_success()
+                    raise
+
+                self.breaker.record_failure()
+                attempt += 1
+                if attempt >= self.retry.attempts:
+                    raise
+
+                delay = self.retry.backoff(attempt - 1)
+                self.stats["retries"] += 1
+                logger.info(
+                    "Falha transitória (%s); nova tentativa em %.2fs", e, delay
+                )
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _attempt(self, factory: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        self.stats["attempts"] += 1
+        started = time.perf_counter()
+
+        hedge_delay = self._hedge_delay() if hedge else None
+        if hedge_delay is None:
+            result = await factory()
+        else:
+            result = await self._hedged(factory, hedge_delay)
+
+        self.latencies.record(time.perf_counter() - started)
+        return result
+
+    def _hedge_delay(self) -> float | None:
+        latency = self.latencies.percentile(self.hedge_quantile)
+        if latency is None:
+            return None
+        return max(latency, self.hedge_min_delay)
+
+    async def _hedged(self, factory: Callable[[], Awaitable[T]], delay: float) -> T:
+        primary = asyncio.ensure_future(factory())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.stats["hedged"] += 1
+            hedge = asyncio.ensure_future(factory())
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+
+            # As duas falharam: propaga o erro da original
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
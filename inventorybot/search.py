@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+from inventorybot.infra.vault_index import ItemRecord, LocationRecord
+
+re_non_alnum = re.compile(r"[^a-z0-9]+")
+
+LOCATION_SUFFIX = " - Inventário"
+
+# Pesos dos campos indexados: nome, tags, localização, descrição
+FIELD_WEIGHTS = (3.0, 2.0, 2.0, 1.0)
+
+PREFIX_SIMILARITY = 0.9
+
+
+@lru_cache(maxsize=65536)
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e sem pontuação ("Furadeira Bosch®" -> "furadeira bosch")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return re_non_alnum.sub(" ", stripped).strip()
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    return normalize(text).split()
+
+
+def trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class SearchHit:
+    record: ItemRecord
+    score: float
+
+
+@dataclass
+class SearchResults:
+    total: int
+    hits: list[SearchHit]
+
+
+class SearchIndex:
+    """
+    Índice invertido dos itens do vault com correspondência aproximada por
+    trigramas, para tolerar erros de digitação e acentos
+    ("furadera" encontra "Furadeira").
+
+    Cada termo da consulta é expandido para os termos do vocabulário com
+    similaridade de trigramas >= `min_similarity` (ou que começam com ele) e
+    todos os termos da consulta precisam corresponder (E lógico).
+
+    As listas de postings são `array` de ids inteiros; itens removidos ficam
+    marcados até a próxima compactação.
+    """
+
+    def __init__(self, min_similarity: float = 0.45):
+        self.min_similarity = min_similarity
+
+        self._records: list[ItemRecord | None] = []
+        self._ids: dict[str, int] = {}
+        self._removed = 0
+
+        self._postings: tuple[dict[str, array], ...] = tuple(
+            {} for _ in FIELD_WEIGHTS
+        )
+        # termo -> quantidade de trigramas; trigrama -> termos
+        self._vocabulary: dict[str, int] = {}
+        self._trigrams: dict[str, set[str]] = {}
+        self._expansions: dict[str, list[tuple[str, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def update(self, path: str, record: ItemRecord | LocationRecord | None) -> None:
+        """Recebe as mudanças do `VaultIndex` (ver `VaultIndex.add_listener`)."""
+        if isinstance(record, LocationRecord):
+            return
+
+        self.remove(path)
+        if record is not None:
+            self.add(record)
+
+    def add(self, record: ItemRecord) -> None:
+        self.remove(record.path)
+
+        doc_id = len(self._records)
+        self._records.append(record)
+        self._ids[record.path] = doc_id
+
+        location = record.location or ""
+        fields = (
+            tokenize(record.name),
+            [token for tag in record.tags for token in tokenize(tag)],
+            tokenize(location.removesuffix(LOCATION_SUFFIX)),
+            tokenize(record.description),
+        )
+        for postings, tokens in zip(self._postings, fields):
+            for token in set(tokens):
+                doc_ids = postings.get(token)
+                if doc_ids is None:
+                    postings[token] = doc_ids = array("I")
+                    self._add_to_vocabulary(token)
+                doc_ids.append(doc_id)
+
+    def remove(self, path: str) -> None:
+        doc_id = self._ids.pop(path, None)
+        if doc_id is None:
+            return
+
+        self._records[doc_id] = None
+        self._removed += 1
+        if self._removed > 1000 and self._removed > len(self._ids):
+            self._compact()
+
+    def search(
+        self, query: str, offset: int = 0, limit: int | None = None
+    ) -> SearchResults:
+        scores: dict[int, float] | None = None
+
+        for query_token in dict.fromkeys(tokenize(query)):
+            matches = []
+            for token, similarity in self._expand(query_token):
+                for postings, weight in zip(self._postings, FIELD_WEIGHTS):
+                    doc_ids = postings.get(token)
+                    if doc_ids:
+                        matches.append((similarity * weight, doc_ids))
+
+            # Em ordem crescente de pontuação: a melhor correspondência de cada
+            # item sobrescreve as demais (update em C, sem laço por item)
+            matches.sort(key=lambda match: match[0])
+            token_scores: dict[int, float] = {}
+            for score, doc_ids in matches:
+                token_scores.update(dict.fromkeys(doc_ids, score))
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    doc_id: score + token_scores[doc_id]
+                    for doc_id, score in scores.items()
+                    if doc_id in token_scores
+                }
+
+            if not scores:
+                return SearchResults(total=0, hits=[])
+
+        if not scores:
+            return SearchResults(total=0, hits=[])
+
+        records = self._records
+        ranked = [
+            doc_id
+            for doc_id in sorted(scores, key=scores.__getitem__, reverse=True)
+            if records[doc_id] is not None
+        ]
+        end = None if limit is None else offset + limit
+        return SearchResults(
+            total=len(ranked),
+            hits=[
+                SearchHit(records[doc_id], scores[doc_id])
+                for doc_id in ranked[offset:end]
+            ],
+        )
+
+    def _add_to_vocabulary(self, token: str) -> None:
+        if token in self._vocabulary:
+            return
+
+        token_trigrams = trigrams(token)
+        self._vocabulary[token] = len(token_trigrams)
+        for trigram in token_trigrams:
+            self._trigrams.setdefault(trigram, set()).add(token)
+        self._expansions.clear()
+
+    def _expand(self, query_token: str) -> list[tuple[str, float]]:
+        """Termos do vocabulário parecidos com `query_token`, com a similaridade."""
+        cached = self._expansions.get(query_token)
+        if cached is not None:
+            return cached
+
+        expansions = []
+        if query_token in self._vocabulary:
+            expansions.append((query_token, 1.0))
+
+        if len(query_token) >= 3:
+            query_trigrams = trigrams(query_token)
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self._trigrams.get(trigram, ()))
+
+            vocabulary = self._vocabulary
+            for token, count in shared.items():
+                if token == query_token:
+                    continue
+
+                similarity = count / (len(query_trigrams) + vocabulary[token] - count)
+                if token.startswith(query_token):
+                    similarity = max(similarity, PREFIX_SIMILARITY)
+                if similarity >= self.min_similarity:
+                    expansions.append((token, similarity))
+
+        if len(self._expansions) > 4096:
+            self._expansions.clear()
+        self._expansions[query_token] = expansions
+        return expansions
+
+    def _compact(self) -> None:
+        records = [record for record in self._records if record is not None]
+
+        self._records = []
+        self._ids = {}
+        self._removed = 0
+        for postings in self._postings:
+            postings.clear()
+
+        for record in records:
+            self.add(record)
@@ -9,5 +9,79 @@ class Settings(BaseSettings):
     output_dir: str = Field(..., env="OUTPUT_DIR")
     allowed_user_ids: list[int] = Field(..., env="ALLOWED_USER_IDS")
 
+    # Webhook: com `webhook_url` (URL pública, sem o caminho) definido, o bot
+    # recebe updates pelo servidor embutido em vez de long polling
+    webhook_url: str = Field("", env="WEBHOOK_URL")
+    webhook_listen: str = Field("127.0.0.1", env="WEBHOOK_LISTEN")
+    webhook_port: int = Field(8443, env="WEBHOOK_PORT")
+    webhook_path: str = Field("telegram", env="WEBHOOK_PATH")
+    webhook_secret: str = Field("", env="WEBHOOK_SECRET")
+
+    # Usuários que podem usar os comandos de administração (ex.: /stats)
+    admin_user_ids: list[int] = Field([], env="ADMIN_USER_IDS")
+
+    # Métricas no formato do Prometheus em http://METRICS_HOST:METRICS_PORT/metrics
+    # (0 desativa o servidor; o /stats funciona de qualquer forma)
+    metrics_host: str = Field("127.0.0.1", env="METRICS_HOST")
+    metrics_port: int = Field(0, env="METRICS_PORT")
+
+    # Perfilamento dos handlers (cProfile): updates mais lentos que
+    # `profile_threshold` segundos são gravados em `profile_dir` (vazio desativa)
+    profile_dir: str = Field("", env="PROFILE_DIR")
+    profile_threshold: float = Field(1.0, env="PROFILE_THRESHOLD")
+    profile_max_reports: int = Field(20, env="PROFILE_MAX_REPORTS")
+    profile_tracemalloc: bool = Field(False, env="PROFILE_TRACEMALLOC")
+
+    # Updates processados ao mesmo tempo (cada chat continua em ordem)
+    max_concurrent_updates: int = Field(32, env="MAX_CONCURRENT_UPDATES")
+
+    # Fotos até este tamanho (bytes) ficam só em memória; 0 usa sempre disco
+    photo_memory_limit: int = Field(5 * 1024 * 1024, env="PHOTO_MEMORY_LIMIT")
+
+    # Intervalo (s) para agrupar edições do resumo numa única atualização
+    summary_debounce: float = Field(0.3, env="SUMMARY_DEBOUNCE")
+
+    # Índice do vault (segundos entre varreduras incrementais; 0 desativa)
+    index_refresh_interval: float = Field(300, env="INDEX_REFRESH_INTERVAL")
+    # fsync de cada nota gravada (mais seguro, mais lento em discos de rede)
+    output_fsync: bool = Field(False, env="OUTPUT_FSYNC")
+
+    # Gravação assíncrona com journal local (write-behind)
+    write_behind: bool = Field(False, env="WRITE_BEHIND")
+    write_behind_dir: str = Field(".write-behind", env="WRITE_BEHIND_DIR")
+    write_behind_max_latency: float = Field(5.0, env="WRITE_BEHIND_MAX_LATENCY")
+
+    # Análise de imagens
+    # Servidor compatível com a API da OpenAI (ex.: proxy, ou o servidor falso
+    # dos benchmarks); vazio usa a API oficial
+    openai_base_url: str = Field("", env="OPENAI_BASE_URL")
+    vision_max_concurrency: int = Field(2, env="VISION_MAX_CONCURRENCY")
+    vision_max_pending: int = Field(20, env="VISION_MAX_PENDING")
+    vision_cache_path: str = Field("vision_cache.sqlite3", env="VISION_CACHE_PATH")
+    vision_cache_size: int = Field(256, env="VISION_CACHE_SIZE")
+    # 0 desativa o redimensionamento
+    vision_image_max_edge: int = Field(1024, env="VISION_IMAGE_MAX_EDGE")
+    vision_image_format: str = Field("jpeg", env="VISION_IMAGE_FORMAT")
+    vision_image_quality: int = Field(80, env="VISION_IMAGE_QUALITY")
+    vision_image_detail: str = Field("auto", env="VISION_IMAGE_DETAIL")
+    # Primeira análise sem busca web; a busca só roda quando marca/modelo/código
+    # de barras são identificados com confiança abaixo de
+    # `vision_search_confidence`, ou a pedido do usuário
+    vision_tiered: bool = Field(True, env="VISION_TIERED")
+    vision_search_confidence: float = Field(0.8, env="VISION_SEARCH_CONFIDENCE")
+    # Resiliência das chamadas à API de visão: prazo total (s), novas
+    # tentativas, hedge após o p95 de latência e circuit breaker
+    vision_timeout: float = Field(90.0, env="VISION_TIMEOUT")
+    vision_retries: int = Field(2, env="VISION_RETRIES")
+    vision_hedge: bool = Field(False, env="VISION_HEDGE")
+    vision_hedge_quantile: float = Field(0.95, env="VISION_HEDGE_QUANTILE")
+    vision_breaker_threshold: int = Field(5, env="VISION_BREAKER_THRESHOLD")
+    vision_breaker_reset: float = Field(30.0, env="VISION_BREAKER_RESET")
+    # Streaming da análise: legenda atualizada no máximo a cada N segundos
+    vision_stream: bool = Field(True, env="VISION_STREAM")
+    vision_stream_interval: float = Field(1.0, env="VISION_STREAM_INTERVAL")
+    # Resposta restrita ao schema (desative para modelos sem structured outputs)
+    vision_structured_output: bool = Field(True, env="VISION_STRUCTURED_OUTPUT")
+
 
 settings = Settings()
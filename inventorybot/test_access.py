@@ -0,0 +1,101 @@
+import asyncio
+
+from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
+
+from inventorybot.access import DENIED_MESSAGE, access_gate
+from inventorybot.testing.fake_telegram import (
+    FakeTelegramRequest,
+    callback_update,
+    free_port,
+    message_update,
+    post_update,
+)
+
+SECRET = "s3cret"
+
+
+def run_webhook(allowed_user_ids, scenario):
+    """Serve a minimal app behind the webhook and run `scenario` against it."""
+    handled = []
+
+    async def record(update, context):
+        handled.append(update.effective_message.text)
+
+    async def run():
+        request = FakeTelegramRequest()
+        app = (
+            ApplicationBuilder()
+            .token("123:TEST")
+            .request(request)
+            .get_updates_request(request)
+            .build()
+        )
+        app.add_handler(access_gate(allowed_user_ids), group=-1)
+        app.add_handler(CommandHandler("myid", record))
+        app.add_handler(MessageHandler(filters.TEXT, record))
+
+        port = free_port()
+        async with app:
+            await app.start()
+            await app.updater.start_webhook(
+                port=port, url_path="telegram", secret_token=SECRET
+            )
+            try:
+                await scenario(f"http://127.0.0.1:{port}/telegram", request)
+                # Updates are processed after the HTTP response
+                await asyncio.sleep(0.05)
+            finally:
+                await app.updater.stop()
+                await app.stop()
+        return request
+
+    request = asyncio.run(run())
+    return handled, request
+
+
+def test_allowed_user_reaches_handlers():
+    """Test that an update posted to the webhook is handled."""
+
+    async def scenario(url, request):
+        assert await post_update(url, message_update(7, "Martelo"), SECRET) == 200
+
+    handled, request = run_webhook([7], scenario)
+    assert handled == ["Martelo"]
+    assert not request.calls_to("sendMessage")
+
+
+def test_unknown_user_is_stopped_before_handlers():
+    """Test that the gate replies and no handler runs for unknown users."""
+
+    async def scenario(url, request):
+        await post_update(url, message_update(8, "Martelo"), SECRET)
+        await post_update(url, callback_update(8, "save"), SECRET)
+        await request.wait_for("answerCallbackQuery")
+
+    handled, request = run_webhook([7], scenario)
+    assert handled == []
+    [reply] = request.calls_to("sendMessage")
+    assert reply.params["text"] == DENIED_MESSAGE
+    [answer] = request.calls_to("answerCallbackQuery")
+    assert answer.params["show_alert"] is True
+
+
+def test_myid_is_public():
+    """Test that /myid works for users outside the allow list."""
+
+    async def scenario(url, request):
+        await post_update(url, message_update(8, "/myid"), SECRET)
+
+    handled, _ = run_webhook([7], scenario)
+    assert handled == ["/myid"]
+
+
+def test_wrong_secret_is_rejected():
+    """Test that the webhook refuses requests without the secret token."""
+
+    async def scenario(url, request):
+        assert await post_update(url, message_update(7, "Martelo"), "wrong") == 403
+        assert await post_update(url, message_update(7, "Martelo")) == 403
+
+    handled, _ = run_webhook([7], scenario)
+    assert handled == []
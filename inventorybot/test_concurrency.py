@@ -0,0 +1,87 @@
+import asyncio
+import random
+from datetime import datetime
+
+from telegram import Chat, Message, Update, User
+
+from inventorybot.concurrency import ChatSerializingUpdateProcessor
+
+
+def make_update(update_id: int, user_id: int, text: str) -> Update:
+    user = User(user_id, f"user-{user_id}", is_bot=False)
+    message = Message(
+        update_id,
+        datetime.now(),
+        Chat(user_id, Chat.PRIVATE),
+        from_user=user,
+        text=text,
+    )
+    return Update(update_id, message=message)
+
+
+def test_interleaved_users_lose_no_edits():
+    """Test that per-chat updates apply in order while chats run in parallel."""
+    rng = random.Random(7)
+    users = [101, 102, 103, 104, 105]
+    user_data = {user_id: {"edits": []} for user_id in users}
+    running = set()
+    max_running = 0
+
+    async def handler(update: Update):
+        # Read, yield to the loop, then write: unserialized, edits get lost
+        nonlocal max_running
+        running.add(update.effective_chat.id)
+        max_running = max(max_running, len(running))
+        data = user_data[update.effective_user.id]
+        edits = list(data["edits"])
+        await asyncio.sleep(rng.uniform(0, 0.005))
+        data["edits"] = edits + [update.message.text]
+        running.discard(update.effective_chat.id)
+
+    async def run():
+        processor = ChatSerializingUpdateProcessor(16)
+        await processor.initialize()
+
+        tasks = []
+        for update_id in range(200):
+            user_id = users[update_id % len(users)]
+            update = make_update(update_id, user_id, str(update_id))
+            tasks.append(
+                asyncio.create_task(processor.process_update(update, handler(update)))
+            )
+        await asyncio.gather(*tasks)
+        await processor.shutdown()
+        assert not processor._locks
+
+    asyncio.run(run())
+
+    for index, user_id in enumerate(users):
+        assert user_data[user_id]["edits"] == [
+            str(update_id) for update_id in range(index, 200, len(users))
+        ]
+    assert max_running > 1
+
+
+def test_concurrency_limit_is_respected():
+    """Test that no more than max_concurrent_updates run at once."""
+    running = 0
+    max_running = 0
+
+    async def handler():
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+
+    async def run():
+        processor = ChatSerializingUpdateProcessor(3)
+        await asyncio.gather(
+            *(
+                processor.process_update(make_update(i, i, "x"), handler())
+                for i in range(20)
+            )
+        )
+
+    asyncio.run(run())
+    assert max_running == 3
@@ -0,0 +1,110 @@
+import asyncio
+
+from inventorybot.debounce import Debouncer
+
+
+def test_burst_is_coalesced_into_one_call():
+    """Test that rapid calls for the same key run the callback once."""
+    state = {"value": 0}
+    seen = []
+
+    async def push():
+        seen.append(state["value"])
+
+    async def run():
+        debouncer = Debouncer(0.02)
+        for value in range(1, 6):
+            state["value"] = value
+            debouncer.call("chat-1", push)
+        debouncer.call("chat-2", push)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert seen == [5, 5]
+
+
+def test_call_after_run_schedules_again():
+    """Test that a call after the delay triggers a new run."""
+    calls = []
+
+    async def push():
+        calls.append(1)
+
+    async def run():
+        debouncer = Debouncer(0.01)
+        debouncer.call("chat", push)
+        await asyncio.sleep(0.03)
+        debouncer.call("chat", push)
+        await asyncio.sleep(0.03)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_cancel_drops_pending_call():
+    """Test that a cancelled call never runs and doesn't block new ones."""
+    calls = []
+
+    async def push():
+        calls.append(1)
+
+    async def run():
+        debouncer = Debouncer(0.01)
+        debouncer.call("chat", push)
+        debouncer.cancel("chat")
+        debouncer.call("chat", push)
+        await asyncio.sleep(0.03)
+
+    asyncio.run(run())
+    assert calls == [1]
+
+
+def test_leading_mode_runs_first_call_immediately_then_throttles():
+    """Test that leading mode runs at once and then at most once per delay."""
+    state = {"value": 0}
+    seen = []
+
+    async def push():
+        seen.append(state["value"])
+
+    async def run():
+        debouncer = Debouncer(0.05, leading=True)
+        state["value"] = 1
+        debouncer.call("chat", push)
+        await asyncio.sleep(0.01)
+        assert seen == [1]
+
+        for value in range(2, 6):
+            state["value"] = value
+            debouncer.call("chat", push)
+        await asyncio.sleep(0.01)
+        assert seen == [1]
+
+        await asyncio.sleep(0.06)
+
+    asyncio.run(run())
+    assert seen == [1, 5]
+
+
+def test_cancel_and_wait_lets_a_running_call_finish_first():
+    """Test that nothing done after cancel_and_wait is overwritten by a stale run."""
+    events = []
+
+    async def run():
+        debouncer = Debouncer(0.01, leading=True)
+        sending = asyncio.Event()
+        release = asyncio.Event()
+
+        async def push_progress():
+            sending.set()
+            await release.wait()
+            events.append("progress")
+
+        debouncer.call("message", push_progress)
+        await sending.wait()
+        asyncio.get_running_loop().call_later(0.02, release.set)
+        await debouncer.cancel_and_wait("message")
+        events.append("final")
+
+    asyncio.run(run())
+    assert events == ["progress", "final"]
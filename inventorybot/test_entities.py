@@ -0,0 +1,38 @@
+import dataclasses
+import gc
+
+import pytest
+
+from inventorybot.entities import Item, Location
+
+
+def test_location_intern_returns_a_single_instance_per_chain():
+    """Test that interning reuses the same location and parent objects."""
+    first = Location.intern("Gaveta", Location.intern("Armário"))
+    second = Location.intern("Gaveta", Location.intern("Armário"))
+
+    assert first is second
+    assert first.location is Location.intern("Armário")
+    assert Location.intern("Gaveta") is not first
+    assert Location.from_dict(first.to_dict()) is first
+
+
+def test_location_is_immutable_and_registry_releases_unused():
+    """Test that shared locations cannot be mutated and are not kept alive."""
+    location = Location.intern("Caixa temporária")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        location.name = "Outra"
+
+    del location
+    gc.collect()
+    assert ("Caixa temporária", None) not in Location._registry
+
+
+def test_item_is_slotted():
+    """Test that items have no per-instance __dict__."""
+    item = Item(name="Martelo", quantity=1, location=Location.intern("Caixa"))
+
+    assert not hasattr(item, "__dict__")
+    with pytest.raises(AttributeError):
+        item.nome = "Martelo"
+    assert item.filename().startswith("martelo-")
@@ -0,0 +1,64 @@
+import io
+import subprocess
+import sys
+
+import pytest
+
+from inventorybot.imaging import ImageOptions, prepare_image
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg(size):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def test_prepare_image_downscales_to_max_edge():
+    """Test that the longest edge is reduced to max_edge."""
+    data, mime = prepare_image(
+        _jpeg((4000, 3000)), "image/jpeg", ImageOptions(max_edge=1000, format="webp")
+    )
+
+    assert mime == "image/webp"
+    with Image.open(io.BytesIO(data)) as image:
+        assert max(image.size) == 1000
+
+
+def test_prepare_image_keeps_small_original():
+    """Test that a small image is sent as is when re-encoding doesn't help."""
+    original = _jpeg((200, 100))
+    data, mime = prepare_image(
+        original, "image/jpeg", ImageOptions(max_edge=1000, quality=100)
+    )
+
+    assert (data, mime) == (original, "image/jpeg")
+
+
+def test_prepare_image_without_options():
+    """Test that no options means no preprocessing."""
+    assert prepare_image(b"raw", "image/png", None) == (b"raw", "image/png")
+
+
+def test_image_options_rejects_unknown_format():
+    """Test format validation."""
+    with pytest.raises(ValueError):
+        ImageOptions(format="gif")
+
+
+def test_pillow_is_imported_only_with_the_first_image():
+    """Test that importing the vision module and checking Pillow stay cheap."""
+    code = (
+        "import sys\n"
+        "from inventorybot import imaging, vision\n"
+        "assert imaging.is_available()\n"
+        "print('PIL' in sys.modules)\n"
+        "imaging.prepare_image(b'raw', 'image/jpeg', imaging.ImageOptions())\n"
+        "print('PIL' in sys.modules)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.split() == ["False", "True"]
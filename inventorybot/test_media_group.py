@@ -0,0 +1,45 @@
+import asyncio
+
+from inventorybot.media_group import MediaGroupCollector
+
+
+def test_collector_delivers_each_album_once():
+    """Test that photos of the same album are delivered together."""
+    delivered = []
+
+    async def on_complete(group_id, entries):
+        delivered.append((group_id, entries))
+
+    async def run():
+        collector = MediaGroupCollector(on_complete, delay=0.02)
+        for i in range(3):
+            collector.add("album-1", i)
+            collector.add("album-2", i * 10)
+            await asyncio.sleep(0.005)
+
+        assert "album-1" in collector
+        await asyncio.sleep(0.05)
+        assert "album-1" not in collector
+
+    asyncio.run(run())
+    assert sorted(delivered) == [("album-1", [0, 1, 2]), ("album-2", [0, 10, 20])]
+
+
+def test_collector_waits_for_quiet_period():
+    """Test that a late photo postpones delivery instead of splitting the album."""
+    delivered = []
+
+    async def on_complete(group_id, entries):
+        delivered.append(entries)
+
+    async def run():
+        collector = MediaGroupCollector(on_complete, delay=0.03)
+        collector.add("album", "a")
+        await asyncio.sleep(0.02)
+        collector.add("album", "b")
+        await asyncio.sleep(0.02)
+        assert delivered == []
+        await asyncio.sleep(0.03)
+
+    asyncio.run(run())
+    assert delivered == [["a", "b"]]
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from inventorybot.metrics import (
+    Histogram,
+    Registry,
+    format_stats,
+    start_metrics_server,
+    timed,
+)
+
+
+def test_histogram_buckets_are_cumulative_in_prometheus_text():
+    """Test that the text exposition has cumulative buckets, sum and count."""
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Op latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, op="save")
+
+    text = registry.render()
+
+    assert "# TYPE op_seconds histogram" in text
+    assert 'op_seconds_bucket{op="save",le="0.1"} 2' in text
+    assert 'op_seconds_bucket{op="save",le="1"} 3' in text
+    assert 'op_seconds_bucket{op="save",le="+Inf"} 4' in text
+    assert 'op_seconds_sum{op="save"} 3.65' in text
+    assert 'op_seconds_count{op="save"} 4' in text
+
+
+def test_counters_labels_and_stats_collectors():
+    """Test counters per label set and stats read from other components."""
+    registry = Registry()
+    files = registry.counter("files_total", "Files")
+    files.inc()
+    files.inc(2)
+    files.inc(kind='a "b"')
+    registry.add_stats("cache", "Cache stats", lambda: {"hits": 3, "name": "x"})
+    registry.add_stats("broken", "Raises", lambda: 1 / 0)
+
+    text = registry.render()
+
+    assert "files_total 3" in text
+    assert 'files_total{kind="a \\"b\\""} 1' in text
+    assert 'cache{stat="hits"} 3' in text
+    assert "name" not in text
+    assert "broken" not in text
+
+
+def test_quantile_is_interpolated_within_bucket():
+    """Test percentile estimates from bucket counts."""
+    histogram = Histogram("x", "x", buckets=(1.0, 2.0))
+    for value in (0.5, 1.5, 1.5, 1.5):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.25) == pytest.approx(1.0)
+    assert histogram.quantile(1.0) == pytest.approx(2.0)
+    assert histogram.quantile(0.5, missing="label") is None
+
+
+def test_timed_records_duration_and_errors():
+    """Test the async decorator on success and failure."""
+    registry = Registry()
+    latency = registry.histogram("handler_seconds", "Handlers")
+    errors = registry.counter("handler_errors_total", "Errors")
+
+    @timed(latency, errors, handler="fails")
+    async def fails():
+        raise ValueError("boom")
+
+    @timed(latency, errors, handler="works")
+    async def works():
+        return 42
+
+    assert asyncio.run(works()) == 42
+    with pytest.raises(ValueError):
+        asyncio.run(fails())
+
+    assert latency.count(handler="works") == 1
+    assert latency.count(handler="fails") == 1
+    assert errors.value(handler="fails") == 1
+    assert "handler[works]: 1x" in format_stats(registry)
+
+
+def test_metrics_endpoint_serves_registry():
+    """Test the local HTTP endpoint with a raw HTTP client."""
+    registry = Registry()
+    registry.counter("requests_total", "Requests").inc(5)
+
+    async def fetch(path):
+        server = await start_metrics_server(registry, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    response = asyncio.run(fetch("/metrics"))
+    assert response.startswith("HTTP/1.1 200 OK")
+    assert "text/plain; version=0.0.4" in response
+    assert response.endswith("requests_total 5\n")
+
+    assert asyncio.run(fetch("/other")).startswith("HTTP/1.1 404")
@@ -0,0 +1,127 @@
+import asyncio
+import time
+import tracemalloc
+
+from telegram import Update
+
+from inventorybot.profiling import UpdateProfiler, describe_update
+from inventorybot.testing.fake_telegram import callback_update, message_update
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def slow_handler(update, context):
+    busy(0.05)
+
+
+async def fast_handler(update, context):
+    pass
+
+
+def make_update(data):
+    return Update.de_json(data, None)
+
+
+def test_describe_update():
+    """Test labels for commands, text and callbacks."""
+    assert describe_update(make_update(message_update(1, "/buscar x"))) == (
+        "command:/buscar"
+    )
+    assert describe_update(make_update(message_update(1, "Martelo"))) == (
+        "message:text"
+    )
+    assert describe_update(make_update(callback_update(1, "save_item"))) == (
+        "callback:save_item"
+    )
+
+
+def test_only_slow_updates_are_saved(tmp_path):
+    """Test that a report is written for slow updates only, with memory stats."""
+    profiler = UpdateProfiler(tmp_path, threshold=0.03, trace_memory=True)
+    update = make_update(callback_update(1, "save_item"))
+
+    async def run():
+        await profiler.wrap(fast_handler)(update, None)
+        await profiler.wrap(slow_handler)(update, None)
+
+    try:
+        asyncio.run(run())
+    finally:
+        profiler.close()
+    assert not tracemalloc.is_tracing()
+
+    [report] = list(tmp_path.glob("*.txt"))
+    assert len(list(tmp_path.glob("*.prof"))) == 1
+    assert "callback_save_item" in report.name
+    text = report.read_text()
+    assert text.startswith("callback:save_item (slow_handler):")
+    assert "busy" in text
+    assert "Pico de memória rastreada" in text
+
+    latest = profiler.latest_report(top=3)
+    assert latest.startswith("callback:save_item (slow_handler):")
+    assert "busy" in latest
+
+
+def test_background_tasks_are_profiled_by_their_callback_query(tmp_path):
+    """Test wrapping a background task whose first argument is a callback query."""
+    profiler = UpdateProfiler(tmp_path, threshold=0.03)
+    query = make_update(callback_update(1, "extract_vision_data")).callback_query
+
+    async def run_vision_extraction(query, context, item, expected, search=None):
+        busy(0.05)
+
+    asyncio.run(profiler.wrap(run_vision_extraction)(query, None, None, {}))
+
+    assert profiler.latest_report().startswith(
+        "callback:extract_vision_data (run_vision_extraction):"
+    )
+
+
+def test_reports_are_rotated(tmp_path):
+    """Test that only the newest reports are kept."""
+    profiler = UpdateProfiler(tmp_path, threshold=0.0, max_reports=2)
+    handler = profiler.wrap(fast_handler)
+
+    async def run():
+        for text in ("/a", "/b", "/c"):
+            await handler(make_update(message_update(1, text)), None)
+
+    asyncio.run(run())
+
+    reports = sorted(path.name for path in tmp_path.glob("*.txt"))
+    assert len(reports) == 2
+    assert "command_b" in reports[0] and "command_c" in reports[1]
+    assert len(list(tmp_path.glob("*.prof"))) == 2
+    assert profiler.reports_written == 3
+
+
+def test_concurrent_updates_are_profiled_one_at_a_time(tmp_path):
+    """Test that overlapping updates run normally while another is profiled."""
+    profiler = UpdateProfiler(tmp_path, threshold=0.0)
+    done = []
+
+    async def handler(update, context):
+        await asyncio.sleep(0.01)
+        done.append(update.update_id)
+
+    wrapped = profiler.wrap(handler)
+
+    async def run():
+        updates = [make_update(message_update(user, "x")) for user in range(3)]
+        await asyncio.gather(*(wrapped(update, None) for update in updates))
+
+    asyncio.run(run())
+
+    assert len(done) == 3
+    assert profiler.reports_written == 1
+    assert profiler.latest_report() is not None
+
+
+def test_no_report_before_any_slow_update(tmp_path):
+    """Test that an empty (or missing) directory has no latest report."""
+    assert UpdateProfiler(tmp_path / "missing").latest_report() is None
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+from inventorybot.entities import Item
+from inventorybot.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientCaller,
+    RetryPolicy,
+)
+from inventorybot.testing.fake_openai import DEFAULT_OUTPUT, FakeOpenAIServer
+from inventorybot.vision import VisionService
+
+FAST_RETRY = RetryPolicy(attempts=3, base_delay=0.01, max_delay=0.02)
+
+
+def make_service(server: FakeOpenAIServer, caller: ResilientCaller) -> VisionService:
+    return VisionService(
+        api_key="sk-test",
+        enable_search=False,
+        base_url=server.base_url,
+        resilience=caller,
+    )
+
+
+def analyse(service: VisionService):
+    item = Item(photo_data=b"img")
+    return asyncio.run(service.extract_item_details_from_image(item))
+
+
+async def analyse_async(service: VisionService):
+    return await service.extract_item_details_from_image(Item(photo_data=b"img"))
+
+
+def test_transient_errors_are_retried():
+    """Test that 5xx and 429 responses are retried until one succeeds."""
+    caller = ResilientCaller(retry=FAST_RETRY)
+    with FakeOpenAIServer() as server:
+        server.inject(status=503)
+        server.inject(status=429)
+        result = analyse(make_service(server, caller))
+        assert len(server.requests) == 3
+
+    assert result.name == DEFAULT_OUTPUT["name"]
+    assert caller.stats["retries"] == 2
+
+
+def test_client_errors_are_not_retried():
+    """Test that a 400 fails at once and does not count against the breaker."""
+    caller = ResilientCaller(retry=FAST_RETRY)
+    with FakeOpenAIServer() as server:
+        server.inject(status=400)
+        service = make_service(server, caller)
+        service.structured_output = False
+        with pytest.raises(openai.BadRequestError):
+            analyse(service)
+        assert len(server.requests) == 1
+
+    assert caller.breaker.state == "closed"
+
+
+def test_deadline_bounds_slow_responses():
+    """Test that a slow backend is abandoned at the deadline."""
+    caller = ResilientCaller(deadline=0.2, retry=FAST_RETRY)
+    with FakeOpenAIServer() as server:
+        server.inject(delay=1.0)
+        started = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            analyse(make_service(server, caller))
+        elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.8
+    assert caller.stats["timeouts"] == 1
+
+
+def test_hedged_request_beats_a_slow_primary():
+    """Test that a second request is sent after the p95 delay and wins."""
+    caller = ResilientCaller(hedge=True, hedge_min_delay=0.05)
+
+    async def run():
+        # Warm up the client and the connection before hedging kicks in: run
+        # alone, the first call also imports openai and would be hedged too
+        await analyse_async(service)
+        for _ in range(caller.latencies.min_samples):
+            caller.latencies.record(0.01)
+        server.inject(delay=1.0)
+        started = time.perf_counter()
+        result = await analyse_async(service)
+        return result, time.perf_counter() - started
+
+    with FakeOpenAIServer() as server:
+        service = make_service(server, caller)
+        result, elapsed = asyncio.run(run())
+
+    assert result.name == DEFAULT_OUTPUT["name"]
+    assert elapsed < 0.8
+    assert caller.stats["hedged"] == 1
+    assert caller.stats["hedge_wins"] == 1
+
+
+def test_circuit_breaker_fails_fast_and_recovers():
+    """Test that the breaker opens after repeated failures and probes after reset."""
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout=10, clock=lambda: now[0]
+    )
+    caller = ResilientCaller(retry=RetryPolicy(attempts=1), breaker=breaker)
+
+    async def run():
+        server.inject(status=500, times=2)
+        for _ in range(2):
+            with pytest.raises(openai.InternalServerError):
+                await analyse_async(service)
+
+        with pytest.raises(CircuitOpenError):
+            await analyse_async(service)
+        assert len(server.requests) == 2
+
+        now[0] = 11
+        assert breaker.state == "half-open"
+        assert (await analyse_async(service)).name == DEFAULT_OUTPUT["name"]
+
+    with FakeOpenAIServer() as server:
+        service = make_service(server, caller)
+        asyncio.run(run())
+
+    assert breaker.state == "closed"
+    assert caller.stats["rejected"] == 1
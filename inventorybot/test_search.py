@@ -0,0 +1,95 @@
+from inventorybot.infra.vault_index import ItemRecord, LocationRecord
+from inventorybot.search import SearchIndex, normalize
+
+
+def _index():
+    index = SearchIndex()
+    index.add(
+        ItemRecord(
+            path="Itens/furadeira.md",
+            name="Furadeira Bosch",
+            description="Furadeira de impacto 650W",
+            tags=("ferramenta",),
+            location="garagem - Inventário",
+        )
+    )
+    index.add(
+        ItemRecord(
+            path="Itens/lampada.md",
+            name="Lâmpada LED",
+            tags=("eletrica",),
+            location="caixa-3 - Inventário",
+        )
+    )
+    index.add(
+        ItemRecord(
+            path="Itens/martelo.md",
+            name="Martelo",
+            description="Cabo de madeira, usado com a furadeira",
+            tags=("ferramenta",),
+            location="garagem - Inventário",
+        )
+    )
+    return index
+
+
+def _names(results):
+    return [hit.record.name for hit in results.hits]
+
+
+def test_normalize_removes_accents_and_punctuation():
+    """Test text normalization."""
+    assert normalize("Lâmpada LED (110V)") == "lampada led 110v"
+
+
+def test_search_tolerates_typos_and_accents():
+    """Test fuzzy trigram matching."""
+    index = _index()
+    assert _names(index.search("furadera")) == ["Furadeira Bosch", "Martelo"]
+    assert _names(index.search("lampada")) == ["Lâmpada LED"]
+    assert _names(index.search("LÂMPADA")) == ["Lâmpada LED"]
+
+
+def test_search_matches_prefix():
+    """Test that an incomplete word still matches."""
+    assert _names(_index().search("fura")) == ["Furadeira Bosch", "Martelo"]
+
+
+def test_search_requires_all_terms():
+    """Test that every query term must match."""
+    index = _index()
+    assert _names(index.search("furadeira bosch")) == ["Furadeira Bosch"]
+    assert _names(index.search("ferramenta garagem")) == [
+        "Furadeira Bosch",
+        "Martelo",
+    ]
+    assert index.search("furadeira inexistente").total == 0
+
+
+def test_search_matches_location_name():
+    """Test that items are found by the name of their location."""
+    assert _names(_index().search("caixa 3")) == ["Lâmpada LED"]
+
+
+def test_search_paginates():
+    """Test offset/limit with total count."""
+    results = _index().search("ferramenta", offset=1, limit=1)
+    assert results.total == 2
+    assert len(results.hits) == 1
+
+
+def test_update_follows_vault_index_changes():
+    """Test removal/replacement through the VaultIndex listener."""
+    index = _index()
+    index.update("Itens/martelo.md", None)
+    assert _names(index.search("ferramenta")) == ["Furadeira Bosch"]
+
+    index.update(
+        "Itens/lampada.md",
+        ItemRecord(path="Itens/lampada.md", name="Lâmpada halógena"),
+    )
+    assert _names(index.search("led")) == []
+    assert _names(index.search("halogena")) == ["Lâmpada halógena"]
+
+    index.update("Locais/caixa.md", LocationRecord(path="Locais/caixa.md", name="x"))
+    assert len(index) == 2
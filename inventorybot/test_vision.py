@@ -0,0 +1,288 @@
+import asyncio
+import json
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from inventorybot.entities import Item
+from inventorybot.testing.fake_openai import DEFAULT_OUTPUT, FakeOpenAIServer
+from inventorybot.vision import (
+    SYSTEM_PROMPTS,
+    VISION_RESULT_FORMAT,
+    VisionResult,
+    VisionService,
+    apply_result,
+    parse_partial_json,
+    stream_progress,
+    user_hints,
+)
+from inventorybot.vision_cache import VisionCache
+
+
+class FakeResponses:
+    def __init__(self, outputs, reject_format=False):
+        self.outputs = list(outputs)
+        self.reject_format = reject_format
+        self.requests = []
+
+    async def create(self, **request):
+        self.requests.append(request)
+        if self.reject_format and "text" in request:
+            raise openai.BadRequestError(
+                "Invalid parameter: 'text.format' is not supported with this model.",
+                response=httpx.Response(
+                    400, request=httpx.Request("POST", "http://test/responses")
+                ),
+                body=None,
+            )
+        return SimpleNamespace(output_text=self.outputs.pop(0))
+
+
+def make_service(responses: FakeResponses, **kwargs) -> VisionService:
+    service = VisionService(api_key="sk-test", enable_search=False, **kwargs)
+    service.client = SimpleNamespace(responses=responses)
+    return service
+
+
+def analyse(service: VisionService):
+    item = Item(name="Copo", photo_data=b"not really a jpeg")
+    return asyncio.run(service.extract_item_details_from_image(item))
+
+
+def test_structured_response_is_parsed_directly():
+    """Test that the schema is requested and its JSON parsed without heuristics."""
+    payload = {
+        "name": "Copo",
+        "description": "Copo vermelho",
+        "brand": None,
+        "color": "vermelho",
+    }
+    responses = FakeResponses([json.dumps(payload)])
+    service = make_service(responses)
+
+    result = analyse(service)
+
+    assert result.name == "Copo"
+    assert result.brand is None
+    assert responses.requests[0]["text"] == {"format": VISION_RESULT_FORMAT}
+    assert service.parse_stats == {"structured": 1}
+
+
+def test_free_text_response_uses_fallback():
+    """Test that heuristic extraction still handles chatty JSON, and is counted."""
+    responses = FakeResponses(['Aqui está: {"name": "Copo", "description": "x",} Até!'])
+    service = make_service(responses, structured_output=False)
+
+    result = analyse(service)
+
+    assert result.name == "Copo"
+    assert "text" not in responses.requests[0]
+    assert service.parse_stats == {"fallback": 1}
+
+
+def test_schema_rejection_disables_structured_output():
+    """Test that a model without schema support is retried without it once."""
+    responses = FakeResponses(
+        [
+            '{"name": "Copo", "description": "x"}',
+            '{"name": "Prato", "description": "y"}',
+        ],
+        reject_format=True,
+    )
+    service = make_service(responses)
+
+    assert analyse(service).name == "Copo"
+    assert analyse(service).name == "Prato"
+
+    assert service.structured_output is False
+    assert ["text" in request for request in responses.requests] == [True, False, False]
+    assert service.parse_stats["schema_unsupported"] == 1
+
+
+def test_tiered_mode_searches_only_when_identifiers_are_found():
+    """Test that the first pass has no tools and escalation depends on identifiers."""
+    generic = {"name": "Copo", "description": "x", "brand": None, "confidence": 0.9}
+    branded = {"name": "Furadeira", "description": "y", "brand": "Bosch"}
+    responses = FakeResponses([json.dumps(generic), json.dumps(branded)])
+    service = VisionService(api_key="sk-test")
+    service.client = SimpleNamespace(responses=responses)
+
+    first = analyse(service)
+    second = analyse(service)
+
+    assert [request["tools"] for request in responses.requests] == [None, None]
+    assert not first.searched
+    assert not service.needs_search(first)
+    assert service.needs_search(second)
+    assert service.can_search(first)
+
+
+def test_search_pass_uses_tools_and_previous_result():
+    """Test that the escalated pass enables web search and carries the first result."""
+    enriched = {"name": "Furadeira Bosch GSB 13 RE", "description": "z"}
+    responses = FakeResponses([json.dumps(enriched)])
+    service = VisionService(api_key="sk-test")
+    service.client = SimpleNamespace(responses=responses)
+    previous = VisionResult(
+        name="Furadeira Bosch", description="y", model="GSB 13 RE", confidence=0.6
+    )
+
+    # Como no bot: o resultado da primeira análise já foi aplicado ao item
+    item = Item(name="Furadeira", photo_data=b"img")
+    apply_result(item, previous)
+    result = asyncio.run(
+        service.extract_item_details_from_image(item, search=True, previous=previous)
+    )
+
+    [request] = responses.requests
+    assert request["tools"] == [{"type": "web_search"}]
+    user_section, estimate = request["input"][0]["content"][0]["text"].split(
+        "## ESTIMATIVA ANTERIOR"
+    )
+    assert "Nome preenchido pelo usuário: 'Furadeira'" in user_section
+    assert "Bosch" not in user_section
+    assert "- Nome: Furadeira Bosch" in estimate
+    assert "GSB 13 RE" in estimate
+    assert "- Confiança: 0.6" in estimate
+    assert result.searched
+    assert not service.needs_search(result)
+    assert not service.can_search(result)
+
+
+def test_extracting_again_after_applying_the_result_hits_the_cache(tmp_path):
+    """Test that the cache key uses the user's hints, not the applied result."""
+    output = {"name": "Copo de vidro", "description": "Copo transparente"}
+    responses = FakeResponses([json.dumps(output), json.dumps(output)])
+    cache = VisionCache(str(tmp_path / "vision.sqlite"))
+    service = make_service(responses, cache=cache)
+    item = Item(name="Copo", photo_data=b"img")
+
+    apply_result(item, asyncio.run(service.extract_item_details_from_image(item)))
+    assert item.name == "Copo de vidro"
+    assert user_hints(item) == {"name": "Copo"}
+
+    asyncio.run(service.extract_item_details_from_image(item))
+    assert len(responses.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+    # Uma edição do usuário vira a nova dica: outra chave, nova análise
+    item.description = "Copo da cozinha"
+    asyncio.run(service.extract_item_details_from_image(item))
+    assert len(responses.requests) == 2
+    assert user_hints(item) == {"name": "Copo", "description": "Copo da cozinha"}
+    cache.close()
+
+
+def test_partial_json_reports_fields_as_they_complete():
+    """Test incremental parsing of a JSON object cut at every position."""
+    full = json.dumps(
+        {"name": 'Copo "Duralex"', "description": "Vidro\ntemperado é", "brand": None}
+    )
+    truth = json.loads(full)
+
+    for end in range(len(full) + 1):
+        fields, partial = parse_partial_json(full[:end])
+        for key, value in fields.items():
+            if key == partial:
+                assert truth[key].startswith(value)
+            else:
+                assert truth[key] == value
+
+    assert stream_progress(full[: full.index("description")]) == {
+        "name": 'Copo "Duralex"'
+    }
+    assert stream_progress('{"name": "Co') == {}
+
+
+def test_streaming_reports_name_before_the_response_completes():
+    """Test streaming against the fake server: the name arrives before the result."""
+    progress = []
+
+    async def on_progress(fields):
+        progress.append(dict(fields))
+
+    with FakeOpenAIServer(chunk_size=16, chunk_delay=0.005) as server:
+        service = VisionService(
+            api_key="sk-test", enable_search=False, base_url=server.base_url
+        )
+        item = Item(photo_data=b"img")
+        result = asyncio.run(
+            service.extract_item_details_from_image(item, on_progress=on_progress)
+        )
+
+        [request] = server.requests
+
+    assert request["stream"] is True
+    assert result.name == DEFAULT_OUTPUT["name"]
+    assert result.model == DEFAULT_OUTPUT["model"]
+    assert progress[0] == {"name": DEFAULT_OUTPUT["name"]}
+    assert len(progress) > 2
+    assert DEFAULT_OUTPUT["description"].startswith(progress[-2]["description"])
+    assert service.parse_stats == {"structured": 1}
+
+
+def test_static_instructions_come_first_and_usage_is_recorded():
+    """Test that instructions are a shared prefix and cache hits are counted."""
+
+    async def run(service):
+        for name in ("Copo", "Furadeira"):
+            item = Item(name=name, photo_data=b"img")
+            await service.extract_item_details_from_image(item)
+
+    with FakeOpenAIServer() as server:
+        service = VisionService(
+            api_key="sk-test", enable_search=False, base_url=server.base_url
+        )
+        asyncio.run(run(service))
+        first, second = server.requests
+
+    assert first["instructions"] == second["instructions"]
+    # A busca web só acrescenta instruções: o prefixo em cache é o mesmo
+    assert SYSTEM_PROMPTS[True].startswith(first["instructions"])
+    assert len(SYSTEM_PROMPTS[True]) > len(first["instructions"])
+    assert "Copo" not in first["instructions"]
+    assert "Copo" in first["input"][0]["content"][0]["text"]
+    assert first["input"][0]["content"][-1]["type"] == "input_image"
+
+    stats = service.usage_stats()
+    assert stats["requests"] == 2
+    assert stats["output_tokens"] > 0
+    assert 0 < stats["cached_input_tokens"] < stats["input_tokens"]
+    assert 0 < stats["prompt_cache_hit_rate"] < 1
+
+
+def test_malformed_responses_from_the_fake_server_use_fallback():
+    """Test the fake server's malformed-JSON rate and traffic counters."""
+    with FakeOpenAIServer(malformed_rate=1.0, keep_requests=False) as server:
+        service = VisionService(
+            api_key="sk-test", enable_search=False, base_url=server.base_url
+        )
+        result = asyncio.run(
+            service.extract_item_details_from_image(Item(photo_data=b"img"))
+        )
+
+    assert result.name == DEFAULT_OUTPUT["name"]
+    assert service.parse_stats == {"fallback": 1}
+    assert server.requests == []
+    assert server.request_count == 1
+    assert server.bytes_received > 0 and server.bytes_sent > 0
+
+
+def test_openai_is_imported_only_when_the_client_is_needed():
+    """Test that importing the vision module and building the service stay cheap."""
+    code = (
+        "import sys\n"
+        "from inventorybot.vision import VisionService\n"
+        "service = VisionService(api_key='sk-test')\n"
+        "print('openai' in sys.modules)\n"
+        "service.warm_up()\n"
+        "print('openai' in sys.modules)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.split() == ["False", "True"]
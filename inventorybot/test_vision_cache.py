@@ -0,0 +1,53 @@
+from inventorybot.vision import VisionResult
+from inventorybot.vision_cache import VisionCache
+
+
+def test_cache_key_depends_on_image_and_hints():
+    """Test that the key changes with image bytes and user hints."""
+    key = VisionCache.make_key(b"img", "Furadeira", None)
+    assert key == VisionCache.make_key(b"img", "Furadeira", None)
+    assert key != VisionCache.make_key(b"img2", "Furadeira", None)
+    assert key != VisionCache.make_key(b"img", "Furadeira", "Bosch")
+    assert VisionCache.make_key(b"img", "ab", "") != VisionCache.make_key(
+        b"img", "a", "b"
+    )
+
+
+def test_cache_counts_hits_and_misses():
+    """Test hit/miss counters."""
+    cache = VisionCache()
+    result = VisionResult(name="Copo", description="Copo vermelho")
+
+    assert cache.get("k") is None
+    cache.put("k", result)
+    assert cache.get("k") == result
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_cache_evicts_least_recently_used():
+    """Test LRU eviction when the cache is full."""
+    cache = VisionCache(max_entries=2)
+    cache.put("a", VisionResult(name="a", description=""))
+    cache.put("b", VisionResult(name="b", description=""))
+    cache.get("a")
+    cache.put("c", VisionResult(name="c", description=""))
+
+    assert cache.get("b") is None
+    assert cache.get("a").name == "a"
+    assert cache.get("c").name == "c"
+
+
+def test_cache_persists_between_instances(tmp_path):
+    """Test that entries survive a restart when a path is given."""
+    path = str(tmp_path / "cache.sqlite3")
+    cache = VisionCache(path, max_entries=2)
+    cache.put("a", VisionResult(name="a", description="", brand="Bosch"))
+    cache.put("b", VisionResult(name="b", description=""))
+    cache.put("c", VisionResult(name="c", description=""))
+    cache.close()
+
+    reopened = VisionCache(path, max_entries=2)
+    assert len(reopened) == 2
+    assert reopened.get("a") is None
+    assert reopened.get("c").name == "c"
+    reopened.close()
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from inventorybot.entities import Item
+from inventorybot.vision import VisionResult
+from inventorybot.vision_queue import QueueFullError, VisionQueue
+
+
+class SlowVisionService:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def extract_item_details_from_image(self, item):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            return VisionResult(name=f"{item.name} analisado", description="")
+        finally:
+            self.running -= 1
+
+
+def test_queue_limits_concurrency():
+    """Test that no more than max_concurrency analyses run at once."""
+    service = SlowVisionService()
+
+    async def run():
+        queue = VisionQueue(service, max_concurrency=2, max_pending=10)
+        results = await asyncio.gather(
+            *(queue.submit(Item(name=f"item {i}")) for i in range(6))
+        )
+        await queue.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert [r.name for r in results] == [f"item {i} analisado" for i in range(6)]
+    assert service.max_running == 2
+
+
+def test_queue_reports_positions():
+    """Test that waiting jobs receive their position until they start."""
+    service = SlowVisionService()
+    positions = []
+
+    async def run():
+        queue = VisionQueue(service, max_concurrency=1, max_pending=10)
+        first = asyncio.create_task(queue.submit(Item(name="a")))
+        await asyncio.sleep(0)
+
+        async def on_position(position):
+            positions.append(position)
+
+        await asyncio.gather(first, queue.submit(Item(name="b"), on_position))
+        await asyncio.sleep(0)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert positions == [1, 0]
+
+
+def test_queue_rejects_when_full():
+    """Test that submit fails fast when the bounded queue is full."""
+    service = SlowVisionService(delay=0.05)
+
+    async def run():
+        queue = VisionQueue(service, max_concurrency=1, max_pending=1)
+        first = asyncio.create_task(queue.submit(Item(name="a")))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(queue.submit(Item(name="b")))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await queue.submit(Item(name="c"))
+        await asyncio.gather(first, second)
+        await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_analyses_wait_for_the_warm_up():
+    """Test that workers only start analysing once the client warm-up ends."""
+    events = []
+
+    class WarmingVisionService(SlowVisionService):
+        def warm_up(self):
+            time.sleep(0.05)
+            events.append("warm_up")
+
+        async def extract_item_details_from_image(self, item):
+            events.append(item.name)
+            return await super().extract_item_details_from_image(item)
+
+    async def run():
+        queue = VisionQueue(WarmingVisionService(), max_concurrency=2)
+        queue.warm_up()
+        await asyncio.gather(queue.submit(Item(name="a")), queue.submit(Item(name="b")))
+        await queue.stop()
+
+    asyncio.run(run())
+    assert events == ["warm_up", "a", "b"]
@@ -0,0 +1,279 @@
+"""
+Servidor local que imita o endpoint `POST /v1/responses` da OpenAI, para testes
+e benchmarks do `VisionService` sem rede e sem custo.
+
+Responde com um JSON fixo (`output`), em uma única resposta ou em streaming
+(SSE com eventos `response.output_text.delta`), com atrasos configuráveis.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+DEFAULT_OUTPUT = {
+    "name": "Furadeira de Impacto Bosch GSB 13 RE",
+    "description": (
+        "Furadeira de impacto com fio, corpo azul e preto, mandril de 13 mm, "
+        "chave seletora de impacto e empunhadura auxiliar."
+    ),
+    "brand": "Bosch",
+    "color": "azul",
+    "model": "GSB 13 RE",
+    "barcode": None,
+    "confidence": 0.92,
+}
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Cliente que desiste da resposta (timeout, hedge cancelado) é esperado
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeOpenAIServer:
+    """
+    Uso:
+        with FakeOpenAIServer(chunk_delay=0.01) as server:
+            service = VisionService(api_key="sk-test", base_url=server.base_url)
+
+    - `latency`: espera (s) antes do primeiro byte da resposta; um número
+      ou uma função que sorteia a espera de cada requisição
+    - `malformed_rate`: fração das respostas com JSON fora do schema (texto
+      em volta e vírgula sobrando), que exige a extração heurística
+    - `chunk_size`/`chunk_delay`: tamanho (caracteres) e intervalo entre os
+      deltas no streaming
+    - `inject`: atrasos e erros HTTP para as próximas requisições
+    - `requests`: corpos JSON recebidos, em ordem (com `keep_requests`)
+    - `bytes_received`/`bytes_sent`: tráfego total, corpos e cabeçalhos
+    """
+
+    def __init__(
+        self,
+        output: dict[str, Any] | str | None = None,
+        latency: float | Callable[[], float] = 0.0,
+        chunk_size: int = 8,
+        chunk_delay: float = 0.0,
+        malformed_rate: float = 0.0,
+        keep_requests: bool = True,
+        seed: int | None = None,
+    ):
+        self.output = DEFAULT_OUTPUT if output is None else output
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.malformed_rate = malformed_rate
+        self.keep_requests = keep_requests
+        self.requests: list[dict[str, Any]] = []
+        self.request_count = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+
+        self._ids = itertools.count(1)
+        self._faults: list[tuple[int | None, float]] = []
+        self._seen_prefixes: set[str] = set()
+        self._lock = threading.Lock()
+        self._server = _QuietHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-openai", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def inject(self, status: int | None = None, delay: float = 0.0, times: int = 1):
+        """
+        As próximas `times` requisições esperam `delay` s e, com `status`,
+        respondem com esse erro HTTP.
+        """
+        with self._lock:
+            self._faults.extend([(status, delay)] * times)
+
+    def _next_fault(self) -> tuple[int | None, float]:
+        with self._lock:
+            return self._faults.pop(0) if self._faults else (None, 0.0)
+
+    # =========================
+    # Respostas
+    # =========================
+    def output_text(self) -> str:
+        if isinstance(self.output, str):
+            return self.output
+        text = json.dumps(self.output, ensure_ascii=False)
+        with self._lock:
+            malformed = self._random.random() < self.malformed_rate
+        if malformed:
+            return f"Claro! Aqui está o JSON:\n{text[:-1]},}}\nEspero ter ajudado."
+        return text
+
+    def _delay(self) -> float:
+        if callable(self.latency):
+            with self._lock:
+                return max(self.latency(), 0.0)
+        return self.latency
+
+    def response_body(self, request: dict[str, Any], text: str) -> dict[str, Any]:
+        response_id = f"resp_{next(self._ids)}"
+        return {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": request.get("model", "fake"),
+            "output": [
+                {
+                    "type": "message",
+                    "id": f"msg_{response_id}",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [
+                        {"type": "output_text", "text": text, "annotations": []}
+                    ],
+                }
+            ],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": request.get("tools") or [],
+            "usage": self.usage(request, text),
+        }
+
+    def usage(self, request: dict[str, Any], text: str) -> dict[str, Any]:
+        """
+        Contagem aproximada (4 caracteres por token) que imita o cache de
+        prompt do provedor: instruções já vistas contam como entrada em cache.
+        """
+        instructions = request.get("instructions") or ""
+        prefix_tokens = len(instructions) // 4
+        input_tokens = prefix_tokens + len(json.dumps(request.get("input"))) // 4
+        with self._lock:
+            cached = prefix_tokens if instructions in self._seen_prefixes else 0
+            self._seen_prefixes.add(instructions)
+        output_tokens = len(text) // 4
+        return {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": cached},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def stream_events(self, request: dict[str, Any], text: str):
+        """Eventos (tipo, dados) do streaming; `sequence_number` é posto no envio."""
+        body = self.response_body(request, text)
+        item_id = body["output"][0]["id"]
+
+        in_progress = {**body, "status": "in_progress", "output": []}
+        yield "response.created", {"response": in_progress}
+        for start in range(0, len(text), self.chunk_size):
+            yield "response.output_text.delta", {
+                "item_id": item_id,
+                "output_index": 0,
+                "content_index": 0,
+                "delta": text[start : start + self.chunk_size],
+                "logprobs": [],
+            }
+        yield "response.output_text.done", {
+            "item_id": item_id,
+            "output_index": 0,
+            "content_index": 0,
+            "text": text,
+            "logprobs": [],
+        }
+        yield "response.completed", {"response": body}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.request_count += 1
+                    server.bytes_received += length + len(str(self.headers))
+                    if server.keep_requests:
+                        server.requests.append(request)
+
+                status, delay = server._next_fault()
+                delay += server._delay()
+                if delay:
+                    time.sleep(delay)
+                if status:
+                    error = {"message": f"Erro injetado ({status})", "type": "fake"}
+                    self._json(status, {"error": error})
+                    return
+
+                text = server.output_text()
+                if request.get("stream"):
+                    self._stream(request, text)
+                else:
+                    self._json(200, server.response_body(request, text))
+
+            def _write(self, data: bytes):
+                self.wfile.write(data)
+                with server._lock:
+                    server.bytes_sent += len(data)
+
+            def _json(self, status: int, body: dict[str, Any]):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self._write(data)
+
+            def _stream(self, request: dict[str, Any], text: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                for number, (event, data) in enumerate(
+                    server.stream_events(request, text)
+                ):
+                    payload = {"type": event, "sequence_number": number, **data}
+                    self._write(
+                        f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode()
+                    )
+                    self.wfile.flush()
+                    if event == "response.output_text.delta" and server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                self.close_connection = True
+
+        return Handler
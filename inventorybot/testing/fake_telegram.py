@@ -0,0 +1,260 @@
+"""
+Bot API falsa para testes e benchmarks: respostas fixas, sem rede.
+
+`FakeTelegramRequest` substitui o `HTTPXRequest` do python-telegram-bot
+(`ApplicationBuilder().request(...)`) e registra cada chamada feita pelo bot.
+As funções `message_update`/`photo_update`/`callback_update` montam o JSON de
+updates sintéticos, no formato que o Telegram envia ao webhook.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import socket
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from telegram.request import BaseRequest, RequestData
+
+BOT_ID = 1
+BOT_USERNAME = "inventory_test_bot"
+
+_MESSAGE_METHODS = {
+    "sendMessage",
+    "sendPhoto",
+    "editMessageText",
+    "editMessageCaption",
+    "editMessageMedia",
+}
+
+
+@dataclass
+class FakeCall:
+    method: str
+    params: dict[str, Any]
+    # time.perf_counter() no momento da chamada
+    at: float = field(default_factory=time.perf_counter)
+
+
+class FakeTelegramRequest(BaseRequest):
+    """
+    Responde às chamadas da Bot API como o Telegram responderia, sem rede.
+
+    Downloads de arquivos (`getFile` + download) devolvem `file_content`.
+    `wait_for` permite aguardar até que um método seja chamado.
+    """
+
+    def __init__(self, file_content: bytes = b"\xff\xd8\xff\xd9"):
+        self.file_content = file_content
+        self.calls: list[FakeCall] = []
+        self._message_ids = itertools.count(1_000_000)
+        self._changed = asyncio.Condition()
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def calls_to(self, method: str) -> list[FakeCall]:
+        return [call for call in self.calls if call.method == method]
+
+    async def wait_for(self, method: str, count: int = 1, timeout: float = 5.0):
+        """Espera até que `method` tenha sido chamado `count` vezes."""
+        await self.wait_until(lambda: len(self.calls_to(method)) >= count, timeout)
+        return self.calls_to(method)
+
+    async def wait_until(
+        self, predicate: Callable[[], bool], timeout: float = 5.0
+    ) -> None:
+        """Espera até que `predicate()` seja verdadeiro (reavaliado a cada chamada)."""
+        async with self._changed:
+            await asyncio.wait_for(self._changed.wait_for(predicate), timeout)
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: RequestData | None = None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ) -> tuple[int, bytes]:
+        if "/file/bot" in url:
+            return 200, self.file_content
+
+        api_method = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls.append(FakeCall(api_method, params))
+        async with self._changed:
+            self._changed.notify_all()
+
+        payload = {"ok": True, "result": self._result(api_method, params)}
+        return 200, json.dumps(payload).encode()
+
+    def _result(self, method: str, params: dict[str, Any]) -> Any:
+        if method == "getMe":
+            return {
+                "id": BOT_ID,
+                "is_bot": True,
+                "first_name": "Inventory",
+                "username": BOT_USERNAME,
+                "can_join_groups": False,
+                "can_read_all_group_messages": False,
+                "supports_inline_queries": False,
+            }
+
+        if method == "getFile":
+            file_id = params.get("file_id", "file")
+            return {
+                "file_id": file_id,
+                "file_unique_id": f"unique-{file_id}",
+                "file_size": len(self.file_content),
+                "file_path": f"photos/{file_id}.jpg",
+            }
+
+        if method in _MESSAGE_METHODS:
+            message = {
+                "message_id": params.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id", 0), "type": "private"},
+            }
+            if method in ("sendPhoto", "editMessageMedia"):
+                message["photo"] = [_photo_size(f"sent-{message['message_id']}")]
+                message["caption"] = params.get("caption", "")
+            elif "caption" in params:
+                message["caption"] = params["caption"]
+            else:
+                message["text"] = params.get("text", "")
+            return message
+
+        if method == "getUpdates":
+            return []
+
+        # setWebhook, deleteWebhook, answerCallbackQuery, ...
+        return True
+
+
+# =========================
+# Updates sintéticos
+# =========================
+_update_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"user-{user_id}"}
+
+
+def _photo_size(file_id: str, size: int = 4) -> dict[str, Any]:
+    return {
+        "file_id": file_id,
+        "file_unique_id": f"unique-{file_id}",
+        "width": 1280,
+        "height": 960,
+        "file_size": size,
+    }
+
+
+def _message(user_id: int, chat_id: int | None = None, **fields) -> dict[str, Any]:
+    # Sem `chat_id`, o chat privado do usuário
+    if chat_id is None:
+        chat = {"id": user_id, "type": "private"}
+    else:
+        chat = {"id": chat_id, "type": "group", "title": f"group-{chat_id}"}
+    return {
+        "message_id": next(_update_ids),
+        "date": int(time.time()),
+        "chat": chat,
+        "from": _user(user_id),
+        **fields,
+    }
+
+
+def message_update(
+    user_id: int, text: str, chat_id: int | None = None
+) -> dict[str, Any]:
+    """Mensagem de texto (ou comando, se começar com "/"), por padrão no privado."""
+    fields: dict[str, Any] = {"text": text}
+    if text.startswith("/"):
+        command = text.split()[0]
+        fields["entities"] = [
+            {"type": "bot_command", "offset": 0, "length": len(command)}
+        ]
+    return {
+        "update_id": next(_update_ids),
+        "message": _message(user_id, chat_id, **fields),
+    }
+
+
+def photo_update(
+    user_id: int,
+    file_id: str = "photo",
+    media_group_id: str | None = None,
+    caption: str | None = None,
+) -> dict[str, Any]:
+    fields: dict[str, Any] = {"photo": [_photo_size(file_id)]}
+    if caption:
+        fields["caption"] = caption
+    if media_group_id:
+        fields["media_group_id"] = media_group_id
+    return {"update_id": next(_update_ids), "message": _message(user_id, **fields)}
+
+
+def callback_update(
+    user_id: int, data: str, message_id: int | None = None, chat_id: int | None = None
+) -> dict[str, Any]:
+    # Mensagem (do bot) onde estava o botão
+    message = _message(user_id, chat_id, text="")
+    message["from"] = {"id": BOT_ID, "is_bot": True, "first_name": "Inventory"}
+    if message_id is not None:
+        message["message_id"] = message_id
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "message": message,
+            "data": data,
+        },
+    }
+
+
+# =========================
+# Cliente do webhook
+# =========================
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _post(url: str, body: bytes, secret_token: str | None) -> int:
+    headers = {"Content-Type": "application/json"}
+    if secret_token:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret_token
+    request = urllib.request.Request(url, data=body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+async def post_update(
+    url: str, update: dict[str, Any], secret_token: str | None = None
+) -> int:
+    """Envia `update` ao webhook como o Telegram faria; retorna o status HTTP."""
+    body = json.dumps(update).encode()
+    return await asyncio.to_thread(_post, url, body, secret_token)
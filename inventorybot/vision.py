@@ -1,15 +1,33 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
+import logging
 import os
 import re
+import threading
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterable
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from openai import OpenAI
-from icecream import ic
+from inventorybot import metrics
+from inventorybot.imaging import ImageOptions, prepare_image
+from inventorybot.resilience import ResilientCaller
+
+if TYPE_CHECKING:
+    from inventorybot.entities import Item
+    from inventorybot.vision_cache import VisionCache
+
+logger = logging.getLogger(__name__)
+
+# Recebe os campos de texto já gerados durante o streaming
+ProgressCallback = Callable[[dict[str, str]], Awaitable[None]]
+
+_json_decoder = json.JSONDecoder()
 
 
 @dataclass
@@ -18,21 +36,272 @@ class VisionResult:
     description: str
     brand: str | None = None
     color: str | None = None
+    # Identificadores visíveis (modelo, código de barras) e a confiança do
+    # modelo na identificação (0 a 1)
+    model: str | None = None
+    barcode: str | None = None
+    confidence: float | None = None
+    # True se o resultado veio de uma análise com busca web
+    searched: bool = False
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "VisionResult":
+        confidence = data.get("confidence")
         return cls(
             name=str(data.get("name", "N/A")),
             description=str(data.get("description", "")),
-            brand=(None if data.get("brand") in ("", None) else str(data.get("brand"))),
-            color=(None if data.get("color") in ("", None) else str(data.get("color"))),
+            brand=_optional_str(data.get("brand")),
+            color=_optional_str(data.get("color")),
+            model=_optional_str(data.get("model")),
+            barcode=_optional_str(data.get("barcode")),
+            confidence=(
+                float(confidence) if isinstance(confidence, (int, float)) else None
+            ),
+            searched=bool(data.get("searched", False)),
+        )
+
+
+def _optional_str(value: Any) -> str | None:
+    return None if value in ("", None) else str(value)
+
+
+# Campos que a análise preenche no item e que o usuário também informa
+HINT_FIELDS = ("name", "description")
+
+
+def user_hints(item: Item) -> dict[str, str]:
+    """
+    Nome e descrição informados pelo usuário: os valores atuais do item, menos
+    os que foram escritos pela análise de imagem, no lugar dos quais valem os
+    que o usuário tinha informado antes dela.
+    """
+    hints = dict(item.vision_hints or {})
+    written = item.vision_values or {}
+    for field in HINT_FIELDS:
+        value = getattr(item, field)
+        if field in written and value == written[field]:
+            continue
+        if value:
+            hints[field] = value
+        else:
+            hints.pop(field, None)
+    return hints
+
+
+def apply_result(
+    item: Item, result: VisionResult, fields: Iterable[str] = HINT_FIELDS
+) -> None:
+    """
+    Escreve o resultado nos campos `fields` do item, guardando antes as dicas
+    do usuário.
+    """
+    item.vision_hints = user_hints(item)
+    values = dict(item.vision_values or {})
+    for field in fields:
+        value = getattr(result, field)
+        setattr(item, field, value)
+        values[field] = value
+    item.vision_values = values
+
+
+def parse_partial_json(text: str) -> tuple[dict[str, Any], str | None]:
+    """
+    Lê os campos de um objeto JSON ainda incompleto (resposta em streaming).
+
+    Devolve os campos encontrados e o nome do campo cujo valor (string) ainda
+    está sendo gerado, se houver; esse valor vem parcial no dicionário.
+    '{"name": "Furadeira", "description": "Furadeira de imp' ->
+    ({"name": "Furadeira", "description": "Furadeira de imp"}, "description")
+    """
+    fields: dict[str, Any] = {}
+    position = text.find("{")
+    if position == -1:
+        return fields, None
+
+    length = len(text)
+    position += 1
+    while True:
+        while position < length and text[position] in " \t\r\n,":
+            position += 1
+        if position >= length or text[position] != '"':
+            return fields, None
+
+        try:
+            key, position = json.decoder.scanstring(text, position + 1)
+        except json.JSONDecodeError:
+            return fields, None
+
+        while position < length and text[position] in " \t\r\n:":
+            position += 1
+        if position >= length:
+            return fields, None
+
+        if text[position] == '"':
+            try:
+                value, position = json.decoder.scanstring(text, position + 1)
+            except json.JSONDecodeError:
+                fields[key] = _partial_string(text[position + 1 :])
+                return fields, key
+        else:
+            try:
+                value, position = _json_decoder.raw_decode(text, position)
+            except json.JSONDecodeError:
+                return fields, None
+            if position >= length or text[position] not in " \t\r\n,}":
+                # número possivelmente incompleto ("0." de "0.92")
+                return fields, None
+        fields[key] = value
+
+
+def _partial_string(fragment: str) -> str:
+    # Descarta um escape incompleto no fim ("\\" ou "\\u00e")
+    escape = fragment.rfind("\\")
+    if escape != -1 and escape >= len(fragment) - 6:
+        backslashes = len(fragment[: escape + 1]) - len(
+            fragment[: escape + 1].rstrip("\\")
         )
+        if backslashes % 2:
+            tail = fragment[escape:]
+            complete = len(tail) >= 2 and (tail[1] != "u" or len(tail) >= 6)
+            if not complete:
+                fragment = fragment[:escape]
+    try:
+        return json.loads(f'"{fragment}"')
+    except json.JSONDecodeError:
+        return fragment
+
+
+def stream_progress(text: str) -> dict[str, str]:
+    """Campos exibíveis durante o streaming: só a partir do nome completo."""
+    fields, partial = parse_partial_json(text)
+    if not isinstance(fields.get("name"), str) or partial == "name":
+        return {}
+    return {
+        key: fields[key]
+        for key in ("name", "description")
+        if isinstance(fields.get(key), str)
+    }
+
+
+# Instruções comuns a todas as análises, com e sem busca web
+SYSTEM_PROMPT = (
+    "Você é um assistente especializado em catalogação de inventário. "
+    "Sua tarefa é analisar a imagem do produto e retornar informações COMPLETAS e PRECISAS.\n"
+    "\n## INFORMAÇÕES FORNECIDAS PELO USUÁRIO:\n"
+    "A mensagem pode trazer nome e descrição preenchidos pelo usuário. "
+    "Estas são informações parciais: use-as como ponto de partida, mas você DEVE:\n"
+    "1. Verificar se correspondem ao que você vê na imagem\n"
+    "2. Complementar com detalhes visuais da imagem\n"
+    "3. Registrar marca, modelo e código de barras visíveis na imagem\n"
+    "\n## FORMATO DE SAÍDA:\n"
+    "Retorne APENAS um objeto JSON com os campos:\n"
+    "- 'name': Nome COMPLETO e ESPECÍFICO do produto (inclua marca, modelo, versão se identificável)\n"
+    "- 'description': Descrição DETALHADA incluindo:\n"
+    "  * Características visuais da imagem\n"
+    "  * Especificações técnicas (se encontradas via busca)\n"
+    "  * Material, dimensões aproximadas, estado de conservação\n"
+    "  * Qualquer detalhe relevante para inventário\n"
+    "- 'brand': Marca/fabricante (se identificável), ou null\n"
+    "- 'color': Cor(es) predominante(s), ou null\n"
+    "- 'model': Modelo/referência visível na imagem ou informado, ou null\n"
+    "- 'barcode': Código de barras (EAN/UPC) legível na imagem, ou null\n"
+    "- 'confidence': Sua confiança na identificação do produto, de 0 a 1\n\n"
+    "IMPORTANTE:\n"
+    "- Texto SEMPRE em português do Brasil\n"
+    "- Seja ESPECÍFICO, não genérico (ex: 'Tênis Nike Air Max 90 Branco' e não apenas 'Tênis branco')\n"
+    "- Combine informações visuais + informações do usuário\n"
+    "- Retorne APENAS o JSON, sem markdown, sem explicações adicionais\n\n"
+    "Exemplo de saída:\n"
+    '{"name": "Tênis Nike Air Max 90 Essential", '
+    '"description": "Tênis esportivo Nike Air Max 90 na cor branca com detalhes em cinza. '
+    "Tecnologia Air visível no calcanhar. Solado em borracha com tração multidirecional. "
+    'Cabedal em couro sintético e mesh para respirabilidade. Estado: usado, bom estado de conservação.", '
+    '"brand": "Nike", "color": "branco", "model": "Air Max 90", '
+    '"barcode": null, "confidence": 0.9}\n'
+)
+
+# Acrescentado ao fim de `SYSTEM_PROMPT` nas análises com busca web
+SEARCH_GUIDANCE = (
+    "\n## QUANDO E COMO USAR A BUSCA WEB:\n"
+    "Nesta análise você TEM ACESSO à ferramenta de busca web. Use-a estrategicamente quando:\n\n"
+    "1. **Produtos com marca visível**: Busque por 'marca + modelo' para obter especificações exatas\n"
+    "2. **Informações do usuário são genéricas**: Ex: usuário disse 'tênis Nike', "
+    "busque para identificar o modelo específico (Air Max, Air Force, etc.), "
+    "ano de fabricação e outros detalhes relevantes\n"
+    "3. **Produtos eletrônicos/técnicos**: Sempre busque para obter especificações técnicas completas\n"
+    "4. **Embalagens com código/modelo**: Use o código de barras ou modelo visível na imagem "
+    "para confirmar e enriquecer os dados\n"
+    "5. **Produtos importados/com texto estrangeiro**: Busque para traduzir e obter contexto\n\n"
+    "COMO BUSCAR:\n"
+    "- Combine marca + modelo visível na imagem ou fornecido pelo usuário\n"
+    "- Adicione termos como 'especificações', 'características', 'ficha técnica'\n"
+    "- Para produtos em português: busque em PT-BR primeiro\n"
+    "- Exemplos de buscas:\n"
+    "  * 'Nike Air Max 90 especificações'\n"
+    "  * 'Samsung Galaxy S23 ficha técnica'\n"
+    "  * 'Lego Star Wars 75192 detalhes'\n\n"
+    "NÃO BUSQUE quando:\n"
+    "- O produto é genérico sem marca (ex: 'copo plástico vermelho')\n"
+    "- A imagem já mostra todos os detalhes necessários claramente\n"
+    "- Itens artesanais ou únicos sem referência comercial\n\n"
+    "Combine informações visuais + informações do usuário + dados da web.\n"
+    "\n## ESTIMATIVA ANTERIOR (SUA ANÁLISE SEM BUSCA WEB):\n"
+    "Se a mensagem trouxer uma ESTIMATIVA ANTERIOR, ela é o resultado de uma "
+    "análise sua sem busca web, não informação do usuário: use a busca web "
+    "a partir desses dados para confirmar o produto e completar a descrição.\n\n"
+    "Ao final, retorne APENAS o JSON no formato acima.\n"
+)
+
+# Instruções fixas, montadas uma única vez. A versão com busca web só
+# acrescenta orientações depois das comuns, então todas as chamadas começam
+# pelo mesmo prefixo, idêntico byte a byte, aproveitado pelo cache de prompt
+# do provedor. Tudo que varia por item vai depois delas, com a imagem.
+SYSTEM_PROMPTS = {False: SYSTEM_PROMPT, True: SYSTEM_PROMPT + SEARCH_GUIDANCE}
+
+# Agrupa as requisições no mesmo cache de prompt do provedor
+PROMPT_CACHE_KEY = "inventorybot-vision"
+
+
+# Formato da resposta pedido ao modelo (structured outputs): os campos de
+# `VisionResult`, todos obrigatórios, com null para os desconhecidos
+VISION_RESULT_FORMAT = {
+    "type": "json_schema",
+    "name": "vision_result",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "description": {"type": "string"},
+            "brand": {"type": ["string", "null"]},
+            "color": {"type": ["string", "null"]},
+            "model": {"type": ["string", "null"]},
+            "barcode": {"type": ["string", "null"]},
+            "confidence": {"type": "number"},
+        },
+        "required": [
+            "name",
+            "description",
+            "brand",
+            "color",
+            "model",
+            "barcode",
+            "confidence",
+        ],
+        "additionalProperties": False,
+    },
+}
 
 
 class VisionService:
     """
     Serviço para extrair detalhes de um item a partir de uma imagem,
     usando a OpenAI Responses API (visão multimodal) com capacidade de busca web.
+
+    No modo em camadas (`tiered`), a análise padrão é feita sem ferramentas,
+    bem mais rápida; a busca web fica para uma segunda análise, pedida pelo
+    usuário ou quando `needs_search` indica marca, modelo ou código de barras
+    identificados na primeira com confiança abaixo de `search_confidence`.
     """
 
     def __init__(
@@ -40,21 +309,78 @@ class VisionService:
         api_key: str | None = None,
         model: str | None = None,
         enable_search: bool = True,
+        tiered: bool = True,
+        search_confidence: float = 0.8,
+        cache: VisionCache | None = None,
+        image_options: ImageOptions | None = None,
+        detail: str = "auto",
+        structured_output: bool = True,
+        base_url: str | None = None,
+        resilience: ResilientCaller | None = None,
     ):
         api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY ausente.")
-        self.client = OpenAI(api_key=api_key)
+        # base_url: servidor compatível (ex.: `FakeOpenAIServer` nos testes)
+        self._api_key = api_key
+        self._base_url = base_url
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.resilience = resilience or ResilientCaller()
 
         # Modelo padrão com visão; ajuste se usar outro deployment.
         # Ex.: "gpt-4o-mini" é visão-capaz e estável.
         self.model = model or os.getenv("OPENAI_VISION_MODEL", "gpt-4o-mini")
         self.enable_search = enable_search
+        self.tiered = tiered
+        self.search_confidence = search_confidence
+        self.cache = cache
+        # Redimensionamento antes do upload e nível de detalhe pedido ao modelo
+        # ("low", "high" ou "auto").
+        self.image_options = image_options
+        self.detail = detail
+        # Resposta restrita ao schema de `VisionResult`; desligado sozinho se o
+        # modelo não suportar, caindo nas heurísticas de `_extract_json`
+        self.structured_output = structured_output
+        # "structured": resposta no schema; "fallback": precisou das heurísticas
+        self.parse_stats: Counter[str] = Counter()
+        # Tokens somados de todas as respostas: requests, input_tokens,
+        # cached_input_tokens e output_tokens (ver `usage_stats`)
+        self.usage: Counter[str] = Counter()
+
+    @property
+    def client(self):
+        """
+        Cliente da OpenAI, criado na primeira análise: importar o pacote
+        `openai` leva boa parte de um segundo e atrasaria a inicialização.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import AsyncOpenAI
+
+                    # Novas tentativas, prazo e hedge ficam a cargo de `resilience`
+                    self._client = AsyncOpenAI(
+                        api_key=self._api_key, base_url=self._base_url, max_retries=0
+                    )
+        return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+
+    def warm_up(self) -> None:
+        """
+        Cria o cliente antes da primeira análise (ex.: numa thread), importando
+        o pacote `openai` e os recursos da Responses API, para que esse import
+        não trave o event loop.
+        """
+        self.client.responses
 
     @staticmethod
-    def _encode_image_to_data_url(image_path: str) -> str:
+    def _read_image(image_path: str) -> tuple[bytes, str]:
         """
-        Lê o arquivo e devolve uma data URL base64 (ex.: data:image/png;base64,....)
+        Lê o arquivo e devolve seus bytes e o mime type
         """
         path = Path(image_path)
         if not path.is_file():
@@ -68,7 +394,14 @@ class VisionService:
             ".bmp": "image/bmp",
         }.get(path.suffix.lower(), "image/jpeg")
 
-        b64 = base64.b64encode(path.read_bytes()).decode("utf-8")
+        return path.read_bytes(), mime
+
+    @staticmethod
+    def _to_data_url(image: bytes, mime: str) -> str:
+        """
+        Devolve uma data URL base64 (ex.: data:image/png;base64,....)
+        """
+        b64 = base64.b64encode(image).decode("utf-8")
         return f"data:{mime};base64,{b64}"
 
     @staticmethod
@@ -111,117 +444,283 @@ class VisionService:
         # 3) última tentativa: json.loads de tudo
         return json.loads(text)
 
-    def extract_item_details_from_image(self, item: Item) -> VisionResult:
-        data_url = self._encode_image_to_data_url(item.photo)
+    @staticmethod
+    def _build_item_prompt(
+        hints: dict[str, str], previous: VisionResult | None = None
+    ) -> str:
+        """
+        Parte variável do prompt, enviada depois das instruções fixas de
+        `SYSTEM_PROMPTS` e antes da imagem: as dicas do usuário (`user_hints`)
+        e, na busca web, a estimativa da análise anterior, que não vem dele.
+        """
+        sections = []
 
         product_info = []
-        if item.name:
-            product_info.append(f"Nome preenchido pelo usuário: '{item.name}'")
-        if item.description:
+        if hints.get("name"):
+            product_info.append(f"Nome preenchido pelo usuário: '{hints['name']}'")
+        if hints.get("description"):
             product_info.append(
-                f"Descrição preenchida pelo usuário: '{item.description}'"
+                f"Descrição preenchida pelo usuário: '{hints['description']}'"
+            )
+        if product_info:
+            sections.append(
+                "## INFORMAÇÕES FORNECIDAS PELO USUÁRIO:\n" + "\n".join(product_info)
             )
 
-        product_info_str = ""
-        if len(product_info) > 0:
-            product_info_str = (
-                "\n\n## INFORMAÇÕES FORNECIDAS PELO USUÁRIO:\n"
-                + "\n".join(product_info)
-                + "\n\nIMPORTANTE: Estas são informações parciais do usuário. "
-                "Use-as como ponto de partida, mas você DEVE:\n"
-                "1. Verificar se correspondem ao que você vê na imagem\n"
-                "2. Complementar com detalhes visuais da imagem\n"
-                "3. Se o usuário forneceu apenas um nome genérico ou marca, USE A BUSCA WEB para "
-                "obter especificações técnicas, modelo exato, ano de fabricação, e outros detalhes relevantes\n"
-                "4. Se a imagem mostra embalagem com código de barras, modelo, ou informações específicas, "
-                "USE A BUSCA WEB para confirmar e enriquecer os dados\n"
+        if previous is not None:
+            identified = [
+                f"- {label}: {value}"
+                for label, value in (
+                    ("Nome", previous.name),
+                    ("Marca", previous.brand),
+                    ("Modelo", previous.model),
+                    ("Código de barras", previous.barcode),
+                    ("Confiança", previous.confidence),
+                )
+                if value
+            ]
+            sections.append(
+                "## ESTIMATIVA ANTERIOR (SUA ANÁLISE SEM BUSCA WEB):\n"
+                + "\n".join(identified)
             )
 
-        # Instrução aprimorada para uso de busca web
-        search_guidance = ""
-        if self.enable_search:
-            search_guidance = (
-                "\n\n## QUANDO E COMO USAR A BUSCA WEB:\n"
-                "Você TEM ACESSO à ferramenta de busca web. Use-a estrategicamente quando:\n\n"
-                "1. **Produtos com marca visível**: Busque por 'marca + modelo' para obter especificações exatas\n"
-                "2. **Informações do usuário são genéricas**: Ex: usuário disse 'tênis Nike', "
-                "busque para identificar o modelo específico (Air Max, Air Force, etc.)\n"
-                "3. **Produtos eletrônicos/técnicos**: Sempre busque para obter especificações técnicas completas\n"
-                "4. **Embalagens com código/modelo**: Use o código visível na imagem para buscar detalhes\n"
-                "5. **Produtos importados/com texto estrangeiro**: Busque para traduzir e obter contexto\n\n"
-                "COMO BUSCAR:\n"
-                "- Combine marca + modelo visível na imagem ou fornecido pelo usuário\n"
-                "- Adicione termos como 'especificações', 'características', 'ficha técnica'\n"
-                "- Para produtos em português: busque em PT-BR primeiro\n"
-                "- Exemplos de buscas:\n"
-                "  * 'Nike Air Max 90 especificações'\n"
-                "  * 'Samsung Galaxy S23 ficha técnica'\n"
-                "  * 'Lego Star Wars 75192 detalhes'\n\n"
-                "NÃO BUSQUE quando:\n"
-                "- O produto é genérico sem marca (ex: 'copo plástico vermelho')\n"
-                "- A imagem já mostra todos os detalhes necessários claramente\n"
-                "- Itens artesanais ou únicos sem referência comercial\n"
+        sections.append("Agora analise a imagem e retorne o JSON:")
+        return "\n\n".join(sections)
+
+    def needs_search(self, result: VisionResult) -> bool:
+        """
+        No modo em camadas: a primeira análise identificou algo que a busca web
+        pode enriquecer (marca, modelo ou código de barras) sem ter certeza do
+        produto? A confiança vem da própria resposta; sem ela, busca.
+        """
+        return (
+            self.can_search(result)
+            and self.tiered
+            and bool(result.brand or result.model or result.barcode)
+            and (
+                result.confidence is None
+                or result.confidence < self.search_confidence
+            )
+        )
+
+    def can_search(self, result: VisionResult) -> bool:
+        return self.enable_search and not result.searched
+
+    async def extract_item_details_from_image(
+        self,
+        item: Item,
+        search: bool | None = None,
+        previous: VisionResult | None = None,
+        on_progress: ProgressCallback | None = None,
+    ) -> VisionResult:
+        """
+        Analisa a foto do item. `search` liga ou desliga a busca web nesta
+        análise (por padrão, só fora do modo em camadas); `previous` é o
+        resultado de uma análise anterior, usado como ponto de partida.
+
+        Com `on_progress`, a resposta é recebida em streaming e o callback é
+        chamado com os campos de texto já gerados (`name` completo e
+        `description` parcial) a cada trecho novo, antes do resultado final.
+        """
+        if search is None:
+            search = not self.tiered
+        search = search and self.enable_search
+
+        if item.photo_data is not None:
+            # Foto em memória: os mesmos bytes seguem para hash/encode, sem cópia
+            image, mime = item.photo_data, "image/jpeg"
+        else:
+            image, mime = await asyncio.to_thread(self._read_image, item.photo)
+
+        # O que o usuário informou, não o que uma análise anterior já escreveu
+        # no item: vai no prompt e na chave do cache, para que "Extrair" de
+        # novo ache o mesmo resultado
+        hints = user_hints(item)
+
+        cache_key = None
+        if self.cache is not None:
+            variant = f"{self.model}+search" if search else self.model
+            cache_key, cached = await asyncio.to_thread(
+                self._cache_lookup,
+                image,
+                hints.get("name"),
+                hints.get("description"),
+                variant,
             )
+            if cached is not None:
+                logger.info("Resultado de visão obtido do cache (%s)", cache_key[:12])
+                return cached
 
-        # Prompt completo e estruturado
-        prompt = (
-            "Você é um assistente especializado em catalogação de inventário. "
-            "Sua tarefa é analisar a imagem do produto e retornar informações COMPLETAS e PRECISAS.\n"
-            f"{search_guidance}"
-            f"{product_info_str}\n"
-            "## FORMATO DE SAÍDA:\n"
-            "Retorne APENAS um objeto JSON com os campos:\n"
-            "- 'name': Nome COMPLETO e ESPECÍFICO do produto (inclua marca, modelo, versão se identificável)\n"
-            "- 'description': Descrição DETALHADA incluindo:\n"
-            "  * Características visuais da imagem\n"
-            "  * Especificações técnicas (se encontradas via busca)\n"
-            "  * Material, dimensões aproximadas, estado de conservação\n"
-            "  * Qualquer detalhe relevante para inventário\n"
-            "- 'brand': Marca/fabricante (se identificável), ou null\n"
-            "- 'color': Cor(es) predominante(s), ou null\n\n"
-            "IMPORTANTE:\n"
-            "- Texto SEMPRE em português do Brasil\n"
-            "- Seja ESPECÍFICO, não genérico (ex: 'Tênis Nike Air Max 90 Branco' e não apenas 'Tênis branco')\n"
-            "- Use busca web quando apropriado para enriquecer os dados\n"
-            "- Combine informações visuais + informações do usuário + dados da web\n"
-            "- Retorne APENAS o JSON, sem markdown, sem explicações adicionais\n\n"
-            "Exemplo de saída:\n"
-            '{"name": "Tênis Nike Air Max 90 Essential", '
-            '"description": "Tênis esportivo Nike Air Max 90 na cor branca com detalhes em cinza. '
-            "Tecnologia Air visível no calcanhar. Solado em borracha com tração multidirecional. "
-            'Cabedal em couro sintético e mesh para respirabilidade. Estado: usado, bom estado de conservação.", '
-            '"brand": "Nike", "color": "branco"}\n\n'
-            "Agora analise a imagem e retorne o JSON:"
+        image, mime = await asyncio.to_thread(
+            prepare_image, image, mime, self.image_options
         )
+        data_url = self._to_data_url(image, mime)
+        prompt = self._build_item_prompt(hints, previous)
 
         # Configurar tools para busca web se habilitado
-        tools = None
-        if self.enable_search:
-            tools = [{"type": "web_search"}]
-
+        tools = [{"type": "web_search"}] if search else None
         # Chamada na Responses API com conteúdo multimodal e busca web
-        response = self.client.responses.create(
-            model=self.model,
-            input=[
+        request = {
+            "model": self.model,
+            "instructions": SYSTEM_PROMPTS[search],
+            "prompt_cache_key": PROMPT_CACHE_KEY,
+            "input": [
                 {
                     "role": "user",
                     "content": [
                         {"type": "input_text", "text": prompt},
-                        {"type": "input_image", "image_url": data_url},
+                        {
+                            "type": "input_image",
+                            "image_url": data_url,
+                            "detail": self.detail,
+                        },
                     ],
                 }
             ],
-            tools=tools,
-            # max_output_tokens=500,  # Aumentado para acomodar descrições mais detalhadas
-        )
-
-        message_text: str = getattr(response, "output_text", "") or ""
-        ic(message_text)
+            "tools": tools,
+            # "max_output_tokens": 500,  # Aumentado para acomodar descrições mais detalhadas
+        }
+        with metrics.VISION_SECONDS.time(search=search):
+            if on_progress is None:
+                response = await self.resilience.call(
+                    lambda: self._create_response(request)
+                )
+                message_text: str = getattr(response, "output_text", "") or ""
+                self._record_usage(getattr(response, "usage", None))
+            else:
+                # Sem hedge: cada trecho do streaming já vai para a tela
+                message_text = await self.resilience.call(
+                    lambda: self._stream_response(request, on_progress),
+                    hedge=False,
+                )
+        logger.debug("Resposta de visão: %s", message_text)
 
         try:
-            data = self._extract_json(message_text)
-            return VisionResult.from_dict(data)
+            result = self._parse_result(message_text)
         except Exception as e:
             raise RuntimeError(
                 f"Falha ao interpretar JSON da resposta de visão: {e}"
             ) from e
+        result.searched = search
+
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.put, cache_key, result)
+
+        return result
+
+    def _cache_lookup(
+        self, image: bytes, *hints: str | None
+    ) -> tuple[str, VisionResult | None]:
+        # Hash da imagem e consulta ao SQLite, fora do event loop
+        key = self.cache.make_key(image, *hints)
+        return key, self.cache.get(key)
+
+    async def _stream_response(
+        self, request: dict[str, Any], on_progress: ProgressCallback
+    ) -> str:
+        started = time.perf_counter()
+        stream = await self._create_response({**request, "stream": True})
+
+        text = ""
+        final_text = None
+        reported: dict[str, str] = {}
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                text += event.delta
+                progress = stream_progress(text)
+                if progress and progress != reported:
+                    if not reported:
+                        logger.debug(
+                            "Visão: nome recebido em %.2fs",
+                            time.perf_counter() - started,
+                        )
+                    reported = progress
+                    try:
+                        await on_progress(progress)
+                    except Exception as e:
+                        logger.warning("Erro ao reportar progresso da visão: %s", e)
+            elif event.type == "response.completed":
+                final_text = event.response.output_text
+                self._record_usage(event.response.usage)
+            elif event.type in ("response.failed", "response.incomplete", "error"):
+                raise RuntimeError(f"Análise de visão interrompida: {event.type}")
+
+        return text if final_text is None else final_text
+
+    def _record_usage(self, usage) -> None:
+        if usage is None:
+            return
+
+        details = getattr(usage, "input_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        self.usage.update(
+            requests=1,
+            input_tokens=usage.input_tokens,
+            cached_input_tokens=cached,
+            output_tokens=usage.output_tokens,
+        )
+        logger.info(
+            "Visão: %d tokens de entrada (%d em cache), %d de saída",
+            usage.input_tokens,
+            cached,
+            usage.output_tokens,
+        )
+
+    def usage_stats(self) -> dict[str, float]:
+        """Totais de tokens, média por chamada e taxa de acerto do cache de prompt."""
+        stats: dict[str, float] = dict(self.usage)
+        requests = self.usage["requests"]
+        if requests:
+            for key in ("input_tokens", "cached_input_tokens", "output_tokens"):
+                stats[f"{key}_per_request"] = self.usage[key] / requests
+        if self.usage["input_tokens"]:
+            stats["prompt_cache_hit_rate"] = (
+                self.usage["cached_input_tokens"] / self.usage["input_tokens"]
+            )
+        return stats
+
+    async def _create_response(self, request: dict[str, Any]):
+        from openai import BadRequestError
+
+        if not self.structured_output:
+            return await self.client.responses.create(**request)
+
+        try:
+            return await self.client.responses.create(
+                **request, text={"format": VISION_RESULT_FORMAT}
+            )
+        except BadRequestError as e:
+            if "format" not in str(e) and "schema" not in str(e):
+                raise
+            # Modelo sem suporte a structured outputs: segue com as heurísticas
+            logger.warning(
+                "Modelo %s não aceitou o schema de resposta (%s); "
+                "usando extração heurística de JSON.",
+                self.model,
+                e,
+            )
+            self.structured_output = False
+            self.parse_stats["schema_unsupported"] += 1
+            return await self.client.responses.create(**request)
+
+    def _parse_result(self, text: str) -> VisionResult:
+        """
+        Converte a resposta em `VisionResult`: direto, se veio no schema; senão
+        (modelo sem structured outputs) pelas heurísticas de `_extract_json`.
+        """
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = None
+
+        if isinstance(data, dict) and "name" in data:
+            self.parse_stats["structured"] += 1
+            return VisionResult.from_dict(data)
+
+        self.parse_stats["fallback"] += 1
+        logger.info(
+            "Resposta de visão fora do schema; extração heurística (%d de %d)",
+            self.parse_stats["fallback"],
+            self.parse_stats["fallback"] + self.parse_stats["structured"],
+        )
+        return VisionResult.from_dict(self._extract_json(text))
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+
+from inventorybot.vision import VisionResult
+
+logger = logging.getLogger(__name__)
+
+
+class VisionCache:
+    """
+    Cache LRU de resultados de visão, endereçado pelo conteúdo da imagem e
+    pelas dicas do usuário (nome/descrição).
+
+    Os resultados ficam em memória e, se `path` for informado, também num
+    arquivo SQLite (write-through), de modo que sobrevivem a reinícios.
+    `get` e `put` podem ser chamados de qualquer thread (ex.: via
+    `asyncio.to_thread`, para não bloquear o event loop com o SQLite).
+    """
+
+    def __init__(self, path: str | None = None, max_entries: int = 256):
+        if max_entries < 1:
+            raise ValueError("max_entries deve ser >= 1")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[str, VisionResult] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+        if path:
+            self._open(path)
+
+    @staticmethod
+    def make_key(
+        image: bytes,
+        name: str | None = None,
+        description: str | None = None,
+        model: str | None = None,
+    ) -> str:
+        digest = hashlib.sha256(image)
+        for hint in (name, description, model):
+            digest.update(b"\x00")
+            digest.update((hint or "").encode("utf-8"))
+        return digest.hexdigest()
+
+    def _open(self, path: str) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vision_cache ("
+            " key TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+
+        rows = self._db.execute(
+            "SELECT key, result FROM vision_cache ORDER BY accessed DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, result in reversed(rows):
+            try:
+                self._entries[key] = VisionResult.from_dict(json.loads(result))
+            except (ValueError, TypeError) as e:
+                logger.warning("Entrada inválida no cache de visão (%s): %s", key, e)
+
+        # Descarta do disco o que não coube na memória
+        self._db.execute(
+            "DELETE FROM vision_cache WHERE key NOT IN "
+            "(SELECT key FROM vision_cache ORDER BY accessed DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> VisionResult | None:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            if self._db:
+                self._db.execute(
+                    "UPDATE vision_cache SET accessed = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._db.commit()
+
+            return result
+
+    def put(self, key: str, result: VisionResult) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                evicted.append((evicted_key,))
+
+            if self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO vision_cache (key, result, accessed) "
+                    "VALUES (?, ?, ?)",
+                    (key, json.dumps(asdict(result), ensure_ascii=False), time.time()),
+                )
+                if evicted:
+                    self._db.executemany(
+                        "DELETE FROM vision_cache WHERE key = ?", evicted
+                    )
+                self._db.commit()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from inventorybot.entities import Item
+from inventorybot.vision import VisionResult, VisionService
+
+logger = logging.getLogger(__name__)
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+
+class QueueFullError(Exception):
+    """A fila de análises atingiu o limite configurado."""
+
+
+@dataclass
+class _Job:
+    item: Item
+    future: asyncio.Future
+    on_position: PositionCallback | None = None
+    position: int = 0
+    # argumentos extras de `extract_item_details_from_image` (ex.: search)
+    options: dict[str, Any] = field(default_factory=dict)
+
+
+class VisionQueue:
+    """
+    Fila limitada de análises de imagem, executadas por um número fixo de
+    workers. As análises rodam no event loop (cliente assíncrono), então o bot
+    continua atendendo outros updates enquanto elas estão em andamento.
+
+    `on_position` recebe a posição do job na fila sempre que ela muda
+    (0 significa que a análise começou).
+    """
+
+    def __init__(
+        self,
+        service: VisionService,
+        max_concurrency: int = 2,
+        max_pending: int = 20,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency deve ser >= 1")
+
+        self.service = service
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+
+        self._queue: asyncio.Queue[_Job] | None = None
+        self._pending: list[_Job] = []
+        self._active = 0
+        self._workers: list[asyncio.Task] = []
+        self._notifications: set[asyncio.Task] = set()
+        self._warm_up: asyncio.Future | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _ensure_started(self) -> None:
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"vision-worker-{i}")
+            for i in range(self.max_concurrency)
+        ]
+
+    def warm_up(self) -> None:
+        """
+        Prepara o cliente do serviço numa thread (ver `VisionService.warm_up`),
+        uma única vez; os workers esperam o preparo terminar antes da primeira
+        análise, em vez de disputar com ele os imports e travar o event loop.
+        """
+        if self._warm_up is None:
+            self._warm_up = asyncio.ensure_future(
+                asyncio.to_thread(self.service.warm_up)
+            )
+            self._warm_up.add_done_callback(self._log_warm_up_error)
+
+    @staticmethod
+    def _log_warm_up_error(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception():
+            logger.warning("Erro ao preparar o cliente de visão: %s", future.exception())
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        for job in self._pending:
+            if not job.future.done():
+                job.future.cancel()
+        self._pending = []
+        self._queue = None
+
+    async def submit(
+        self, item: Item, on_position: PositionCallback | None = None, **options
+    ) -> VisionResult:
+        self._ensure_started()
+
+        job = _Job(
+            item=item,
+            future=asyncio.get_running_loop().create_future(),
+            on_position=on_position,
+            options=options,
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Fila de análise cheia.") from None
+
+        self._pending.append(job)
+        if self._active >= self.max_concurrency:
+            self._notify(job, len(self._pending))
+
+        return await job.future
+
+    def _notify(self, job: _Job, position: int) -> None:
+        if not job.on_position or job.position == position:
+            return
+
+        job.position = position
+        task = asyncio.create_task(self._safe_notify(job.on_position, position))
+        self._notifications.add(task)
+        task.add_done_callback(self._notifications.discard)
+
+    @staticmethod
+    async def _safe_notify(callback: PositionCallback, position: int) -> None:
+        try:
+            await callback(position)
+        except Exception as e:
+            logger.warning("Erro ao notificar posição na fila: %s", e)
+
+    async def _worker(self) -> None:
+        if self._warm_up is not None:
+            # Só espera: um erro no preparo reaparece na própria análise
+            await asyncio.wait([self._warm_up])
+        while True:
+            job = await self._queue.get()
+            self._active += 1
+            try:
+                self._pending.remove(job)
+                if self._active >= self.max_concurrency:
+                    for position, waiting in enumerate(self._pending, start=1):
+                        self._notify(waiting, position)
+
+                if job.future.cancelled():
+                    continue
+
+                if job.position:
+                    self._notify(job, 0)
+
+                try:
+                    result = await self.service.extract_item_details_from_image(
+                        job.item, **job.options
+                    )
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+            finally:
+                self._active -= 1
+                self._queue.task_done()
@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 load_dotenv()  # take environment variables
 
 from os import path
+import asyncio
+import io
 import tempfile
 import re
 import os
@@ -12,15 +14,19 @@ from dataclasses import dataclass
 from typing import Optional
 from enum import Enum
 
-from icecream import ic
-
 from slugify import slugify
 from telegram import (
+    CallbackQuery,
     Update,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
+    InputMediaPhoto,
 )
+from telegram.error import BadRequest
+from telegram.helpers import escape_markdown
+from telegram.request import BaseRequest
 from telegram.ext import (
+    Application,
     ApplicationBuilder,
     CommandHandler,
     MessageHandler,
@@ -32,7 +38,31 @@ from telegram.ext import (
 from inventorybot.settings import settings
 from inventorybot.entities import Item, Status, Location
 from inventorybot.infra.markdown_output import MarkdownOutput
-from inventorybot.vision import VisionService
+from inventorybot.infra.vault_index import VaultIndex
+from inventorybot.infra.write_behind import WriteBehindOutput
+from inventorybot.search import SearchIndex
+from inventorybot.vision import (
+    HINT_FIELDS,
+    VisionResult,
+    VisionService,
+    apply_result,
+)
+from inventorybot.vision_cache import VisionCache
+from inventorybot.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientCaller,
+    RetryPolicy,
+)
+from inventorybot import imaging
+from inventorybot.imaging import ImageOptions
+from inventorybot.vision_queue import VisionQueue, QueueFullError
+from inventorybot.media_group import MediaGroupCollector
+from inventorybot.debounce import Debouncer
+from inventorybot.concurrency import ChatSerializingUpdateProcessor
+from inventorybot.access import access_gate, is_admin
+from inventorybot import metrics
+from inventorybot.profiling import UpdateProfiler
 from inventorybot.parser import parser
 
 
@@ -48,42 +78,163 @@ TOKEN = settings.telegram_token
 OUTPUT_DIR = settings.output_dir
 ALLOWED_USER_IDS = settings.allowed_user_ids
 
+SEARCH_PAGE_SIZE = 5
+# Tamanho máximo da legenda de uma foto no Telegram
+CAPTION_LIMIT = 1024
+PHOTO_MEMORY_LIMIT = settings.photo_memory_limit
+
 re_multiple_spaces = re.compile(r"\s+")
+# Itens listados na prévia de um lote (a mensagem tem limite de tamanho)
+BATCH_PREVIEW_LIMIT = 20
+# "2 Martelo; q 3": número do item do lote e seus novos dados
+re_batch_item = re.compile(r"(\d+)[.)]?\s+(\S.*)", re.DOTALL)
+# "3 x Parafuso": quantidade antes do nome, numa linha do cadastro rápido
+re_quantity_prefix = re.compile(r"(\d+)\s*[xX]\s+(\S.*)")
+
+summary_debouncer = Debouncer(settings.summary_debounce)
+# Legendas parciais durante o streaming da análise (limite de edições do Telegram)
+vision_progress_throttle = Debouncer(settings.vision_stream_interval, leading=True)
+
+# Serviços, montados por `build_services` (chamado em `build_application`):
+# importar este módulo não toca no vault nem no cache
+vault_index: VaultIndex | None = None
+search_index: SearchIndex | None = None
+markdown_output: MarkdownOutput | None = None
+output: MarkdownOutput | WriteBehindOutput | None = None
+vision_cache: VisionCache | None = None
+# None sem OPENAI_API_KEY: as funções de visão ficam desativadas
+vision_service: VisionService | None = None
+vision_queue: VisionQueue | None = None
+profiler: UpdateProfiler | None = None
+
+
+def build_services() -> None:
+    global vault_index, search_index, markdown_output, output
+    global vision_cache, vision_service, vision_queue, profiler
+
+    if vault_index is not None:
+        return
 
-output = MarkdownOutput(OUTPUT_DIR)
-vision_service = VisionService()
+    vault_index = VaultIndex(OUTPUT_DIR)
+    search_index = SearchIndex()
+    vault_index.add_listener(search_index.update)
+    markdown_output = MarkdownOutput(
+        OUTPUT_DIR, index=vault_index, fsync=settings.output_fsync
+    )
+    output = markdown_output
+    if settings.write_behind:
+        output = WriteBehindOutput(
+            markdown_output,
+            settings.write_behind_dir,
+            max_latency=settings.write_behind_max_latency,
+        )
 
-# ========================
-# Decorators
-# ========================
+    profiler = (
+        UpdateProfiler(
+            settings.profile_dir,
+            threshold=settings.profile_threshold,
+            max_reports=settings.profile_max_reports,
+            trace_memory=settings.profile_tracemalloc,
+        )
+        if settings.profile_dir
+        else None
+    )
 
+    # Estatísticas dos componentes, lidas só quando as métricas são exportadas
+    metrics.registry.add_stats(
+        "inventorybot_pending",
+        "Análises na fila e itens aguardando gravação",
+        lambda: {
+            "vision_queue": vision_queue.pending if vision_queue else 0,
+            "write_behind": getattr(output, "pending", 0),
+        },
+    )
 
-# decorator @filter_users
-def filter_users(func):
-    async def wrapper(update: Update, *args, **kwargs):
-        if ALLOWED_USER_IDS and update.effective_user.id not in ALLOWED_USER_IDS:
-            await update.message.reply_text(
-                "Você não tem permissão para usar este bot."
-            )
-            return
+    if not os.getenv("OPENAI_API_KEY"):
+        return
 
-        return await func(update, *args, **kwargs)
+    vision_cache = VisionCache(
+        settings.vision_cache_path or None, max_entries=settings.vision_cache_size
+    )
+    image_options = (
+        ImageOptions(
+            max_edge=settings.vision_image_max_edge,
+            format=settings.vision_image_format,
+            quality=settings.vision_image_quality,
+        )
+        if settings.vision_image_max_edge
+        else None
+    )
+    if image_options and not imaging.is_available():
+        logger.warning(
+            "Pillow não está instalado: as fotos serão enviadas à análise sem "
+            "redução (VISION_IMAGE_MAX_EDGE=%s ignorado).",
+            settings.vision_image_max_edge,
+        )
+    vision_service = VisionService(
+        cache=vision_cache,
+        image_options=image_options,
+        detail=settings.vision_image_detail,
+        structured_output=settings.vision_structured_output,
+        tiered=settings.vision_tiered,
+        search_confidence=settings.vision_search_confidence,
+        base_url=settings.openai_base_url or None,
+        resilience=ResilientCaller(
+            deadline=settings.vision_timeout,
+            retry=RetryPolicy(attempts=settings.vision_retries + 1),
+            hedge=settings.vision_hedge,
+            hedge_quantile=settings.vision_hedge_quantile,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.vision_breaker_threshold,
+                reset_timeout=settings.vision_breaker_reset,
+            ),
+        ),
+    )
+    vision_queue = VisionQueue(
+        vision_service,
+        max_concurrency=settings.vision_max_concurrency,
+        max_pending=settings.vision_max_pending,
+    )
 
-    return wrapper
+    metrics.registry.add_stats(
+        "inventorybot_vision_calls",
+        "Tentativas, novas tentativas, hedges e recusas nas chamadas de visão",
+        lambda: vision_service.resilience.stats,
+    )
+    metrics.registry.add_stats(
+        "inventorybot_vision_parse",
+        "Respostas de visão por forma de interpretação do JSON",
+        lambda: vision_service.parse_stats,
+    )
+    metrics.registry.add_stats(
+        "inventorybot_vision_tokens",
+        "Tokens das respostas de visão e taxa de acerto do cache de prompt",
+        lambda: vision_service.usage_stats(),
+    )
+    metrics.registry.add_stats(
+        "inventorybot_vision_cache", "Cache de resultados de visão", vision_cache.stats
+    )
 
 
 # =========================
 # Helpers
 # =========================
-def reset_context(context: ContextTypes.DEFAULT_TYPE) -> None:
-    context.user_data["item"] = Item(
+def new_item(context: ContextTypes.DEFAULT_TYPE) -> Item:
+    return Item(
         quantity=1,
         location=context.user_data.get("last_location"),
         tags=context.user_data.get("last_tags", []),
     )
+
+
+def reset_context(context: ContextTypes.DEFAULT_TYPE) -> None:
+    context.user_data["item"] = new_item(context)
     if "action" in context.user_data:
         del context.user_data["action"]
 
+    # O próximo item ganha uma nova mensagem de resumo
+    context.user_data.pop("summary", None)
+
 
 def ensure_item(context: ContextTypes.DEFAULT_TYPE) -> Item:
     item = context.user_data.get("item")
@@ -101,7 +252,9 @@ def handle_tags(text: str) -> list[str]:
     return tags_with_no_space
 
 
-def build_keyboard(item: Item) -> InlineKeyboardMarkup:
+def build_keyboard(
+    item: Item, search_button: bool = False
+) -> InlineKeyboardMarkup:
     keyboard = [
         [
             InlineKeyboardButton("🖊 Editar nome", callback_data="edit_nome"),
@@ -137,15 +290,17 @@ def build_keyboard(item: Item) -> InlineKeyboardMarkup:
         [InlineKeyboardButton("❌ Descartar", callback_data="discard_item")],
     ]
 
-    if item.photo:
-        keyboard.insert(
-            0,
-            [
-                InlineKeyboardButton(
-                    "🤖 Extrair dados da imagem", callback_data="extract_vision_data"
-                )
-            ],
-        )
+    if item.has_photo():
+        vision_buttons = [
+            InlineKeyboardButton(
+                "🤖 Extrair dados da imagem", callback_data="extract_vision_data"
+            )
+        ]
+        if search_button:
+            vision_buttons.append(
+                InlineKeyboardButton("🔎 Buscar na web", callback_data="vision_search")
+            )
+        keyboard.insert(0, vision_buttons)
     return InlineKeyboardMarkup(keyboard)
 
 
@@ -164,6 +319,85 @@ def render_summary(item: Item) -> str:
     )
 
 
+def build_batch_keyboard() -> InlineKeyboardMarkup:
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                "📦 Localização do lote", callback_data="edit_batch_location"
+            ),
+            InlineKeyboardButton("✏️ Editar item", callback_data="edit_batch_item"),
+        ],
+        [InlineKeyboardButton("💾 Gravar todos", callback_data="save_batch")],
+        [InlineKeyboardButton("❌ Descartar todos", callback_data="discard_batch")],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+def render_batch_summary(items: list[Item], limit: int = BATCH_PREVIEW_LIMIT) -> str:
+    lines = [f"📚 **Lote com {len(items)} itens:**", ""]
+    for i, item in enumerate(items[:limit], start=1):
+        # Enviado com Markdown: "_", "*" e "`" nos nomes quebrariam a mensagem
+        name = escape_markdown(item.name or "(sem nome)")
+        location = escape_markdown(str(item.location))
+        lines.append(f"{i}. {name} ({item.quantity}) — 📦 {location}")
+    if len(items) > limit:
+        lines.append(f"… e mais {len(items) - limit} itens")
+
+    untitled = sum(1 for item in items if not item.name)
+    if untitled:
+        lines.append("")
+        lines.append(
+            f"⚠️ {untitled} itens sem nome: use ✏️ Editar item para nomeá-los."
+        )
+    return "\n".join(lines)
+
+
+def render_errors(errors: list[str], limit: int = BATCH_PREVIEW_LIMIT) -> str:
+    lines = [escape_markdown(error) for error in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f"… e mais {len(errors) - limit}")
+    return "\n".join(lines)
+
+
+def build_search_keyboard(page: int, total_pages: int) -> InlineKeyboardMarkup | None:
+    buttons = []
+    if page > 0:
+        buttons.append(
+            InlineKeyboardButton("◀️ Anterior", callback_data=f"search:{page - 1}")
+        )
+    if page < total_pages - 1:
+        buttons.append(
+            InlineKeyboardButton("Próxima ▶️", callback_data=f"search:{page + 1}")
+        )
+
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup([buttons])
+
+
+def render_search_page(search_query: str, page: int):
+    results = search_index.search(
+        search_query, offset=page * SEARCH_PAGE_SIZE, limit=SEARCH_PAGE_SIZE
+    )
+    if not results.total:
+        return f"🔎 Nenhum item encontrado para \"{search_query}\".", None
+
+    total_pages = (results.total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    lines = [
+        f"🔎 {results.total} itens para \"{search_query}\" "
+        f"(página {page + 1}/{total_pages}):",
+        "",
+    ]
+    for i, hit in enumerate(results.hits, start=page * SEARCH_PAGE_SIZE + 1):
+        record = hit.record
+        location = vault_index.location_name(record.location) or "-"
+        lines.append(f"{i}. {record.name} ({record.quantity}) — 📦 {location}")
+        if record.tags:
+            lines.append(f"   🏷️ {', '.join(record.tags)}")
+
+    return "\n".join(lines), build_search_keyboard(page, total_pages)
+
+
 async def safe_edit_message(query, text: str):
     """Edita texto ou legenda conforme o tipo da mensagem que originou o callback."""
     try:
@@ -180,19 +414,65 @@ async def safe_edit_message(query, text: str):
 # =========================
 
 
-@filter_users
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reset_context(context)
     await update.message.reply_text("Envie o nome ou a foto do item para começar.")
 
 
-@filter_users
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     item = ensure_item(context)
     text = (update.message.text or "").strip()
 
     action = context.user_data.get("action", "edit_nome")
 
+    if action == "edit_batch_location":
+        batch = context.user_data.get("batch") or []
+        location = Location.intern(text)
+        for batch_item in batch:
+            batch_item.location = location
+        context.user_data.pop("action", None)
+        await update.message.reply_text(
+            render_batch_summary(batch),
+            parse_mode="Markdown",
+            reply_markup=build_batch_keyboard(),
+        )
+        return
+
+    if action == "edit_batch_item":
+        batch = context.user_data.get("batch") or []
+        match = re_batch_item.fullmatch(text)
+        number = int(match.group(1)) if match else 0
+        if not 1 <= number <= len(batch):
+            await update.message.reply_text(
+                f"Envie o número do item (1 a {len(batch)}) seguido do nome."
+            )
+            return
+        try:
+            handle_name(match.group(2), batch[number - 1])
+        except ValueError:
+            await update.message.reply_text("Nome inválido. Envie um nome válido.")
+            return
+
+        context.user_data.pop("action", None)
+        await update.message.reply_text(
+            render_batch_summary(batch),
+            parse_mode="Markdown",
+            reply_markup=build_batch_keyboard(),
+        )
+        return
+
+    # Várias linhas sem rascunho nem edição pedida: um item por linha,
+    # revisados juntos como um lote. Com um rascunho em andamento (ou depois de
+    # "Editar nome"), o texto continua valendo só para o campo em edição
+    if (
+        "\n" in text
+        and "action" not in context.user_data
+        and item.name is None
+        and not item.has_photo()
+    ):
+        await quick_add_batch(update, context, text)
+        return
+
     # Se ainda não tem nome, define e pede quantidade
     if action == "edit_nome":
         try:
@@ -228,7 +508,7 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if action == "edit_location":
-        item.location = Location(name=text)
+        item.location = Location.intern(text)
         await show_summary(update, context)
         return
 
@@ -259,8 +539,17 @@ def convert_list_to_pairs(command_string):
     return pairs
 
 
-@filter_users
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if vision_queue:
+        # Uma análise deve vir em seguida: o pacote da OpenAI começa a ser
+        # importado em segundo plano (só na primeira foto), sem atrasar a
+        # partida do bot nem travar o event loop na primeira análise
+        vision_queue.warm_up()
+
+    if update.message.media_group_id:
+        album_collector.add(update.message.media_group_id, (update, context))
+        return
+
     item = ensure_item(context)
     photo_caption = update.message.caption
     if photo_caption:
@@ -270,18 +559,130 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(f"Erro ao processar legenda: {e}")
             return
 
-    photo = update.message.photo[-1]
-    filename = None
+    await download_photo(update.message.photo[-1], item)
 
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        filename = tmp.name
+    await show_summary(update, context)
 
-    file = await photo.get_file()
-    print("saving at", filename)
-    await file.download_to_drive(filename)
-    item.photo = filename
 
-    await show_summary(update, context)
+async def download_photo(photo, item: Item) -> None:
+    """
+    Baixa a foto para a memória do item; acima de `photo_memory_limit` bytes
+    (ou com o limite em 0), usa um arquivo temporário.
+    """
+    # A foto nova substitui a anterior
+    item.photo = None
+    item.photo_data = None
+    # Os resumos reenviam a foto pelo file_id, sem novo upload
+    item.photo_file_id = photo.file_id
+
+    with metrics.PHOTO_DOWNLOAD_SECONDS.time():
+        file = await photo.get_file()
+        size = photo.file_size or file.file_size or 0
+        if 0 < size <= PHOTO_MEMORY_LIMIT:
+            buffer = io.BytesIO()
+            await file.download_to_memory(buffer)
+            item.photo_data = buffer.getvalue()
+            metrics.PHOTO_DOWNLOAD_BYTES.inc(len(item.photo_data))
+            return
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            filename = tmp.name
+
+        print("saving at", filename)
+        await file.download_to_drive(filename)
+        item.photo = filename
+        metrics.PHOTO_DOWNLOAD_BYTES.inc(os.path.getsize(filename))
+
+
+async def handle_album(media_group_id: str, entries: list):
+    """Cria um item rascunho por foto do álbum e analisa todos em paralelo."""
+    first_update, context = entries[0]
+
+    items = []
+    for update, _ in entries:
+        item = new_item(context)
+        if update.message.caption:
+            try:
+                item = handle_name(update.message.caption, item)
+            except ValueError as e:
+                logger.warning("Legenda inválida no álbum %s: %s", media_group_id, e)
+        items.append(item)
+
+    status_message = await first_update.message.reply_text(
+        f"📚 Álbum com {len(items)} fotos recebido. Processando..."
+    )
+
+    await asyncio.gather(
+        *(
+            download_photo(update.message.photo[-1], item)
+            for item, (update, _) in zip(items, entries)
+        )
+    )
+
+    if vision_service:
+        await status_message.edit_text(
+            f"🤖 Analisando {len(items)} imagens do álbum..."
+        )
+        results = await asyncio.gather(
+            *(vision_queue.submit(item) for item in items), return_exceptions=True
+        )
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                logger.warning("Erro ao analisar foto do álbum: %s", result)
+                continue
+            apply_vision_result(item, result)
+
+        to_search = [
+            (item, result)
+            for item, result in zip(items, results)
+            if not isinstance(result, Exception)
+            and vision_service.needs_search(result)
+        ]
+    else:
+        to_search = []
+
+    context.user_data["batch"] = items
+    summary = render_batch_summary(items)
+    if to_search:
+        summary += f"\n\n🔎 Buscando detalhes de {len(to_search)} itens na web..."
+    await status_message.edit_text(
+        summary,
+        parse_mode="Markdown",
+        reply_markup=build_batch_keyboard(),
+    )
+
+    if not to_search:
+        return
+
+    # Modo em camadas: a revisão já está na tela; os itens com marca/modelo
+    # identificados são enriquecidos pela busca web e o resumo é atualizado;
+    # o que o usuário editar enquanto isso é mantido
+    expected = [vision_snapshot(item) for item, _ in to_search]
+    results = await asyncio.gather(
+        *(
+            vision_queue.submit(item, search=True, previous=result)
+            for item, result in to_search
+        ),
+        return_exceptions=True,
+    )
+    for (item, _), snapshot, result in zip(to_search, expected, results):
+        if isinstance(result, Exception):
+            logger.warning("Busca web da foto do álbum falhou: %s", result)
+            continue
+        apply_vision_result(item, result, snapshot)
+
+    # O lote pode ter sido gravado, descartado ou estar em edição enquanto isso
+    if context.user_data.get("batch") is items and context.user_data.get(
+        "action"
+    ) not in ("edit_batch_location", "edit_batch_item"):
+        await status_message.edit_text(
+            render_batch_summary(items),
+            parse_mode="Markdown",
+            reply_markup=build_batch_keyboard(),
+        )
+
+
+album_collector = MediaGroupCollector(handle_album)
 
 
 def handle_name(name: str, item: Item) -> Item:
@@ -297,7 +698,7 @@ def handle_name(name: str, item: Item) -> Item:
     for command, *value in commands:
         value_str = " ".join(value)
         if command == "l":
-            item.location = Location(name=value_str)
+            item.location = Location.intern(value_str)
         elif command == "q":
             qtd = value_str
             if qtd.isdigit():
@@ -307,29 +708,183 @@ def handle_name(name: str, item: Item) -> Item:
         elif command == "t":
             item.tags = handle_tags(value_str)
 
-    item.name = name
+    item.name = name.strip()
     return item
 
 
-async def show_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def parse_quick_add(
+    text: str, context: ContextTypes.DEFAULT_TYPE
+) -> tuple[list[Item], list[str]]:
+    """
+    Um item por linha, na sintaxe de `handle_name` ("Nome; q 2 l caixa"), com
+    a quantidade também aceita antes do nome ("2 x Nome"). Devolve os itens e
+    os problemas encontrados; linhas em branco são ignoradas e itens que não
+    passam na validação seguem no lote, para serem corrigidos (ex.:
+    localização do lote) antes de gravar.
+    """
+    items, errors = [], []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        item = new_item(context)
+        quantity = re_quantity_prefix.fullmatch(line)
+        if quantity:
+            item.quantity = int(quantity.group(1))
+            line = quantity.group(2)
+        item = handle_name(line, item)
+        if not item.name.strip():
+            errors.append(f"Linha {number}: nome é obrigatório")
+            continue
+
+        try:
+            item.validate()
+        except ValueError as e:
+            errors.append(f"Linha {number} ({item.name}): {e}")
+        items.append(item)
+
+    return items, errors
+
+
+async def quick_add_batch(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, text: str
+):
+    items, errors = parse_quick_add(text, context)
+    if not items:
+        await update.message.reply_text(
+            "Nenhum item encontrado. Envie um item por linha, ex.:\n"
+            "Martelo; q 2 l Caixa"
+        )
+        return
+
+    context.user_data["batch"] = items
+    summary = render_batch_summary(items)
+    if errors:
+        summary += "\n\n⚠️ Verifique antes de gravar:\n" + render_errors(errors)
+    await update.message.reply_text(
+        summary,
+        parse_mode="Markdown",
+        reply_markup=build_batch_keyboard(),
+    )
+
+
+async def show_summary(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, notice: str | None = None
+):
+    """
+    Atualiza a mensagem de resumo do usuário (ou envia uma, se ainda não houver).
+
+    A atualização é adiada por alguns instantes para agrupar edições em
+    sequência numa única chamada à API. `notice` é exibido acima do resumo.
+    Num grupo, cada usuário tem o seu rascunho e, portanto, o seu resumo.
+    """
+    ensure_item(context)
+    if notice:
+        context.user_data["summary_notice"] = notice
+
+    chat_id = update.message.chat_id
+    summary_debouncer.call(
+        summary_key(update), lambda: push_summary(context.bot, chat_id, context)
+    )
+
+
+def summary_key(update: Update | CallbackQuery) -> tuple[int, int]:
+    """Chave do resumo de um usuário num chat."""
+    if isinstance(update, CallbackQuery):
+        return update.message.chat_id, update.from_user.id
+    return update.message.chat_id, update.effective_user.id
+
+
+@metrics.timed(metrics.SUMMARY_SECONDS)
+async def push_summary(bot, chat_id: int, context: ContextTypes.DEFAULT_TYPE):
     item = ensure_item(context)
     caption = render_summary(item)
+    notice = context.user_data.pop("summary_notice", None)
+    if notice:
+        caption = f"{notice}\n\n{caption}"
     reply_markup = build_keyboard(item)
+    photo = summary_photo(item)
+    # Sem file_id ainda: a foto (em memória ou no arquivo temporário) é
+    # enviada de novo ao Telegram
+    if isinstance(photo, bytes):
+        metrics.TELEGRAM_UPLOAD_BYTES.inc(len(photo))
+    elif photo is not None and photo == item.photo:
+        metrics.TELEGRAM_UPLOAD_BYTES.inc(os.path.getsize(photo))
+
+    summary = context.user_data.get("summary")
+    if summary and summary["chat_id"] != chat_id:
+        summary = None
+    if summary and bool(summary["photo"]) == bool(photo):
+        try:
+            if not photo:
+                await bot.edit_message_text(
+                    caption,
+                    chat_id=chat_id,
+                    message_id=summary["message_id"],
+                    parse_mode="Markdown",
+                    reply_markup=reply_markup,
+                )
+            elif summary["photo"] == photo:
+                await bot.edit_message_caption(
+                    chat_id=chat_id,
+                    message_id=summary["message_id"],
+                    caption=caption,
+                    parse_mode="Markdown",
+                    reply_markup=reply_markup,
+                )
+            else:
+                message = await bot.edit_message_media(
+                    InputMediaPhoto(photo, caption=caption, parse_mode="Markdown"),
+                    chat_id=chat_id,
+                    message_id=summary["message_id"],
+                    reply_markup=reply_markup,
+                )
+                remember_summary(context, chat_id, item, message)
+            return
+        except BadRequest as e:
+            if "message is not modified" in str(e).lower():
+                return
+            # Mensagem apagada/antiga demais: envia uma nova
+            logger.info("Resumo não pôde ser editado (%s); enviando novo.", e)
 
     # Se tem foto, envia como foto com legenda; senão, como texto
-    if item.photo:
-        await update.message.reply_photo(
-            item.photo,
+    if photo:
+        message = await bot.send_photo(
+            chat_id,
+            photo,
             caption=caption,
             parse_mode="Markdown",
             reply_markup=reply_markup,
         )
     else:
-        await update.message.reply_text(
+        message = await bot.send_message(
+            chat_id,
             caption,
             parse_mode="Markdown",
             reply_markup=reply_markup,
         )
+    remember_summary(context, chat_id, item, message)
+
+
+def summary_photo(item: Item):
+    """file_id (sem upload) ou, na falta dele, os bytes/caminho da foto."""
+    if not item.has_photo():
+        return None
+    return item.photo_file_id or item.photo_data or item.photo
+
+
+def remember_summary(
+    context: ContextTypes.DEFAULT_TYPE, chat_id: int, item: Item, message
+):
+    if item.has_photo() and not item.photo_file_id and message.photo:
+        item.photo_file_id = message.photo[-1].file_id
+
+    context.user_data["summary"] = {
+        "chat_id": chat_id,
+        "message_id": message.message_id,
+        "photo": summary_photo(item),
+    }
 
 
 # =========================
@@ -337,7 +892,6 @@ async def show_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # =========================
 
 
-@filter_users
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -362,40 +916,55 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await safe_edit_message(query, "Envie as tags (separadas por ','):")
     elif data == "extract_vision_data":
         await extract_vision_data(query, context)
+    elif data == "vision_search":
+        await extract_vision_data(query, context, search=True)
     elif data == "remove_size":
         item.size = None
-        await safe_edit_message(query, "Tamanho removido.")
-        await show_summary(query, context)
+        await show_summary(query, context, notice="Tamanho removido.")
     elif data == "remove_tags":
         item.tags = []
-        await safe_edit_message(query, "Tags removidas.")
-        await show_summary(query, context)
+        await show_summary(query, context, notice="Tags removidas.")
     elif data == "save_item":
-        _, success = await save(item, query)
-        if success:
+        error = await save(item, query)
+        if not error:
             context.user_data["last_location"] = item.location
             context.user_data["last_tags"] = item.tags
             reset_context(context)
         else:
-            await show_summary(query, context)
+            await show_summary(query, context, notice=error)
     elif data == "save_item_new_context":
-        _, success = await save(item, query)
-        if success:
+        error = await save(item, query)
+        if not error:
             context.user_data["last_location"] = None
             context.user_data["last_tags"] = None
             reset_context(context)
         else:
-            await show_summary(query, context)
+            await show_summary(query, context, notice=error)
     elif data == "discard_item":
+        await summary_debouncer.cancel_and_wait(summary_key(query))
         reset_context(context)
         await safe_edit_message(query, "❌ Item descartado.")
+    elif data == "edit_batch_location":
+        await safe_edit_message(query, "Informe o local para todos os itens do lote:")
+    elif data == "edit_batch_item":
+        await safe_edit_message(
+            query, "Envie o número do item e o novo nome (ex.: 2 Martelo; q 3):"
+        )
+    elif data == "save_batch":
+        await save_batch(query, context)
+    elif data == "discard_batch":
+        context.user_data.pop("batch", None)
+        context.user_data.pop("action", None)
+        await safe_edit_message(query, "❌ Lote descartado.")
     else:
         await safe_edit_message(query, "Ação não reconhecida.")
 
 
-async def extract_vision_data(query, context: ContextTypes.DEFAULT_TYPE):
+async def extract_vision_data(
+    query, context: ContextTypes.DEFAULT_TYPE, search: bool | None = None
+):
     item = ensure_item(context)
-    if not item.photo:
+    if not item.has_photo():
         await safe_edit_message(query, "Nenhuma foto para analisar.")
         return
 
@@ -405,37 +974,299 @@ async def extract_vision_data(query, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    try:
-        await safe_edit_message(query, "🤖 Analisando imagem...")
-        vision_result = vision_service.extract_item_details_from_image(item)
-        item.name = vision_result.name
-        item.description = vision_result.description
+    await safe_edit_message(
+        query, "🔎 Buscando detalhes na web..." if search else "🤖 Analisando imagem..."
+    )
+
+    # A análise roda em segundo plano para não segurar o processamento
+    # de outros updates enquanto o modelo responde.
+    extraction = run_vision_extraction
+    if profiler is not None:
+        # É a parte lenta do botão: perfilada como um update à parte
+        extraction = profiler.wrap(extraction)
+    context.application.create_task(
+        extraction(query, context, item, vision_snapshot(item), search)
+    )
+
+
+def render_vision_progress(header: str, fields: dict[str, str]) -> str:
+    # Texto puro: um trecho parcial pode ter Markdown desbalanceado
+    text = f"{header}\n\n🧾 Nome: {fields.get('name', '')}"
+    if fields.get("description"):
+        text += f"\n📝 Descrição: {fields['description']}…"
+    return text[:CAPTION_LIMIT]
+
 
+def vision_snapshot(item: Item) -> dict:
+    """Campos que a análise preenche, como estavam quando ela foi pedida."""
+    return {field: getattr(item, field) for field in HINT_FIELDS}
+
+
+def apply_vision_result(
+    item: Item, result: VisionResult, expected: dict | None = None
+) -> None:
+    """
+    Aplica o resultado ao item. Com `expected` (o `vision_snapshot` de quando
+    a análise foi pedida), os campos que o usuário editou enquanto ela rodava
+    são mantidos.
+    """
+    fields = [
+        field
+        for field in HINT_FIELDS
+        if expected is None or getattr(item, field) == expected[field]
+    ]
+    apply_result(item, result, fields)
+
+
+async def run_vision_extraction(
+    query,
+    context: ContextTypes.DEFAULT_TYPE,
+    item: Item,
+    expected: dict,
+    search: bool | None = None,
+):
+    """
+    Analisa a foto do item e mostra o resultado na mensagem de `query`.
+    `expected` é o `vision_snapshot` do item quando a análise foi pedida: ela
+    roda fora da fila do chat, e o que o usuário editar enquanto isso prevalece.
+    """
+    async def report_position(position: int):
+        if position:
+            await safe_edit_message(
+                query, f"⏳ Aguardando análise (posição {position} na fila)..."
+            )
+        else:
+            await safe_edit_message(query, "🤖 Analisando imagem...")
+
+    async def show(result: VisionResult, notice: str | None = None):
+        # Uma edição de progresso ainda em curso chegaria depois desta e
+        # apagaria os botões
+        await vision_progress_throttle.cancel_and_wait(progress_key)
         caption = render_summary(item)
-        reply_markup = build_keyboard(item)
+        if notice:
+            caption = f"{notice}\n\n{caption}"
         await query.edit_message_caption(
-            caption=caption, reply_markup=reply_markup, parse_mode="Markdown"
+            caption=caption,
+            reply_markup=build_keyboard(
+                item, search_button=vision_service.can_search(result)
+            ),
+            parse_mode="Markdown",
+        )
+
+    # Streaming: nome e descrição aparecem enquanto o modelo ainda gera
+    progress_key = (query.message.chat_id, query.message.message_id)
+    progress: dict[str, str] = {}
+
+    def streaming(header: str) -> dict:
+        if not settings.vision_stream:
+            return {}
+
+        async def push_progress():
+            await safe_edit_message(query, render_vision_progress(header, progress))
+
+        async def on_progress(fields: dict[str, str]):
+            progress.clear()
+            progress.update(fields)
+            vision_progress_throttle.call(progress_key, push_progress)
+
+        return {"on_progress": on_progress}
+
+    async def still_drafting() -> bool:
+        # O item pode ter sido gravado, descartado ou trocado enquanto a
+        # análise rodava: aí o resultado já não tem onde aparecer
+        if context.user_data.get("item") is item:
+            return True
+        await vision_progress_throttle.cancel_and_wait(progress_key)
+        logger.info("Rascunho mudou durante a análise; resultado descartado.")
+        return False
+
+    try:
+        vision_result = await vision_queue.submit(
+            item,
+            on_position=report_position,
+            search=search,
+            **streaming("🔎 Buscando na web..." if search else "🤖 Analisando..."),
         )
+        if not await still_drafting():
+            return
+        apply_vision_result(item, vision_result, expected)
+
+        # Modo em camadas: o resultado rápido aparece já e é substituído
+        # quando a busca web terminar
+        if search is None and vision_service.needs_search(vision_result):
+            await show(vision_result, "🔎 Buscando mais detalhes na web...")
+            expected = vision_snapshot(item)
+            try:
+                vision_result = await vision_queue.submit(
+                    item,
+                    search=True,
+                    previous=vision_result,
+                    **streaming("🔎 Buscando mais detalhes na web..."),
+                )
+            except Exception as e:
+                logger.warning("Busca web da análise falhou: %s", e)
+            else:
+                if not await still_drafting():
+                    return
+                apply_vision_result(item, vision_result, expected)
 
+        await show(vision_result)
+
+    except QueueFullError:
+        await query.edit_message_caption(
+            caption="⚠️ Muitas análises em andamento. Tente novamente em instantes.",
+            reply_markup=build_keyboard(item),
+        )
+    except (CircuitOpenError, TimeoutError) as e:
+        await vision_progress_throttle.cancel_and_wait(progress_key)
+        logger.warning("Análise de imagem indisponível: %r", e)
+        await query.edit_message_caption(
+            caption=(
+                "⏱ A análise demorou demais. Tente novamente."
+                if isinstance(e, TimeoutError)
+                else "⚠️ Serviço de análise indisponível no momento. "
+                "Tente novamente em instantes."
+            ),
+            reply_markup=build_keyboard(item),
+        )
     except Exception as e:
+        await vision_progress_throttle.cancel_and_wait(progress_key)
         logger.exception("Erro ao extrair dados da imagem: %s", e)
         await safe_edit_message(query, f"❌ Erro ao analisar imagem: {e}")
 
 
-async def save(item: Item, query) -> list[Item | bool]:
+async def save(item: Item, query) -> str | None:
+    """Grava o item; devolve a mensagem de erro, se houver."""
     try:
         item = await output.save(item)
-        await safe_edit_message(
-            query,
-            f"✅ Item gravado:\n\n{item}\n\nEnvie o nome ou a foto do próximo item:",
-        )
-        return item, True
     except ValueError as e:
-        await safe_edit_message(
-            query,
-            f"❌ Erro ao gravar item: {str(e)}",
+        return f"❌ Erro ao gravar item: {str(e)}"
+
+    # Um resumo adiado (ou ainda sendo enviado) não deve reaparecer por cima
+    # da confirmação
+    await summary_debouncer.cancel_and_wait(summary_key(query))
+    await safe_edit_message(
+        query,
+        f"✅ Item gravado:\n\n{item}\n\nEnvie o nome ou a foto do próximo item:",
+    )
+    return None
+
+
+async def save_batch(query, context: ContextTypes.DEFAULT_TYPE):
+    context.user_data.pop("action", None)
+    items = context.user_data.get("batch") or []
+    if not items:
+        await safe_edit_message(query, "Nenhum lote para gravar.")
+        return
+
+    valid, pending, errors = [], [], []
+    for item in items:
+        try:
+            item.validate()
+        except ValueError as e:
+            pending.append(item)
+            errors.append(f"{item.name or '(sem nome)'}: {e}")
+        else:
+            valid.append(item)
+
+    # Um único lote: cada localização é criada uma só vez
+    if valid:
+        await output.save_many(valid)
+
+    saved = len(items) - len(pending)
+    if not pending:
+        context.user_data.pop("batch", None)
+        context.user_data["last_location"] = items[-1].location
+        await safe_edit_message(query, f"✅ {saved} itens gravados.")
+        return
+
+    context.user_data["batch"] = pending
+    await query.edit_message_text(
+        f"✅ {saved} itens gravados.\n❌ Não gravados:\n"
+        + render_errors(errors)
+        + "\n\n"
+        + render_batch_summary(pending),
+        parse_mode="Markdown",
+        reply_markup=build_batch_keyboard(),
+    )
+
+
+async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    search_query = " ".join(context.args or []).strip()
+    if not search_query:
+        await update.message.reply_text("Use: /buscar <nome, tag ou local>")
+        return
+
+    context.user_data["search_query"] = search_query
+    text, reply_markup = render_search_page(search_query, 0)
+    await update.message.reply_text(text, reply_markup=reply_markup)
+
+
+async def search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
+    search_query = context.user_data.get("search_query")
+    if not search_query:
+        await query.edit_message_text("Busca expirada. Envie /buscar novamente.")
+        return
+
+    page = int(query.data.removeprefix("search:"))
+    text, reply_markup = render_search_page(search_query, page)
+    await query.edit_message_text(text, reply_markup=reply_markup)
+
+
+async def flush(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not isinstance(output, WriteBehindOutput):
+        await update.message.reply_text("Os itens já são gravados imediatamente.")
+        return
+
+    try:
+        count = await output.flush()
+    except Exception as e:
+        logger.exception("Erro ao gravar itens pendentes: %s", e)
+        await update.message.reply_text(f"❌ Erro ao gravar itens pendentes: {e}")
+        return
+
+    await update.message.reply_text(f"✅ {count} itens pendentes gravados no vault.")
+
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update, settings.admin_user_ids):
+        await update.message.reply_text("Comando restrito a administradores.")
+        return
+
+    # Limite de tamanho de uma mensagem do Telegram
+    await update.message.reply_text(metrics.format_stats(metrics.registry)[:4096])
+
+
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update, settings.admin_user_ids):
+        await update.message.reply_text("Comando restrito a administradores.")
+        return
+
+    if profiler is None:
+        await update.message.reply_text(
+            "Perfilamento desativado. Defina PROFILE_DIR para ativar."
         )
-        return item, False
+        return
+
+    top = None
+    if context.args:
+        try:
+            top = max(int(context.args[0]), 1)
+        except ValueError:
+            await update.message.reply_text("Use: /profile [quantidade de funções]")
+            return
+
+    report = await asyncio.to_thread(profiler.latest_report, top)
+    if report is None:
+        await update.message.reply_text(
+            f"Nenhum update passou de {profiler.threshold:g}s ainda."
+        )
+        return
+
+    await update.message.reply_text(report[:4096])
 
 
 async def debug_user_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -445,20 +1276,132 @@ async def debug_user_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # =========================
 # Inicialização
 # =========================
-def main():
-    if not os.getenv("OPENAI_API_KEY"):
-        logger.warning("OPENAI_API_KEY not set. Vision features will be disabled.")
+async def post_init(app):
+    await asyncio.to_thread(markdown_output.ensure_dirs)
+
+    result = await vault_index.refresh()
+    logger.info(
+        "Índice do vault: %d itens, %d locais (%d arquivos lidos)",
+        len(vault_index.items),
+        len(vault_index.locations),
+        result.parsed,
+    )
+
+    if settings.index_refresh_interval > 0:
+        app.bot_data["index_watcher"] = asyncio.create_task(
+            vault_index.watch(settings.index_refresh_interval)
+        )
+
+    if isinstance(output, WriteBehindOutput):
+        await output.start()
+
+    if settings.metrics_port:
+        app.bot_data["metrics_server"] = await metrics.start_metrics_server(
+            metrics.registry, settings.metrics_host, settings.metrics_port
+        )
+
+
+async def post_shutdown(app):
+    index_watcher = app.bot_data.pop("index_watcher", None)
+    if index_watcher:
+        index_watcher.cancel()
+        await asyncio.gather(index_watcher, return_exceptions=True)
+
+    # Antes do cache: um worker ainda pode estar gravando nele
+    if vision_queue is not None:
+        await vision_queue.stop()
+
+    if isinstance(output, WriteBehindOutput):
+        await output.stop()
+
+    if vision_cache is not None:
+        vision_cache.close()
+
+    if profiler is not None:
+        profiler.close()
+
+    metrics_server = app.bot_data.pop("metrics_server", None)
+    if metrics_server:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+
+
+def build_application(request: BaseRequest | None = None) -> Application:
+    """
+    Monta a aplicação com todos os handlers. `request` substitui o cliente
+    HTTP da Bot API (ex.: `FakeTelegramRequest` em testes e benchmarks).
+    """
+    build_services()
+
+    builder = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        # Chats diferentes em paralelo; cada chat, em ordem
+        .concurrent_updates(
+            ChatSerializingUpdateProcessor(settings.max_concurrent_updates)
+        )
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    app = builder.build()
 
-    app = ApplicationBuilder().token(TOKEN).build()
+    # Usuários não autorizados são barrados antes de qualquer handler
+    app.add_handler(access_gate(ALLOWED_USER_IDS), group=-1)
 
     app.add_handler(CommandHandler("myid", debug_user_id))
     app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("buscar", search))
+    app.add_handler(CommandHandler("flush", flush))
+    app.add_handler(CommandHandler("stats", stats))
+    app.add_handler(CommandHandler("profile", profile))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
     app.add_handler(MessageHandler(filters.PHOTO, handle_photo))
+    app.add_handler(CallbackQueryHandler(search_page, pattern=r"^search:\d+$"))
     app.add_handler(CallbackQueryHandler(button_handler))
 
-    logger.info("Bot iniciado.")
-    app.run_polling()
+    # Latência e falhas de cada handler (e perfil dos lentos, se ativado)
+    for handler in app.handlers[0]:
+        callback = handler.callback
+        if profiler is not None:
+            callback = profiler.wrap(callback)
+        handler.callback = metrics.timed(
+            metrics.HANDLER_SECONDS,
+            metrics.HANDLER_ERRORS,
+            handler=handler.callback.__name__,
+        )(callback)
+
+    return app
+
+
+def main():
+    if not os.getenv("OPENAI_API_KEY"):
+        logger.warning("OPENAI_API_KEY not set. Vision features will be disabled.")
+
+    app = build_application()
+
+    if not settings.webhook_url:
+        logger.info("Bot iniciado (polling).")
+        app.run_polling()
+        return
+
+    if not settings.webhook_secret:
+        logger.warning("WEBHOOK_SECRET não definido: o webhook aceita qualquer origem.")
+
+    logger.info(
+        "Bot iniciado (webhook em %s:%d/%s).",
+        settings.webhook_listen,
+        settings.webhook_port,
+        settings.webhook_path,
+    )
+    app.run_webhook(
+        listen=settings.webhook_listen,
+        port=settings.webhook_port,
+        url_path=settings.webhook_path,
+        webhook_url=f"{settings.webhook_url.rstrip('/')}/{settings.webhook_path}",
+        secret_token=settings.webhook_secret or None,
+    )
 
 
 if __name__ == "__main__":
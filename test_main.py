@@ -0,0 +1,467 @@
+import asyncio
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("TELEGRAM_TOKEN", "123:TEST")
+os.environ.setdefault("OUTPUT_DIR", tempfile.mkdtemp(prefix="inventorybot-test-"))
+os.environ["ALLOWED_USER_IDS"] = "[]"
+os.environ["VISION_CACHE_PATH"] = ""
+os.environ["INDEX_REFRESH_INTERVAL"] = "0"
+os.environ["SUMMARY_DEBOUNCE"] = "0"
+
+from telegram import Update  # noqa: E402
+
+import main  # noqa: E402
+from inventorybot import metrics  # noqa: E402
+from inventorybot.entities import Item  # noqa: E402
+from inventorybot.testing.fake_openai import (  # noqa: E402
+    DEFAULT_OUTPUT,
+    FakeOpenAIServer,
+)
+from inventorybot.testing.fake_telegram import (  # noqa: E402
+    FakeTelegramRequest,
+    callback_update,
+    message_update,
+    photo_update,
+)
+
+class StaleSummaryRequest(FakeTelegramRequest):
+    """Bot API where, once `stale` is set, no message can be edited anymore."""
+
+    stale = False
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        if self.stale and "/editMessage" in url:
+            body = {
+                "ok": False,
+                "error_code": 400,
+                "description": "Bad Request: message to edit not found",
+            }
+            return 400, json.dumps(body).encode()
+        return await super().do_request(url, method, request_data, **kwargs)
+
+
+SERVICES = (
+    "vault_index",
+    "search_index",
+    "markdown_output",
+    "output",
+    "vision_cache",
+    "vision_service",
+    "vision_queue",
+    "profiler",
+)
+
+
+@pytest.fixture
+def vault(tmp_path, monkeypatch):
+    """Services built from scratch for each test, writing to a temporary vault."""
+    monkeypatch.setattr(main, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    for name in SERVICES:
+        monkeypatch.setattr(main, name, None)
+    monkeypatch.setattr(main.album_collector, "delay", 0.05)
+    return tmp_path
+
+
+@pytest.fixture
+def vision_server(vault, monkeypatch):
+    """Vision enabled, answered by a local fake of the OpenAI API."""
+    with FakeOpenAIServer() as server:
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        monkeypatch.setattr(main.settings, "openai_base_url", server.base_url)
+        monkeypatch.setattr(main.settings, "vision_stream", False)
+        yield server
+
+
+def run_bot(scenario, request: FakeTelegramRequest | None = None):
+    """Run `scenario(app, request)` against the bot and the fake Bot API."""
+    request = request or FakeTelegramRequest()
+
+    async def run():
+        app = main.build_application(request)
+        async with app:
+            await main.post_init(app)
+            await app.start()
+            try:
+                await scenario(app, request)
+            finally:
+                await app.stop()
+                await main.post_shutdown(app)
+
+    asyncio.run(run())
+    return request
+
+
+async def send(app, update: dict):
+    await app.process_update(Update.de_json(update, app.bot))
+
+
+def summary_message_id(app, user: int) -> int:
+    """Id of the summary message the bot keeps editing for `user`."""
+    return app.user_data[user]["summary"]["message_id"]
+
+
+def saved_names(vault) -> list[str]:
+    items = vault / "Itens"
+    return sorted(
+        line.removeprefix("name: ")
+        for path in items.glob("*.md")
+        for line in path.read_text().splitlines()
+        if line.startswith("name: ")
+    )
+
+
+def test_album_without_vision_can_be_named_item_by_item(vault):
+    """Test that unnamed album items are flagged and can be named before saving."""
+    user = 401
+
+    async def scenario(app, request):
+        for number in (1, 2):
+            await send(app, photo_update(user, f"album-{number}", media_group_id="a"))
+        [summary] = await request.wait_for("editMessageText")
+        assert "2 itens sem nome" in summary.params["text"]
+        assert "edit_batch_item" in str(summary.params["reply_markup"])
+
+        await send(app, callback_update(user, "edit_batch_item"))
+        await send(app, message_update(user, "3 Martelo"))
+        assert "número do item (1 a 2)" in request.calls[-1].params["text"]
+        await send(app, message_update(user, "1 Martelo"))
+        await send(app, callback_update(user, "edit_batch_item"))
+        await send(app, message_update(user, "2 Serrote; q 2 l Caixa"))
+        assert "sem nome" not in request.calls[-1].params["text"]
+
+        await send(app, callback_update(user, "edit_batch_location"))
+        await send(app, message_update(user, "Caixa"))
+        await send(app, callback_update(user, "save_batch"))
+        assert "2 itens gravados" in request.calls[-1].params["text"]
+
+    run_bot(scenario)
+    assert saved_names(vault) == ["Martelo", "Serrote"]
+
+
+def test_summary_reuses_the_telegram_file_id_instead_of_uploading(vault):
+    """Test that summaries send, edit and replace the photo by its file_id."""
+    user = 901
+    uploaded = metrics.TELEGRAM_UPLOAD_BYTES.value()
+
+    async def scenario(app, request):
+        await send(app, photo_update(user, "photo-a", caption="Martelo"))
+        [sent] = await request.wait_for("sendPhoto")
+        assert sent.params["photo"] == "photo-a"
+
+        await send(app, callback_update(user, "edit_quantidade"))
+        await send(app, message_update(user, "3"))
+        [edited] = await request.wait_for("editMessageCaption")
+        assert edited.params["message_id"] == summary_message_id(app, user)
+        assert "Quantidade: 3" in edited.params["caption"]
+
+        await send(app, callback_update(user, "edit_foto"))
+        await send(app, photo_update(user, "photo-b"))
+        [replaced] = await request.wait_for("editMessageMedia")
+        assert "photo-b" in str(replaced.params["media"])
+
+        assert len(request.calls_to("sendPhoto")) == 1
+
+    run_bot(scenario)
+    assert metrics.TELEGRAM_UPLOAD_BYTES.value() == uploaded
+
+
+def test_summary_is_edited_in_place_and_resent_when_the_edit_fails(vault):
+    """Test that text summaries are edited, falling back to a new message."""
+    user = 1001
+
+    async def scenario(app, request):
+        await send(app, message_update(user, "Martelo"))
+        await request.wait_for("sendMessage")
+        summary_id = summary_message_id(app, user)
+
+        await send(app, message_update(user, "Martelo de borracha"))
+        [edited] = await request.wait_for("editMessageText")
+        assert edited.params["message_id"] == summary_id
+        assert "Martelo de borracha" in edited.params["text"]
+        assert len(request.calls_to("sendMessage")) == 1
+
+        request.stale = True
+        await send(app, message_update(user, "Serrote"))
+        [_, resent] = await request.wait_for("sendMessage", count=2)
+        assert "Serrote" in resent.params["text"]
+        assert summary_message_id(app, user) != summary_id
+
+    run_bot(scenario, StaleSummaryRequest())
+
+
+def test_each_user_in_a_group_has_their_own_summary(vault, monkeypatch):
+    """Test that group members' edits neither merge nor overwrite summaries."""
+    group, first, second = -1301, 1301, 1302
+    monkeypatch.setattr(main.summary_debouncer, "delay", 0.05)
+
+    async def scenario(app, request):
+        # Edições de dois usuários dentro da mesma janela de agrupamento
+        await send(app, message_update(first, "Martelo", chat_id=group))
+        await send(app, message_update(second, "Serrote", chat_id=group))
+        sent = await request.wait_for("sendMessage", count=2)
+        assert {
+            ("Martelo" in call.params["text"], "Serrote" in call.params["text"])
+            for call in sent
+        } == {(True, False), (False, True)}
+        assert summary_message_id(app, first) != summary_message_id(app, second)
+
+        await send(app, message_update(second, "Serrote grande", chat_id=group))
+        [edited] = await request.wait_for("editMessageText")
+        assert edited.params["chat_id"] == group
+        assert edited.params["message_id"] == summary_message_id(app, second)
+        assert "Serrote grande" in edited.params["text"]
+
+    run_bot(scenario)
+
+
+def test_small_photos_stay_in_memory_and_large_ones_go_to_disk(vault, monkeypatch):
+    """Test that downloads above PHOTO_MEMORY_LIMIT go to a temporary file."""
+    small, large = 1101, 1102
+    content = b"\xff\xd8photo\xff\xd9"
+
+    async def scenario(app, request):
+        # As fotos sintéticas declaram file_size=4
+        monkeypatch.setattr(main, "PHOTO_MEMORY_LIMIT", 4)
+        await send(app, photo_update(small, "small"))
+        monkeypatch.setattr(main, "PHOTO_MEMORY_LIMIT", 3)
+        await send(app, photo_update(large, "large"))
+
+        in_memory = app.user_data[small]["item"]
+        assert in_memory.photo_data == content
+        assert in_memory.photo is None
+
+        on_disk = app.user_data[large]["item"]
+        assert on_disk.photo_data is None
+        with open(on_disk.photo, "rb") as file:
+            assert file.read() == content
+        os.remove(on_disk.photo)
+
+    run_bot(scenario, FakeTelegramRequest(file_content=content))
+
+
+def analysis_summaries(request: FakeTelegramRequest) -> list:
+    """Caption edits that bring the buttons back (an analysis step finished)."""
+    return [
+        call
+        for call in request.calls_to("editMessageCaption")
+        if "reply_markup" in call.params
+    ]
+
+
+def test_edits_made_during_an_extraction_are_kept(vault, vision_server):
+    """Test that the analysis only fills fields the user did not edit meanwhile."""
+    user = 1201
+    vision_server.latency = 0.3
+    vision_server.output = {
+        "name": "Martelo de unha",
+        "description": "Martelo com cabo de madeira",
+        "brand": None,
+        "color": None,
+        "model": None,
+        "barcode": None,
+        "confidence": 0.9,
+    }
+
+    async def scenario(app, request):
+        await send(app, photo_update(user, "photo"))
+        await send(app, callback_update(user, "extract_vision_data"))
+        await send(app, callback_update(user, "edit_nome"))
+        await send(app, message_update(user, "Martelo do vovô"))
+        await request.wait_until(lambda: analysis_summaries(request))
+
+        item = app.user_data[user]["item"]
+        assert item.name == "Martelo do vovô"
+        assert item.description == "Martelo com cabo de madeira"
+        [summary] = analysis_summaries(request)
+        assert "Martelo do vovô" in summary.params["caption"]
+
+    run_bot(scenario)
+    assert vision_server.request_count == 1
+
+
+def test_shutdown_stops_the_vision_workers(vault, vision_server, monkeypatch):
+    """Test that post_shutdown leaves no vision worker pending."""
+    user = 1251
+    workers = []
+    stopped = []
+    post_shutdown = main.post_shutdown
+
+    async def shutdown(app):
+        await post_shutdown(app)
+        # Ainda com o loop rodando, antes de o asyncio cancelar o que sobrou
+        stopped.extend(worker.done() for worker in workers)
+
+    monkeypatch.setattr(main, "post_shutdown", shutdown)
+
+    async def scenario(app, request):
+        await send(app, photo_update(user, "photo"))
+        await send(app, callback_update(user, "extract_vision_data"))
+        await request.wait_until(lambda: analysis_summaries(request))
+        workers.extend(main.vision_queue._workers)
+
+    run_bot(scenario)
+    assert stopped and all(stopped)
+
+
+def test_shutdown_cancels_the_vault_index_watcher(vault, monkeypatch):
+    """Test that post_shutdown stops the periodic vault scan."""
+    monkeypatch.setattr(main.settings, "index_refresh_interval", 60)
+    watchers = []
+    stopped = []
+    post_shutdown = main.post_shutdown
+
+    async def shutdown(app):
+        await post_shutdown(app)
+        stopped.extend(watcher.done() for watcher in watchers)
+
+    monkeypatch.setattr(main, "post_shutdown", shutdown)
+
+    async def scenario(app, request):
+        watchers.append(app.bot_data["index_watcher"])
+
+    run_bot(scenario)
+    assert stopped == [True]
+    assert watchers[0].cancelled()
+
+
+@pytest.mark.parametrize("confidence, searches", [(0.92, 0), (0.5, 1)])
+def test_confidence_of_the_first_analysis_gates_the_web_search(
+    vault, vision_server, monkeypatch, confidence, searches
+):
+    """Test that an identified brand only escalates below the confidence bar."""
+    user = 1501 + searches
+    monkeypatch.setattr(main.settings, "vision_search_confidence", 0.8)
+    vision_server.output = {**DEFAULT_OUTPUT, "confidence": confidence}
+
+    async def scenario(app, request):
+        await send(app, photo_update(user, "photo"))
+        await send(app, callback_update(user, "extract_vision_data"))
+        await request.wait_until(
+            lambda: len(analysis_summaries(request)) > searches
+        )
+
+    run_bot(scenario)
+    tools = [request.get("tools") for request in vision_server.requests]
+    assert tools == [None] + [[{"type": "web_search"}]] * searches
+
+
+def test_uploads_from_memory_and_from_temp_files_are_counted(vault, tmp_path):
+    """Test that photo bytes sent without a file_id count as uploads."""
+    photo = tmp_path / "large.jpg"
+    photo.write_bytes(b"x" * 300)
+    uploaded = metrics.TELEGRAM_UPLOAD_BYTES.value()
+
+    async def scenario(app, request):
+        for user, item in (
+            (2101, Item(name="Martelo", photo_data=b"x" * 200)),
+            (2102, Item(name="Serrote", photo=str(photo))),
+        ):
+            context = SimpleNamespace(user_data={"item": item})
+            await main.push_summary(app.bot, user, context)
+            # O file_id devolvido pelo Telegram evita o próximo upload
+            assert item.photo_file_id
+            await main.push_summary(app.bot, user, context)
+
+        assert len(request.calls_to("sendPhoto")) == 2
+
+    run_bot(scenario)
+    assert metrics.TELEGRAM_UPLOAD_BYTES.value() - uploaded == 500
+
+
+def test_vision_client_is_prepared_on_the_first_photo_not_at_startup(
+    vault, vision_server
+):
+    """Test that startup leaves the OpenAI client alone until a photo arrives."""
+    user = 2301
+
+    async def scenario(app, request):
+        assert main.vision_service._client is None
+        await send(app, photo_update(user, "photo"))
+        await asyncio.wait_for(main.vision_queue._warm_up, 10)
+        assert main.vision_service._client is not None
+
+    run_bot(scenario)
+
+
+@pytest.mark.parametrize("pillow", [True, False])
+def test_missing_pillow_is_reported_at_startup(vault, monkeypatch, caplog, pillow):
+    """Test that image options without Pillow log a warning when services start."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(main.imaging, "is_available", lambda: pillow)
+
+    main.build_services()
+    main.vision_cache.close()
+
+    warned = [r for r in caplog.records if "Pillow" in r.getMessage()]
+    assert bool(warned) != pillow
+
+
+def test_quick_add_parsing_rules():
+    """Test blank lines, trimming, the "qty x name" form and line-numbered errors."""
+    context = SimpleNamespace(user_data={})
+    text = (
+        "  Martelo ; q 2 l Caixa  \n"
+        "\n"
+        "3 x Parafuso; l Caixa\n"
+        "2x Prego; l Caixa\n"
+        "2 Xícaras; l Caixa\n"
+        "  ; q 2\n"
+        "1 x Chave; q 4 l Caixa\n"
+        "Serrote\n"
+    )
+
+    items, errors = main.parse_quick_add(text, context)
+
+    assert [(item.name, item.quantity) for item in items] == [
+        ("Martelo", 2),
+        ("Parafuso", 3),
+        ("Prego", 2),
+        ("2 Xícaras", 1),
+        ("Chave", 4),
+        ("Serrote", 1),
+    ]
+    assert errors == [
+        "Linha 6: nome é obrigatório",
+        "Linha 8 (Serrote): Localização é obrigatória",
+    ]
+
+
+def test_batch_preview_escapes_markdown_in_names():
+    """Test that names with Markdown characters don't break the preview."""
+    items, errors = main.parse_quick_add(
+        "caixa_2 *frágil*\ncabo `usb`", SimpleNamespace(user_data={})
+    )
+
+    summary = main.render_batch_summary(items)
+    assert "caixa\\_2 \\*frágil\\*" in summary
+    assert "cabo \\`usb\\`" in summary
+    assert "(caixa\\_2 \\*frágil\\*)" in main.render_errors(errors)
+
+
+def test_multiple_lines_only_start_a_batch_without_a_draft(vault):
+    """Test that an explicit name edit or a draft keeps multi-line text as one name."""
+    fresh, editing, drafting = 2501, 2502, 2503
+
+    async def scenario(app, request):
+        await send(app, message_update(fresh, "Martelo\nSerrote"))
+        assert len(app.user_data[fresh]["batch"]) == 2
+
+        await send(app, callback_update(editing, "edit_nome"))
+        await send(app, message_update(editing, "Martelo\nde borracha"))
+        assert "batch" not in app.user_data[editing]
+        assert app.user_data[editing]["item"].name == "Martelo\nde borracha"
+
+        await send(app, photo_update(drafting, "photo"))
+        await send(app, message_update(drafting, "Serrote\nde poda"))
+        assert "batch" not in app.user_data[drafting]
+        item = app.user_data[drafting]["item"]
+        assert item.name == "Serrote\nde poda"
+        assert item.photo_file_id == "photo"
+
+    run_bot(scenario)